@@ -0,0 +1,48 @@
+#!/usr/bin/env python3.7
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src/")
+from botoinator import DecoratedSession
+
+""" Compares client creation latency with and without the decorated client class cache """
+
+ITERATIONS = 200
+METHOD_NAMES = ['create_bucket', 'delete_bucket', 'get_object', 'head_object', 'list_objects_v2', 'put_object']
+SESSION_KWARGS = dict(aws_access_key_id='benchmark', aws_secret_access_key='benchmark', region_name='us-east-1')
+
+
+def passThrough(func):
+  def pass_through(*args, **kwargs):
+    return func(*args, **kwargs)
+  return pass_through
+
+
+def timeClientCreation(session, clear_cache):
+  """
+  Returns the mean time in milliseconds to create an s3 client from the session
+  """
+  elapsed = 0.0
+  for _ in range(ITERATIONS):
+    if clear_cache:
+      DecoratedSession.clear_class_cache()
+    start = time.perf_counter()
+    session.client('s3')
+    elapsed += time.perf_counter() - start
+  return elapsed * 1000 / ITERATIONS
+
+
+DecoratedSession.add_client_decorator('s3', METHOD_NAMES, passThrough)
+
+# Warm botocore's loader caches so that only class creation differs between runs
+session = DecoratedSession(**SESSION_KWARGS)
+session.client('s3')
+
+uncached = timeClientCreation(session, clear_cache=True)
+cached = timeClientCreation(session, clear_cache=False)
+
+DecoratedSession.remove_client_decorator('s3', METHOD_NAMES)
+
+print('client creation, class cache cleared: {:.3f} ms'.format(uncached))
+print('client creation, class cache warm:    {:.3f} ms'.format(cached))
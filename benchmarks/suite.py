@@ -0,0 +1,214 @@
+#!/usr/bin/env python3.7
+
+import argparse
+import boto3
+import botocore
+import gc
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from botocore.stub import Stubber
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src/")
+import botoinator
+from botoinator import DecoratedSession
+
+""" Measures botoinator's overhead over vanilla boto3 offline and prints the results as JSON """
+
+DECORATOR_COUNTS = (0, 10, 100, 1000)
+SESSION_KWARGS = dict(aws_access_key_id='benchmark', aws_secret_access_key='benchmark', region_name='us-east-1')
+STACK_DEPTHS = (1, 10)
+THREAD_COUNTS = (1, 4, 8)
+# The session class botoinator replaces boto3.session.Session with derives from the original one
+VanillaSession = DecoratedSession.__mro__[1]
+
+
+class SharingSession(DecoratedSession):
+  share_components = True
+
+
+def passThrough(func):
+  def pass_through(*args, **kwargs):
+    return func(*args, **kwargs)
+  return pass_through
+
+
+def meanSeconds(func, iterations):
+  """
+  Returns the mean wall time in seconds of calling func
+  """
+  start = time.perf_counter()
+  for _ in range(iterations):
+    func()
+  return (time.perf_counter() - start) / iterations
+
+
+def benchSessionConstruction(iterations):
+  """
+  Session construction time with 0/10/100/1000 class level decorators registered
+  """
+  results = {'vanilla_us': meanSeconds(lambda: VanillaSession(**SESSION_KWARGS), iterations) * 1e6}
+  for count in DECORATOR_COUNTS:
+    method_names = ['method_{}'.format(index) for index in range(count)]
+    if method_names:
+      DecoratedSession.add_client_decorator('s3', method_names, passThrough)
+    try:
+      results['decorators_{}_us'.format(count)] = meanSeconds(lambda: DecoratedSession(**SESSION_KWARGS), iterations) * 1e6
+    finally:
+      if method_names:
+        DecoratedSession.remove_client_decorator('s3', method_names)
+  return results
+
+
+def benchClientCreation(iterations):
+  """
+  Client creation time with a cold and a warm decorated class cache, and with vanilla boto3
+  """
+  vanilla = VanillaSession(**SESSION_KWARGS)
+  session = DecoratedSession(**SESSION_KWARGS)
+  DecoratedSession.add_client_decorator('s3', ['get_object', 'put_object', 'list_objects_v2'], passThrough)
+  try:
+    # Warm botocore's loader caches so that only class creation differs between runs
+    vanilla.client('s3')
+    session.client('s3')
+
+    def coldClient():
+      DecoratedSession.clear_class_cache()
+      session.client('s3')
+
+    return {
+      'vanilla_ms': meanSeconds(lambda: vanilla.client('s3'), iterations) * 1e3,
+      'cold_class_cache_ms': meanSeconds(coldClient, iterations) * 1e3,
+      'warm_class_cache_ms': meanSeconds(lambda: session.client('s3'), iterations) * 1e3
+    }
+  finally:
+    DecoratedSession.remove_client_decorator('s3', ['get_object', 'put_object', 'list_objects_v2'])
+
+
+def timeStubbedCalls(client, iterations):
+  with Stubber(client) as stubber:
+    for _ in range(iterations):
+      stubber.add_response('get_caller_identity', {'Account': '123456789012', 'Arn': 'arn:aws:iam::123456789012:user/benchmark', 'UserId': 'benchmark'}, {})
+    return meanSeconds(client.get_caller_identity, iterations)
+
+
+def benchCallOverhead(iterations):
+  """
+  Per call time of undecorated and decorated methods, answered by a Stubber so that no network is involved
+  """
+  results = {'vanilla_us': timeStubbedCalls(VanillaSession(**SESSION_KWARGS).client('sts'), iterations) * 1e6}
+  results['undecorated_us'] = timeStubbedCalls(DecoratedSession(**SESSION_KWARGS).client('sts'), iterations) * 1e6
+  for mode in (DecoratedSession.METHOD_DECORATION, DecoratedSession.DISPATCH_DECORATION):
+    for depth in STACK_DEPTHS:
+      session = DecoratedSession(**SESSION_KWARGS)
+      session.client_decoration_mode = mode
+      # Stacks hold each decorator once, so every level needs its own
+      for _ in range(depth):
+        session.register_client_decorator('sts', 'get_caller_identity', lambda func: passThrough(func))
+      results['{}_{}_decorators_us'.format(mode, depth)] = timeStubbedCalls(session.client('sts'), iterations) * 1e6
+  return results
+
+
+def benchSessionMemory(iterations):
+  """
+  Memory allocated per session, and per session with one decorated client, with and without shared components
+  """
+  DecoratedSession.add_client_decorator('s3', 'get_object', passThrough)
+  try:
+    DecoratedSession(**SESSION_KWARGS).client('s3')
+    # Load the shared models before measuring, so that only the per session cost is counted
+    SharingSession(**SESSION_KWARGS).client('s3')
+    results = {}
+    for name, factory in (
+      ('vanilla_session_bytes', lambda: VanillaSession(**SESSION_KWARGS)),
+      ('session_bytes', lambda: DecoratedSession(**SESSION_KWARGS)),
+      ('session_with_client_bytes', lambda: DecoratedSession(**SESSION_KWARGS).client('s3')),
+      ('shared_session_bytes', lambda: SharingSession(**SESSION_KWARGS)),
+      ('shared_session_with_client_bytes', lambda: SharingSession(**SESSION_KWARGS).client('s3'))
+    ):
+      gc.collect()
+      tracemalloc.start()
+      try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory() for _ in range(iterations)]
+        results[name] = (tracemalloc.get_traced_memory()[0] - before) // iterations
+      finally:
+        tracemalloc.stop()
+      del objects
+    return results
+  finally:
+    DecoratedSession.remove_client_decorator('s3', 'get_object')
+
+
+def benchThreadedClientCreation(iterations):
+  """
+  Clients created per second by 1/4/8 threads, each with its own session
+  """
+  DecoratedSession.add_client_decorator('s3', 'get_object', passThrough)
+  try:
+    results = {}
+    for threads in THREAD_COUNTS:
+      sessions = threading.local()
+
+      def createClient(_):
+        session = getattr(sessions, 'session', None)
+        if session is None:
+          session = sessions.session = DecoratedSession(**SESSION_KWARGS)
+        session.client('s3')
+
+      with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(createClient, range(threads)))
+        start = time.perf_counter()
+        list(executor.map(createClient, range(iterations)))
+        results['threads_{}_clients_per_second'.format(threads)] = iterations / (time.perf_counter() - start)
+    return results
+  finally:
+    DecoratedSession.remove_client_decorator('s3', 'get_object')
+
+
+BENCHMARKS = {
+  'session_construction': (benchSessionConstruction, 2000),
+  'client_creation': (benchClientCreation, 100),
+  'call_overhead': (benchCallOverhead, 2000),
+  'session_memory': (benchSessionMemory, 200),
+  'threaded_client_creation': (benchThreadedClientCreation, 200)
+}
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Measures botoinator's overhead over vanilla boto3 offline and prints the results as JSON")
+  parser.add_argument('--benchmark', action='append', choices=sorted(BENCHMARKS), help='run only this benchmark (repeatable)')
+  parser.add_argument('--scale', type=float, default=1.0, help='multiplies the number of iterations of every benchmark')
+  parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+  args = parser.parse_args()
+
+  results = {
+    'environment': {
+      'python': platform.python_version(),
+      'implementation': platform.python_implementation(),
+      'platform': platform.platform(),
+      'boto3': boto3.__version__,
+      'botocore': botocore.__version__,
+      'botoinator': getattr(botoinator, '__version__', None)
+    },
+    'timestamp': time.time(),
+    'benchmarks': {}
+  }
+  for name in args.benchmark or BENCHMARKS:
+    benchmark, iterations = BENCHMARKS[name]
+    results['benchmarks'][name] = benchmark(max(1, int(iterations * args.scale)))
+
+  document = json.dumps(results, indent=2, sort_keys=True)
+  if args.output:
+    with open(args.output, 'w') as output:
+      output.write(document + '\n')
+  else:
+    print(document)
+
+
+if __name__ == '__main__':
+  main()
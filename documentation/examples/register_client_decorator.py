@@ -4,6 +4,9 @@ import boto3
 import botoinator
 from moto import mock_s3, mock_sqs
 
+# Make boto3 create decorated sessions
+botoinator.install()
+
 """ This is our decorator that we will apply to boto3 methods """
 def myDecorator(func):
   def test_decorator(*args, **kwargs):
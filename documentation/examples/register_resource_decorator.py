@@ -6,6 +6,9 @@ from moto import mock_s3, mock_sqs
 import time
 import inspect
 
+# Make boto3 create decorated sessions
+botoinator.install()
+
 """ This is our decorator that we will apply to boto3 methods """
 def myDecorator(func):
   def test_decorator(*args, **kwargs):
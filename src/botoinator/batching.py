@@ -0,0 +1,392 @@
+import atexit
+
+from botocore.exceptions import ClientError
+from concurrent.futures import Future
+from copy import copy
+from functools import wraps
+from threading import Condition, Thread
+from time import monotonic
+from weakref import WeakSet, finalize, ref
+
+
+_RETRY = object()
+
+# The batchers that may still hold buffered calls, closed once at exit without keeping them alive
+_batchers = WeakSet()
+
+
+@atexit.register
+def _close_batchers():
+  for batcher in list(_batchers):
+    batcher.close()
+
+
+def _copy_exception(error):
+  try:
+    return copy(error)
+  except Exception:
+    return error
+
+
+def _wake(condition):
+  with condition:
+    condition.notify()
+
+
+class _BatchSpec(object):
+  """
+  Describes how single item calls of a method are turned into a batch call and how its response is split again.
+  """
+
+
+  batch_method = None
+  fallback_codes = ()
+  group_keys = ()
+  max_bytes = None
+  max_count = None
+  operation_name = None
+
+
+  def accepts(self, kwargs):
+    return all(key in kwargs for key in self.group_keys)
+
+
+  def group(self, kwargs):
+    return tuple(kwargs[key] for key in self.group_keys)
+
+
+  def request(self, group, calls):
+    raise NotImplementedError()
+
+
+  def results(self, response, calls):
+    raise NotImplementedError()
+
+
+  def size(self, kwargs):
+    raise NotImplementedError()
+
+
+  def error(self, code, message):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, self.operation_name)
+
+
+class _SendMessage(_BatchSpec):
+
+
+  batch_method = 'send_message_batch'
+  fallback_codes = ('AWS.SimpleQueueService.BatchRequestTooLong', 'BatchRequestTooLong')
+  group_keys = ('QueueUrl',)
+  max_bytes = 256 * 1024
+  max_count = 10
+  operation_name = 'SendMessage'
+
+
+  def request(self, group, calls):
+    entries = []
+    for index, call in enumerate(calls):
+      entry = {key: value for key, value in call.kwargs.items() if key != 'QueueUrl'}
+      entry['Id'] = str(index)
+      entries.append(entry)
+    return {'QueueUrl': group[0], 'Entries': entries}
+
+
+  def results(self, response, calls):
+    results = [None] * len(calls)
+    for entry in response.get('Successful', ()):
+      results[int(entry['Id'])] = {key: value for key, value in entry.items() if key != 'Id'}
+    for entry in response.get('Failed', ()):
+      results[int(entry['Id'])] = self.error(entry.get('Code'), entry.get('Message'))
+    return [self.error('InternalError', 'The message is missing from the batch response') if result is None else result for result in results]
+
+
+  def size(self, kwargs):
+    size = len(kwargs.get('MessageBody', '').encode('utf-8'))
+    for name, attribute in kwargs.get('MessageAttributes', {}).items():
+      size += len(name) + len(attribute.get('DataType', ''))
+      size += len(attribute.get('StringValue', '').encode('utf-8')) + len(attribute.get('BinaryValue', b''))
+    return size
+
+
+class _PutItem(_BatchSpec):
+
+
+  batch_method = 'batch_write_item'
+  # Raised for the whole batch when it holds two puts of the same key
+  fallback_codes = ('ValidationException',)
+  group_keys = ('TableName',)
+  max_bytes = 16 * 1024 * 1024
+  max_count = 25
+  operation_name = 'PutItem'
+
+
+  def accepts(self, kwargs):
+    # Conditions and return values only exist for single item writes
+    return set(kwargs) == {'TableName', 'Item'}
+
+
+  def request(self, group, calls):
+    return {'RequestItems': {group[0]: [{'PutRequest': {'Item': call.kwargs['Item']}} for call in calls]}}
+
+
+  def results(self, response, calls):
+    unprocessed = [request['PutRequest']['Item'] for requests in response.get('UnprocessedItems', {}).values() for request in requests]
+    results = []
+    for call in calls:
+      if call.kwargs['Item'] in unprocessed:
+        unprocessed.remove(call.kwargs['Item'])
+        results.append(_RETRY)
+      else:
+        results.append({'ResponseMetadata': response.get('ResponseMetadata', {})})
+    return results
+
+
+  def size(self, kwargs):
+    return len(repr(kwargs['Item']))
+
+
+class _PutRecord(_BatchSpec):
+
+
+  batch_method = 'put_record_batch'
+  group_keys = ('DeliveryStreamName',)
+  max_bytes = 4 * 1024 * 1024
+  max_count = 500
+  operation_name = 'PutRecord'
+
+
+  def request(self, group, calls):
+    return {'DeliveryStreamName': group[0], 'Records': [call.kwargs['Record'] for call in calls]}
+
+
+  def results(self, response, calls):
+    results = []
+    for entry in response.get('RequestResponses', ()):
+      if entry.get('ErrorCode'):
+        results.append(self.error(entry['ErrorCode'], entry.get('ErrorMessage')))
+      else:
+        results.append({'RecordId': entry['RecordId'], 'Encrypted': response.get('Encrypted', False)})
+    return results
+
+
+  def size(self, kwargs):
+    return len(kwargs['Record'].get('Data', b''))
+
+
+SPECS = {
+  'put_item': _PutItem(),
+  'put_record': _PutRecord(),
+  'send_message': _SendMessage(),
+}
+
+
+class _Call(object):
+
+
+  __slots__ = ('attempts', 'future', 'kwargs', 'size')
+
+
+  def __init__(self, kwargs, size):
+    self.attempts = 0
+    self.future = Future()
+    self.kwargs = kwargs
+    self.size = size
+
+
+class _Batch(object):
+
+
+  def __init__(self, client, func, spec, group, limits, deadline):
+    self.calls = []
+    self.client = client
+    self.deadline = deadline
+    self.func = func
+    self.group = group
+    self.limits = limits
+    self.size = 0
+    self.spec = spec
+
+
+class WriteBatcher(object):
+  """
+  A decorator that transparently buffers single item writes and sends them as batch calls.
+
+  Supports sqs send_message (sent as send_message_batch), dynamodb put_item (batch_write_item) and firehose put_record
+  (put_record_batch). Calls are grouped by client and queue, table or delivery stream, and a group is sent when it
+  reaches the batch API's item count or size limit, or when its oldest call has waited for linger seconds. Per-item
+  failures are raised to their own caller as a botocore ClientError, and DynamoDB's unprocessed items are retried.
+  Calls that cannot be batched, such as put_item with a ConditionExpression, are sent unchanged.
+
+    batcher = WriteBatcher(linger=0.05)
+    boto3.session.Session.add_client_decorator('sqs', 'send_message', batcher)
+
+  With wait=True (the default) callers block until their item's batch has been sent and get the same response a
+  single call would return, so batching only helps when many threads write concurrently. With wait=False calls
+  return a concurrent.futures.Future immediately, letting a single thread fill whole batches.
+  """
+
+
+  def __init__(self, linger=0.05, max_count=None, max_bytes=None, wait=True, max_attempts=3):
+    """
+    Arguments:
+    linger -- the longest time in seconds a call waits for its batch to fill.
+    max_count -- caps the number of items per batch below the batch API's limit.
+    max_bytes -- caps the estimated payload size per batch below the batch API's limit.
+    wait -- if True, calls block and return their response, if False they return a Future.
+    max_attempts -- the number of times an unprocessed DynamoDB item is sent before failing.
+    """
+    self.__batches = {}
+    self.__closed = False
+    self.__condition = Condition()
+    self.__linger = linger
+    self.__max_attempts = max_attempts
+    self.__max_bytes = max_bytes
+    self.__max_count = max_count
+    self.__thread = None
+    self.__wait = wait
+    _batchers.add(self)
+    # Lets an idle linger thread exit once the batcher is collected
+    finalize(self, _wake, self.__condition)
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+    assert method_name in SPECS, 'WriteBatcher cannot batch {}, only {}'.format(method_name, ', '.join(sorted(SPECS)))
+    spec = SPECS[method_name]
+    limits = (min(spec.max_count, self.__max_count or spec.max_count), min(spec.max_bytes, self.__max_bytes or spec.max_bytes))
+
+    @wraps(func)
+    def batched_call(client, *args, **kwargs):
+      if args or self.__closed or not spec.accepts(kwargs):
+        return func(client, *args, **kwargs)
+      size = spec.size(kwargs)
+      if size >= limits[1]:
+        return func(client, **kwargs)
+      call = _Call(kwargs, size)
+      self.__add(_Batch(client, func, spec, spec.group(kwargs), limits, None), call)
+      return call.future.result() if self.__wait else call.future
+
+    return batched_call
+
+
+  def close(self):
+    """
+    Sends every buffered call and stops the linger thread. Calls made afterwards are sent unbatched.
+    """
+    with self.__condition:
+      self.__closed = True
+      self.__condition.notify()
+    self.flush()
+    if self.__thread is not None:
+      self.__thread.join()
+    _batchers.discard(self)
+
+
+  def flush(self):
+    """
+    Sends every buffered call now.
+    """
+    while True:
+      with self.__condition:
+        batches = list(self.__batches.values())
+        self.__batches.clear()
+      if not batches:
+        return
+      # Sending may buffer unprocessed items again
+      for batch in batches:
+        self.__send(batch)
+
+
+  def __add(self, template, call):
+    max_count, max_bytes = template.limits
+    key = (template.client, template.func.__name__, template.group)
+    ready = []
+    with self.__condition:
+      batch = self.__batches.get(key)
+      if batch is not None and batch.size + call.size > max_bytes:
+        ready.append(self.__batches.pop(key))
+        batch = None
+      if batch is None:
+        batch = self.__batches[key] = _Batch(template.client, template.func, template.spec, template.group, template.limits, monotonic() + self.__linger)
+        self.__condition.notify()
+      batch.calls.append(call)
+      batch.size += call.size
+      if len(batch.calls) >= max_count:
+        ready.append(self.__batches.pop(key))
+      if self.__thread is None:
+        self.__thread = Thread(target=WriteBatcher.__run, args=(ref(self), self.__condition), name='WriteBatcher', daemon=True)
+        self.__thread.start()
+    for batch in ready:
+      self.__send(batch)
+
+
+  @staticmethod
+  def __run(batcher_ref, condition):
+    # Holds the batcher weakly while nothing is buffered, so that an unused batcher can be collected
+    while True:
+      with condition:
+        self = batcher_ref()
+        if self is None or self.__closed:
+          return
+        now = monotonic()
+        due = [key for key, batch in self.__batches.items() if batch.deadline <= now]
+        ready = [self.__batches.pop(key) for key in due]
+        if not ready:
+          deadlines = [batch.deadline for batch in self.__batches.values()]
+          if not deadlines:
+            self = None
+          condition.wait(min(deadlines) - now if deadlines else None)
+          continue
+      for batch in ready:
+        self.__send(batch)
+      self = None
+
+
+  def __send(self, batch):
+    # Also runs on the linger thread, so it must not raise, and every call must be resolved or requeued, otherwise
+    # its caller would wait forever
+    requeued = set()
+    try:
+      self.__send_batch(batch, requeued)
+      error = None
+    except Exception as e:
+      error = e
+    for call in batch.calls:
+      if call not in requeued and not call.future.done():
+        # Each caller raises its own exception, so their tracebacks are not chained onto one shared instance
+        if error is None:
+          call.future.set_exception(batch.spec.error('InternalError', 'The item is missing from the batch response'))
+        else:
+          call.future.set_exception(_copy_exception(error))
+
+
+  def __send_batch(self, batch, requeued):
+    spec = batch.spec
+    try:
+      response = getattr(batch.client, spec.batch_method)(**spec.request(batch.group, batch.calls))
+    except ClientError as e:
+      if e.response.get('Error', {}).get('Code') not in spec.fallback_codes:
+        raise
+      for call in batch.calls:
+        self.__send_single(batch, call)
+      return
+    for call, result in zip(batch.calls, spec.results(response, batch.calls)):
+      if result is _RETRY:
+        call.attempts += 1
+        if call.attempts < self.__max_attempts:
+          requeued.add(call)
+          self.__add(batch, call)
+        else:
+          call.future.set_exception(spec.error('UnprocessedItem', 'The item was still unprocessed after {} attempts'.format(call.attempts)))
+      elif isinstance(result, Exception):
+        call.future.set_exception(result)
+      else:
+        call.future.set_result(result)
+
+
+  @staticmethod
+  def __send_single(batch, call):
+    try:
+      call.future.set_result(batch.func(batch.client, **call.kwargs))
+    except Exception as e:
+      call.future.set_exception(e)
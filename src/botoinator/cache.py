@@ -0,0 +1,281 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+from collections import OrderedDict, namedtuple
+from copy import deepcopy
+from functools import wraps
+from threading import Lock
+from time import monotonic, time
+
+from .keys import call_key, canonical
+
+
+class CacheStats(namedtuple('CacheStats', ('hits', 'misses', 'evictions', 'size'))):
+  """
+  A snapshot of a ResponseCache's counters.
+
+  hits -- calls answered from the cache.
+  misses -- calls that went to AWS (including calls that could not be cached).
+  evictions -- entries dropped to make room for new ones or because they expired.
+  size -- the number of entries currently held, or None if the backend cannot tell.
+  """
+
+
+  __slots__ = ()
+
+
+class MemoryBackend(object):
+  """
+  A size-bounded, thread-safe, in-process LRU store with per-entry expiry.
+  """
+
+
+  def __init__(self, maxsize=1024):
+    assert maxsize > 0, 'maxsize must be greater than 0'
+    self.__entries = OrderedDict()
+    self.__evictions = 0
+    self.__lock = Lock()
+    self.__maxsize = maxsize
+
+
+  def __len__(self):
+    return len(self.__entries)
+
+
+  @property
+  def evictions(self):
+    return self.__evictions
+
+
+  def clear(self):
+    with self.__lock:
+      self.__entries.clear()
+
+
+  def get(self, key):
+    """
+    Returns (True, value) for a live entry, or (False, None).
+
+    Arguments:
+    key -- the hashable key of the entry.
+    """
+    with self.__lock:
+      entry = self.__entries.get(key)
+      if entry is None:
+        return False, None
+      expires, value = entry
+      if expires <= monotonic():
+        del self.__entries[key]
+        self.__evictions += 1
+        return False, None
+      self.__entries.move_to_end(key)
+      return True, value
+
+
+  def set(self, key, value, ttl):
+    """
+    Stores the value for ttl seconds, evicting the least recently used entries beyond maxsize.
+
+    Arguments:
+    key -- the hashable key of the entry.
+    value -- the value to store.
+    ttl -- the number of seconds the entry lives for.
+    """
+    with self.__lock:
+      self.__entries[key] = (monotonic() + ttl, value)
+      self.__entries.move_to_end(key)
+      while len(self.__entries) > self.__maxsize:
+        self.__entries.popitem(last=False)
+        self.__evictions += 1
+
+
+class FileBackend(object):
+  """
+  A store that keeps each entry as a pickle file in a directory, so that worker processes on the same host can share it.
+
+  Entries are written atomically and expire by wall clock time. The directory is not size-bounded, expired entries are
+  removed when they are read or by calling purge().
+  """
+
+
+  def __init__(self, directory):
+    os.makedirs(directory, exist_ok=True)
+    self.__directory = directory
+    self.__evictions = 0
+
+
+  def __len__(self):
+    return len([name for name in os.listdir(self.__directory) if name.endswith('.entry')])
+
+
+  @property
+  def evictions(self):
+    return self.__evictions
+
+
+  def clear(self):
+    for name in os.listdir(self.__directory):
+      if name.endswith('.entry'):
+        self.__remove(os.path.join(self.__directory, name))
+
+
+  def get(self, key):
+    """
+    Returns (True, value) for a live entry, or (False, None).
+
+    Arguments:
+    key -- the key of the entry, a tuple of normalized values such as call_key() returns.
+    """
+    path = self.__path(key)
+    try:
+      with open(path, 'rb') as entry_file:
+        expires, value = pickle.load(entry_file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+      return False, None
+    if expires <= time():
+      if self.__remove(path):
+        self.__evictions += 1
+      return False, None
+    return True, value
+
+
+  def purge(self):
+    """
+    Removes every expired entry from the directory.
+    """
+    now = time()
+    for name in os.listdir(self.__directory):
+      if not name.endswith('.entry'):
+        continue
+      path = os.path.join(self.__directory, name)
+      try:
+        with open(path, 'rb') as entry_file:
+          expires, _ = pickle.load(entry_file)
+      except (OSError, EOFError, pickle.UnpicklingError):
+        continue
+      if expires <= now and self.__remove(path):
+        self.__evictions += 1
+
+
+  def set(self, key, value, ttl):
+    """
+    Stores the value for ttl seconds.
+
+    Arguments:
+    key -- the key of the entry, a tuple of normalized values such as call_key() returns.
+    value -- the picklable value to store.
+    ttl -- the number of seconds the entry lives for.
+    """
+    descriptor, temporary_path = tempfile.mkstemp(dir=self.__directory, suffix='.tmp')
+    try:
+      with os.fdopen(descriptor, 'wb') as entry_file:
+        pickle.dump((time() + ttl, value), entry_file, pickle.HIGHEST_PROTOCOL)
+      os.replace(temporary_path, self.__path(key))
+    except BaseException:
+      self.__remove(temporary_path)
+      raise
+
+
+  def __path(self, key):
+    return os.path.join(self.__directory, hashlib.sha256(canonical(key)).hexdigest() + '.entry')
+
+
+  @staticmethod
+  def __remove(path):
+    try:
+      os.remove(path)
+      return True
+    except OSError:
+      return False
+
+
+class ResponseCache(object):
+  """
+  A decorator that caches the responses of idempotent client calls, such as describe_*, get_parameter or list_*.
+
+  Register the same instance with add_client_decorator or register_client_decorator on every method it should cache,
+  for example:
+
+    cache = ResponseCache(maxsize=4096, ttl=60, ttls={'get_parameter': 300})
+    boto3.session.Session.add_client_decorator('ssm', 'get_parameter', cache)
+
+  Calls are keyed by the client's service, region, endpoint and access key, the method name and the normalized
+  keyword arguments, so sessions using different credentials never share entries. Errors, streaming responses and
+  calls with arguments that cannot be normalized are never cached.
+  """
+
+
+  def __init__(self, maxsize=1024, ttl=60, ttls=None, backend=None, copy=True):
+    """
+    Arguments:
+    maxsize -- the maximum number of entries of the default in-memory backend.
+    ttl -- the default number of seconds a response is cached for.
+    ttls -- a dict of method name to the number of seconds its responses are cached for, overriding ttl.
+    backend -- the store to use instead of a MemoryBackend, such as a FileBackend shared between worker processes.
+    copy -- if True, callers get a deep copy of the cached response so that they cannot alter the cache.
+    """
+    self.__backend = backend if backend is not None else MemoryBackend(maxsize)
+    self.__copy = copy
+    self.__hits = 0
+    self.__lock = Lock()
+    self.__misses = 0
+    self.__ttl = ttl
+    self.__ttls = dict(ttls or {})
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+    ttl = self.__ttls.get(method_name, self.__ttl)
+
+    @wraps(func)
+    def cached_call(client, *args, **kwargs):
+      try:
+        key = call_key(client, method_name, kwargs)
+      except TypeError:
+        key = None
+      if key is not None and not args:
+        found, response = self.__backend.get(key)
+        if found:
+          self.__count(hit=True)
+          return deepcopy(response) if self.__copy else response
+      self.__count(hit=False)
+      response = func(client, *args, **kwargs)
+      if key is not None and not args and ttl > 0 and not self.__is_streaming(response):
+        self.__backend.set(key, deepcopy(response) if self.__copy else response, ttl)
+      return response
+
+    return cached_call
+
+
+  @property
+  def stats(self):
+    """
+    The CacheStats of this cache.
+    """
+    try:
+      size = len(self.__backend)
+    except TypeError:
+      size = None
+    return CacheStats(self.__hits, self.__misses, self.__backend.evictions, size)
+
+
+  def clear(self):
+    """
+    Removes every entry from the cache.
+    """
+    self.__backend.clear()
+
+
+  def __count(self, hit):
+    with self.__lock:
+      if hit:
+        self.__hits += 1
+      else:
+        self.__misses += 1
+
+
+  @staticmethod
+  def __is_streaming(response):
+    return isinstance(response, dict) and any(hasattr(value, 'read') for value in response.values())
@@ -0,0 +1,254 @@
+import atexit
+import base64
+import hashlib
+import io
+import json
+import mmap
+import struct
+import zlib
+
+from botocore.exceptions import ClientError
+from datetime import datetime
+from botocore.response import StreamingBody
+from functools import wraps
+from threading import Lock
+from time import perf_counter, sleep
+
+from .keys import canonical, normalize
+
+
+MAGIC = b'BOTOCAS2'
+# The magic, then the offset and length of the index, which follows the records
+HEADER = struct.Struct('>8sQQ')
+RECORD = 0
+REPLAY = 1
+
+
+def cassette_key(client, method_name, kwargs):
+  """
+  Returns the 16 byte digest a call is recorded under: its service, region, method and normalized arguments.
+
+  Endpoints and credentials are left out, so that a cassette recorded with one account can be replayed offline with
+  any other.
+
+  Arguments:
+  client -- the botocore client making the call.
+  method_name -- the client method name of the operation.
+  kwargs -- the keyword arguments of the call.
+  """
+  meta = client.meta
+  key = (meta.service_model.service_name, meta.region_name, method_name, normalize(kwargs))
+  return hashlib.blake2b(canonical(key), digest_size=16).digest()
+
+
+def encode(value):
+  """
+  Returns a JSON serializable form of a botocore response value, which decode() turns back into the value.
+
+  bytes and datetimes are tagged as single key dicts such as {'$bytes': base64}. Dicts with keys that are not strings,
+  or that start with '$', are stored as {'$dict': [[key, value]...]}. Tuples become lists. Raises TypeError for
+  other types.
+
+  Arguments:
+  value -- the value to encode.
+  """
+  if value is None or isinstance(value, (bool, int, float, str)):
+    return value
+  if isinstance(value, dict):
+    if all(isinstance(key, str) and not key.startswith('$') for key in value):
+      return {key: encode(item) for key, item in value.items()}
+    return {'$dict': [[encode(key), encode(item)] for key, item in value.items()]}
+  if isinstance(value, (list, tuple)):
+    return [encode(item) for item in value]
+  if isinstance(value, (bytes, bytearray)):
+    return {'$bytes': base64.b64encode(value).decode('ascii')}
+  if isinstance(value, datetime):
+    return {'$datetime': value.isoformat()}
+  raise TypeError('{} values cannot be recorded'.format(type(value).__name__))
+
+
+def decode(value):
+  """
+  Returns the value of an encode() result.
+
+  Arguments:
+  value -- the decoded JSON value.
+  """
+  if isinstance(value, list):
+    return [decode(item) for item in value]
+  if not isinstance(value, dict):
+    return value
+  if len(value) == 1:
+    tag, data = next(iter(value.items()))
+    if tag == '$bytes':
+      return base64.b64decode(data)
+    if tag == '$datetime':
+      return datetime.fromisoformat(data)
+    if tag == '$dict':
+      return {decode(key): decode(item) for key, item in data}
+  return {key: decode(item) for key, item in value.items()}
+
+
+class Cassette(object):
+  """
+  A decorator recording client calls to a file, or replaying them from it without calling AWS.
+
+  Recording stores each call's response (streaming bodies are read and stored whole), or its ClientError, and how long
+  it took. Records are compressed JSON documents appended to the file (see encode()), followed by an index of call
+  digest to record offsets that is written by close() (or at exit). Cassettes only hold data, so replaying one never
+  runs code from it. Replaying memory maps the file and loads only the index, so each call is a dict lookup and the
+  read of one record. Identical calls are replayed in the order they were recorded, the last one being repeated.
+  Install it on every operation with:
+
+    cassette = Cassette('calls.cassette', mode=Cassette.RECORD)
+    boto3.session.Session.add_client_decorator('*', AnyOperation(), cassette)
+
+  Calls with arguments that cannot be normalized (such as file bodies) are passed through when recording and raise
+  KeyError when replaying, as do calls that were not recorded. Calls made after a recording cassette is closed are
+  passed through.
+  """
+
+
+  RECORD = RECORD
+  REPLAY = REPLAY
+
+
+  def __init__(self, path, mode=REPLAY, latency=0.0, compress=True):
+    """
+    Arguments:
+    path -- the path of the cassette file. Recording replaces it.
+    mode -- Cassette.RECORD or Cassette.REPLAY.
+    latency -- when replaying, calls sleep for their recorded duration times latency. 0 replays as fast as possible,
+      1.0 at the recorded speed.
+    compress -- if True, records are compressed with zlib when recording.
+    """
+    assert mode in (RECORD, REPLAY), 'mode must be Cassette.RECORD or Cassette.REPLAY'
+    self.__closed = False
+    self.__compress = compress
+    self.__index = {}
+    self.__latency = latency
+    self.__lock = Lock()
+    self.__mode = mode
+    self.__path = path
+    self.__positions = {}
+    if mode == RECORD:
+      self.__file = open(path, 'wb')
+      self.__file.write(HEADER.pack(MAGIC, 0, 0))
+      atexit.register(self.close)
+    else:
+      with open(path, 'rb') as cassette_file:
+        self.__map = mmap.mmap(cassette_file.fileno(), 0, access=mmap.ACCESS_READ)
+      magic, index_offset, index_length = HEADER.unpack_from(self.__map)
+      assert magic == MAGIC, '{} is not a cassette'.format(path)
+      assert index_offset, '{} was not closed after recording'.format(path)
+      index = json.loads(zlib.decompress(self.__map[index_offset:index_offset + index_length]).decode('utf-8'))
+      self.__index = {bytes.fromhex(key): offsets for key, offsets in index.items()}
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+
+    @wraps(func)
+    def cassette_call(client, *args, **kwargs):
+      try:
+        key = cassette_key(client, method_name, kwargs)
+      except TypeError:
+        key = None
+      if self.__mode == REPLAY:
+        if key is None or args:
+          raise KeyError('{} calls with these arguments cannot be replayed'.format(method_name))
+        return self.__replay(client, method_name, key)
+      if key is None or args:
+        return func(client, *args, **kwargs)
+      start = perf_counter()
+      try:
+        response = func(client, *args, **kwargs)
+      except ClientError as e:
+        self.__record(key, perf_counter() - start, (e.response, e.operation_name), True)
+        raise
+      seconds = perf_counter() - start
+      response, bodies = self.__read_bodies(response)
+      self.__record(key, seconds, (response, bodies), False)
+      return self.__with_bodies(response, bodies)
+
+    return cassette_call
+
+
+  def __len__(self):
+    return sum(len(offsets) for offsets in self.__index.values())
+
+
+  def close(self):
+    """
+    Writes the index of a recording cassette and closes its file, or unmaps the file of a replaying one.
+    """
+    with self.__lock:
+      if self.__closed:
+        return
+      self.__closed = True
+      if self.__mode == REPLAY:
+        self.__map.close()
+        return
+      index = zlib.compress(json.dumps({key.hex(): offsets for key, offsets in self.__index.items()}).encode('utf-8'))
+      index_offset = self.__file.tell()
+      self.__file.write(index)
+      self.__file.seek(0)
+      self.__file.write(HEADER.pack(MAGIC, index_offset, len(index)))
+      self.__file.close()
+    atexit.unregister(self.close)
+
+
+  @staticmethod
+  def __read_bodies(response):
+    if not isinstance(response, dict):
+      return response, {}
+    bodies = {name: value.read() for name, value in response.items() if isinstance(value, StreamingBody)}
+    if bodies:
+      response = {name: value for name, value in response.items() if name not in bodies}
+    return response, bodies
+
+
+  def __record(self, key, seconds, outcome, failed):
+    try:
+      record = json.dumps([seconds, failed, encode(outcome)], separators=(',', ':')).encode('utf-8')
+    except (TypeError, ValueError):
+      # Responses holding live objects, such as event streams, are not recorded
+      return
+    if self.__compress:
+      record = zlib.compress(record, 1)
+    with self.__lock:
+      if self.__closed:
+        # The call has been made, its response is returned unrecorded
+        return
+      offset = self.__file.tell()
+      self.__file.write(record)
+      self.__index.setdefault(key, []).append((offset, len(record), self.__compress))
+
+
+  def __replay(self, client, method_name, key):
+    offsets = self.__index.get(key)
+    if offsets is None:
+      raise KeyError('no {} call with these arguments was recorded in {}'.format(method_name, self.__path))
+    with self.__lock:
+      position = self.__positions.get(key, 0)
+      self.__positions[key] = position + 1
+    offset, length, compressed = offsets[min(position, len(offsets) - 1)]
+    record = self.__map[offset:offset + length]
+    seconds, failed, outcome = json.loads((zlib.decompress(record) if compressed else record).decode('utf-8'))
+    outcome = decode(outcome)
+    if self.__latency:
+      sleep(seconds * self.__latency)
+    if failed:
+      error_response, operation_name = outcome
+      raise client.exceptions.from_code(error_response.get('Error', {}).get('Code'))(error_response, operation_name)
+    return self.__with_bodies(*outcome)
+
+
+  @staticmethod
+  def __with_bodies(response, bodies):
+    if not bodies:
+      return response
+    response = dict(response)
+    for name, body in bodies.items():
+      response[name] = StreamingBody(io.BytesIO(body), len(body))
+    return response
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from .keys import normalize
+
+
+def client_key(service_name, region_name=None, api_version=None, **kwargs):
+  """
+  Returns a hashable key identifying the client that session.client() would create for the arguments.
+
+  botocore Config objects are keyed by the options they were given, other arguments by their normalized value.
+
+  Arguments:
+  service_name -- the boto3 name of the service.
+  region_name -- the region of the client.
+  api_version -- the API version of the client.
+  kwargs -- the other keyword arguments of session.client(), such as endpoint_url or config.
+  """
+  config = kwargs.pop('config', None)
+  if config is not None:
+    try:
+      config = normalize(config._user_provided_options)
+    except (AttributeError, TypeError):
+      # Config objects compare by identity, keying by the object itself keeps it alive while its client is cached
+      config = ('config', config)
+  return service_name, region_name, api_version, normalize(kwargs), config
+
+
+class ClientCache(object):
+  """
+  A thread-safe LRU cache of clients with optional idle expiry.
+
+  Cache hits only take a short lock. Clients are created one at a time, since boto3 sessions are not safe to create
+  clients from concurrently, and a client requested by several threads at once is only created once.
+  """
+
+
+  def __init__(self, maxsize=32, idle=None):
+    """
+    Arguments:
+    maxsize -- the number of clients kept, the least recently used ones are evicted first.
+    idle -- the number of seconds an unused client is kept for, or None to keep it until it is evicted.
+    """
+    assert maxsize > 0, 'maxsize must be greater than 0'
+    self.__clients = OrderedDict()
+    self.__create_lock = Lock()
+    self.__evictions = 0
+    self.__idle = idle
+    self.__lock = Lock()
+    self.__maxsize = maxsize
+
+
+  def __len__(self):
+    return len(self.__clients)
+
+
+  @property
+  def evictions(self):
+    """
+    The number of clients evicted because the cache was full or because they were idle.
+    """
+    return self.__evictions
+
+
+  def clear(self):
+    """
+    Removes every client from the cache.
+    """
+    with self.__lock:
+      self.__clients.clear()
+
+
+  def discard(self, predicate):
+    """
+    Removes the clients for which predicate(key, client) is true.
+
+    Arguments:
+    predicate -- a function of the key and client returning True for the clients to remove.
+    """
+    with self.__lock:
+      for key in [key for key, entry in self.__clients.items() if predicate(key, entry[0])]:
+        del self.__clients[key]
+
+
+  def get(self, key, create):
+    """
+    Returns the cached client of the key, calling create() to create it if it is not cached.
+
+    Arguments:
+    key -- the hashable key of the client, see client_key().
+    create -- a function without arguments returning the new client.
+    """
+    client = self.__lookup(key)
+    if client is None:
+      with self.__create_lock:
+        client = self.__lookup(key)
+        if client is None:
+          client = create()
+          self.__store(key, client)
+    return client
+
+
+  def __lookup(self, key):
+    with self.__lock:
+      entry = self.__clients.get(key)
+      if entry is None:
+        return None
+      now = monotonic()
+      if self.__idle is not None and now - entry[1] > self.__idle:
+        del self.__clients[key]
+        self.__evictions += 1
+        return None
+      entry[1] = now
+      self.__clients.move_to_end(key)
+      return entry[0]
+
+
+  def __store(self, key, client):
+    with self.__lock:
+      now = monotonic()
+      self.__clients[key] = [client, now]
+      self.__clients.move_to_end(key)
+      while len(self.__clients) > self.__maxsize:
+        self.__clients.popitem(last=False)
+        self.__evictions += 1
+      if self.__idle is not None:
+        # Least recently used clients come first, so expired ones are at the front
+        while self.__clients:
+          oldest = next(iter(self.__clients.values()))
+          if now - oldest[1] <= self.__idle:
+            break
+          self.__clients.popitem(last=False)
+          self.__evictions += 1
@@ -0,0 +1,49 @@
+import boto3
+import botocore.session
+import os
+
+from threading import Lock
+
+
+# Components only holding data loaded from botocore's and boto3's JSON models. Credentials, config and event
+# handlers stay with each session.
+SHARED_COMPONENTS = ('data_loader',)
+SHARED_INTERNAL_COMPONENTS = ('default_config_resolver', 'endpoint_resolver', 'exceptions_factory')
+
+_owners = {}
+_owners_lock = Lock()
+
+
+def use_shared_components(session):
+  """
+  Makes a boto3 session use the process-wide loader, endpoint resolver and exceptions factory of its data path.
+
+  Sessions sharing them parse each service, paginator and endpoint model once between them and hold a single copy
+  of it. Must be called before the session creates any client or resource.
+
+  Arguments:
+  session -- the boto3 session.
+  """
+  botocore_session = session._session
+  owner = _owner(botocore_session.get_config_variable('data_path'))
+  for name in SHARED_COMPONENTS:
+    botocore_session.register_component(name, owner.get_component(name))
+  for name in SHARED_INTERNAL_COMPONENTS:
+    botocore_session._register_internal_component(name, owner._get_internal_component(name))
+  session._loader = botocore_session.get_component('data_loader')
+
+
+def _owner(data_path):
+  owner = _owners.get(data_path)
+  if owner is None:
+    with _owners_lock:
+      owner = _owners.get(data_path)
+      if owner is None:
+        # A session of its own, so that no user session (and its credentials) is kept alive by the shared components
+        owner = botocore.session.get_session()
+        owner.set_config_variable('data_path', data_path)
+        owner.get_component('data_loader').search_paths.append(os.path.join(os.path.dirname(boto3.__file__), 'data'))
+        for name in SHARED_INTERNAL_COMPONENTS:
+          owner._get_internal_component(name)
+        _owners[data_path] = owner
+  return owner
@@ -0,0 +1,73 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+
+
+def fan_out(get_executor, get_client, method_name, kwargs_iterable, max_workers=8, max_in_flight=None, ordered=True, return_exceptions=False):
+  """
+  Calls a client method once per item of kwargs_iterable on a pool of threads, returning a generator of the results.
+
+  The arguments are checked when fan_out() is called, rather than when the generator is first iterated. At most
+  max_in_flight calls are submitted at a time, and the iterable is only consumed as results are taken, so an
+  unbounded iterable can be fanned out with bounded memory. Closing the generator cancels the calls not started yet
+  and waits for the running ones.
+
+  Arguments:
+  get_executor -- a function without arguments returning the executor of max_workers threads to call from. It is
+    not shut down, so that its threads can be reused.
+  get_client -- a function without arguments returning the client of the calling worker thread.
+  method_name -- the client method to call, such as 'get_item'.
+  kwargs_iterable -- an iterable of the keyword argument dicts of each call.
+  max_workers -- the number of worker threads of the executor.
+  max_in_flight -- the number of calls submitted but not yet taken by the caller, 2 * max_workers by default.
+  ordered -- if True, responses are yielded in the order of kwargs_iterable. If False, (kwargs, response) pairs are
+    yielded as the calls complete.
+  return_exceptions -- if True, the exception of a failed call is yielded in place of its response instead of being
+    raised, which ends the generator.
+  """
+  assert max_workers > 0, 'max_workers must be greater than 0'
+  max_in_flight = max_in_flight or 2 * max_workers
+  assert max_in_flight >= max_workers, 'max_in_flight must not be less than max_workers'
+  return _fan_out(get_executor(), get_client, method_name, iter(kwargs_iterable), max_in_flight, ordered, return_exceptions)
+
+
+def _fan_out(executor, get_client, method_name, items, max_in_flight, ordered, return_exceptions):
+
+  def call(kwargs):
+    return getattr(get_client(), method_name)(**kwargs)
+
+  def outcome(future):
+    if return_exceptions:
+      exception = future.exception()
+      if exception is not None:
+        return exception
+    return future.result()
+
+  pending = deque() if ordered else {}
+  try:
+    for kwargs in islice(items, max_in_flight):
+      future = executor.submit(call, kwargs)
+      if ordered:
+        pending.append(future)
+      else:
+        pending[future] = kwargs
+    while pending:
+      if ordered:
+        future = pending.popleft()
+        result = outcome(future)
+      else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        future = next(iter(done))
+        kwargs = pending.pop(future)
+        result = (kwargs, outcome(future))
+      for kwargs in islice(items, 1):
+        next_future = executor.submit(call, kwargs)
+        if ordered:
+          pending.append(next_future)
+        else:
+          pending[next_future] = kwargs
+      yield result
+  finally:
+    for future in pending:
+      future.cancel()
+    wait(list(pending))
@@ -0,0 +1,240 @@
+import math
+
+from botocore.response import StreamingBody
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+from .metrics import BUCKET_COUNT, OperationStats, bucket_index
+from .operations import ReadOnly, get_operation_index
+
+
+def _discard(future):
+  # Close the streaming bodies of losing responses so that their connections go back to the pool
+  if future.cancelled() or future.exception() is not None:
+    return
+  response = future.result()
+  if isinstance(response, dict):
+    for value in response.values():
+      if isinstance(value, StreamingBody):
+        value.close()
+
+
+class Hedger(object):
+  """
+  A decorator that sends a second, identical request when the first one is slower than usual, and returns whichever
+  response arrives first.
+
+  The hedging delay of each operation (keyed by service, operation and region) is the percentile of its recent
+  latencies, learned from a log scaled histogram. Until min_samples calls have been timed, calls are sent once on the
+  caller's thread. Afterwards each call is sent from a pool of max_workers threads, so that the caller can stop
+  waiting for it. The pool is shared by every call the hedger decorates: when all of its threads are busy, calls are
+  sent unhedged on the caller's thread rather than queued, so hedging never delays a request. Hedges are limited to a
+  fraction of the calls by a budget, so a slow service does not get twice the load, and only operations selected by
+  the safe predicate (ReadOnly by default) are ever hedged:
+
+    hedger = Hedger(percentile=95, budget=0.05)
+    boto3.session.Session.add_client_decorator('dynamodb', 'get_item', hedger, priority=10)
+
+  The losing request is cancelled if it has not started yet, otherwise its response is discarded when it arrives.
+  Give the hedger a higher priority than decorators that should run once per call, such as caches and metrics of the
+  caller's latency, and a lower one than decorators that should run per request.
+  """
+
+
+  def __init__(self, percentile=95, min_samples=20, window=1000, min_delay=0.001, max_delay=None, budget=0.05, burst=10, max_workers=16, safe=None):
+    """
+    Arguments:
+    percentile -- the latency percentile, between 0 and 100, after which a call is hedged.
+    min_samples -- the number of calls of an operation to time before hedging it.
+    window -- the number of latencies the histograms hold. Counts are halved when it is reached, so that the delay
+      follows changes in latency.
+    min_delay -- the lowest hedging delay in seconds.
+    max_delay -- the highest hedging delay in seconds, or None for no limit.
+    budget -- the fraction of calls that can be hedged.
+    burst -- the number of hedges that can be sent at once after a quiet period.
+    max_workers -- the number of threads sending requests, which caps the number of calls hedged at once. Calls made
+      while they are all busy are sent unhedged on the caller's thread.
+    safe -- the botoinator.operations.OperationPredicate selecting the operations that are safe to send twice.
+      Other operations are called unchanged. ReadOnly() by default.
+    """
+    assert 0 < percentile < 100, 'percentile must be between 0 and 100'
+    assert 0 <= budget <= 1, 'budget must be between 0 and 1'
+    self.__budget = budget
+    self.__burst = burst
+    self.__busy = 0
+    self.__bypassed = 0
+    self.__credit = 0.0
+    self.__executor = None
+    self.__executor_lock = Lock()
+    self.__hedged = 0
+    self.__histograms = {}
+    self.__lock = Lock()
+    self.__max_delay = max_delay
+    self.__max_workers = max_workers
+    self.__min_delay = min_delay
+    self.__min_samples = min_samples
+    self.__percentile = percentile
+    self.__safe = safe or ReadOnly()
+    self.__safe_methods = {}
+    self.__window = window
+    self.__won = 0
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+
+    @wraps(func)
+    def hedged_call(client, *args, **kwargs):
+      meta = client.meta
+      if not self.__is_safe(client, method_name):
+        return func(client, *args, **kwargs)
+      key = (meta.service_model.service_name, meta.method_to_api_mapping.get(method_name, method_name), meta.region_name)
+      with self.__lock:
+        self.__credit = min(self.__burst, self.__credit + self.__budget)
+      delay = self.delay(*key)
+      if delay is None or not self.__take_worker():
+        return self.__timed(key, func, client, args, kwargs)
+      executor = self.__get_executor()
+      # Each request has a thread of its own, so the delay is only spent waiting for the request itself
+      primary = executor.submit(self.__pooled, key, func, client, args, kwargs)
+      if wait((primary,), timeout=delay).done or not self.__take_hedge():
+        return primary.result()
+      pending = [primary, executor.submit(self.__pooled, key, func, client, args, kwargs)]
+      while True:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        pending.remove(winner)
+        # A failed request only wins if the other one fails too
+        if not pending or winner.exception() is None:
+          break
+      for loser in pending:
+        if not loser.cancel():
+          loser.add_done_callback(_discard)
+      if winner is not primary:
+        with self.__lock:
+          self.__won += 1
+      return winner.result()
+
+    return hedged_call
+
+
+  @property
+  def bypassed(self):
+    """
+    The number of calls sent unhedged on the caller's thread because every request thread was busy.
+    """
+    return self.__bypassed
+
+
+  @property
+  def hedged(self):
+    """
+    The number of hedging requests sent.
+    """
+    return self.__hedged
+
+
+  @property
+  def won(self):
+    """
+    The number of hedging requests that returned before the request they hedged.
+    """
+    return self.__won
+
+
+  def close(self):
+    """
+    Shuts the request threads down. They are started again if the hedger is called.
+    """
+    with self.__executor_lock:
+      executor, self.__executor = self.__executor, None
+    if executor is not None:
+      executor.shutdown(wait=True)
+
+
+  def delay(self, service_name, operation_name, region_name):
+    """
+    Returns the current hedging delay in seconds of an operation, or None if it is not hedged yet.
+
+    Arguments:
+    service_name -- the botocore name of the service.
+    operation_name -- the operation name, such as 'GetItem'.
+    region_name -- the region of the client.
+    """
+    with self.__lock:
+      histogram = self.__histograms.get((service_name, operation_name, region_name))
+      if histogram is None or histogram[0] < self.__min_samples:
+        return None
+      delay = OperationStats(histogram[0], 0, 0, 0.0, histogram[1]).percentile(self.__percentile)
+    if math.isinf(delay):
+      return self.__max_delay
+    delay = max(self.__min_delay, delay)
+    return delay if self.__max_delay is None else min(self.__max_delay, delay)
+
+
+  def __get_executor(self):
+    executor = self.__executor
+    if executor is None:
+      with self.__executor_lock:
+        if self.__executor is None:
+          self.__executor = ThreadPoolExecutor(self.__max_workers, thread_name_prefix='botoinator-hedger')
+        executor = self.__executor
+    return executor
+
+
+  def __is_safe(self, client, method_name):
+    service_model = client.meta.service_model
+    key = (service_model.service_name, service_model.api_version, method_name)
+    safe = self.__safe_methods.get(key)
+    if safe is None:
+      info = get_operation_index(client._loader, service_model.service_name, service_model.api_version).get(method_name)
+      safe = self.__safe_methods[key] = info is not None and bool(self.__safe(info))
+    return safe
+
+
+  def __pooled(self, key, func, client, args, kwargs):
+    try:
+      return self.__timed(key, func, client, args, kwargs)
+    finally:
+      with self.__lock:
+        self.__busy -= 1
+
+
+  def __record(self, key, seconds):
+    with self.__lock:
+      histogram = self.__histograms.get(key)
+      if histogram is None:
+        histogram = self.__histograms[key] = [0, [0] * (BUCKET_COUNT + 1)]
+      histogram[1][bucket_index(seconds)] += 1
+      histogram[0] += 1
+      if histogram[0] >= self.__window:
+        histogram[1] = [count // 2 for count in histogram[1]]
+        histogram[0] = sum(histogram[1])
+
+
+  def __take_hedge(self):
+    with self.__lock:
+      if self.__credit < 1 or self.__busy >= self.__max_workers:
+        return False
+      self.__busy += 1
+      self.__credit -= 1
+      self.__hedged += 1
+      return True
+
+
+  def __take_worker(self):
+    with self.__lock:
+      if self.__busy >= self.__max_workers:
+        self.__bypassed += 1
+        return False
+      self.__busy += 1
+      return True
+
+
+  def __timed(self, key, func, client, args, kwargs):
+    start = perf_counter()
+    response = func(client, *args, **kwargs)
+    self.__record(key, perf_counter() - start)
+    return response
@@ -0,0 +1,94 @@
+import base64
+import json
+
+from datetime import date, datetime
+
+
+SCALAR_TYPES = (str, bytes, int, float, bool, type(None), date, datetime)
+
+
+def call_key(client, method_name, kwargs):
+  """
+  Returns a hashable key identifying a client call.
+
+  Calls made by clients of the same service, region, endpoint and access key with equal arguments have equal keys,
+  whatever the order of their keyword arguments. Raises TypeError if an argument cannot be normalized, such as a
+  file object passed as a streaming body.
+
+  Arguments:
+  client -- the botocore client making the call.
+  method_name -- the client method name of the operation.
+  kwargs -- the keyword arguments of the call.
+  """
+  return client_identity(client), method_name, normalize(kwargs)
+
+
+def client_identity(client):
+  """
+  Returns a hashable key identifying who a client calls and as whom: its service, region, endpoint and access key.
+
+  Arguments:
+  client -- a botocore client.
+  """
+  try:
+    access_key = client._request_signer._credentials.access_key
+  except AttributeError:
+    access_key = None
+  meta = client.meta
+  return meta.service_model.service_name, meta.region_name, meta.endpoint_url, access_key
+
+
+def normalize(value):
+  """
+  Returns a hashable, order independent equivalent of a call argument.
+
+  Dicts become sorted tuples of items, lists and tuples become tuples and sets become frozensets. Raises TypeError
+  for values that cannot be normalized.
+
+  Arguments:
+  value -- the argument to normalize.
+  """
+  if isinstance(value, SCALAR_TYPES):
+    return value
+  if isinstance(value, dict):
+    return tuple(sorted((key, normalize(item)) for key, item in value.items()))
+  if isinstance(value, (list, tuple)):
+    return tuple(normalize(item) for item in value)
+  if isinstance(value, (set, frozenset)):
+    return frozenset(normalize(item) for item in value)
+  raise TypeError('cannot normalize {} for a call key'.format(type(value).__name__))
+
+
+def canonical(value):
+  """
+  Returns bytes encoding a normalized value (or a tuple of them, such as a call key) the same way in every process.
+
+  repr() is not stable enough to name shared entries by, as the iteration order of a frozenset of strings changes
+  with hash randomization. Tuples are encoded as JSON arrays, sets as their sorted encoded items and bytes, dates and
+  datetimes as tagged objects. Raises TypeError for other types.
+
+  Arguments:
+  value -- the value to encode.
+  """
+  return _dumps(_tagged(value)).encode('utf-8')
+
+
+def _dumps(value):
+  return json.dumps(value, separators=(',', ':'))
+
+
+def _tagged(value):
+  # JSON objects only ever appear as tags, as normalized dicts are tuples of items
+  if value is None or isinstance(value, (str, bool, int, float)):
+    return value
+  if isinstance(value, (list, tuple)):
+    return [_tagged(item) for item in value]
+  if isinstance(value, (set, frozenset)):
+    return {'set': sorted(_dumps(_tagged(item)) for item in value)}
+  if isinstance(value, bytes):
+    return {'bytes': base64.b64encode(value).decode('ascii')}
+  if isinstance(value, datetime):
+    return {'datetime': value.isoformat()}
+  if isinstance(value, date):
+    return {'date': value.isoformat()}
+  raise TypeError('cannot encode {} in a call key'.format(type(value).__name__))
@@ -0,0 +1,264 @@
+import json
+import math
+
+from botocore.exceptions import ClientError
+from collections import namedtuple
+from functools import wraps
+from threading import Lock, current_thread, local
+from time import perf_counter
+from weakref import ref
+
+
+BUCKETS_PER_DOUBLING = 2
+BUCKET_COUNT = 40
+MIN_LATENCY = 0.0001
+# Upper bounds in seconds of the histogram buckets, from 100µs to about 74s. A last bucket counts anything slower.
+BUCKET_BOUNDS = tuple(MIN_LATENCY * 2 ** (index / BUCKETS_PER_DOUBLING) for index in range(BUCKET_COUNT))
+
+_COUNTERS = 4
+
+
+def bucket_index(seconds):
+  """
+  Returns the index of the histogram bucket counting a latency, BUCKET_COUNT for latencies above every bound.
+
+  Arguments:
+  seconds -- the latency.
+  """
+  if seconds <= MIN_LATENCY:
+    return 0
+  return min(int(math.ceil(math.log2(seconds / MIN_LATENCY) * BUCKETS_PER_DOUBLING)), BUCKET_COUNT)
+
+
+class OperationStats(namedtuple('OperationStats', ('calls', 'errors', 'retries', 'seconds', 'buckets'))):
+  """
+  The counters and latency histogram of one operation.
+
+  calls -- the number of calls, including failed ones.
+  errors -- the number of calls that raised an exception.
+  retries -- the number of retries botocore made, as reported in the ResponseMetadata of responses and errors.
+  seconds -- the total latency of every call.
+  buckets -- the number of calls per histogram bucket, see BUCKET_BOUNDS.
+  """
+
+
+  __slots__ = ()
+
+
+  @property
+  def mean(self):
+    return self.seconds / self.calls if self.calls else 0.0
+
+
+  def percentile(self, percent):
+    """
+    Returns the upper bound of the bucket holding the percentile, inf if it is above every bound or 0.0 without calls.
+
+    Arguments:
+    percent -- the percentile, between 0 and 100.
+    """
+    rank = self.calls * percent / 100.0
+    count = 0
+    for index, bucket in enumerate(self.buckets):
+      count += bucket
+      if bucket and count >= rank:
+        return BUCKET_BOUNDS[index] if index < BUCKET_COUNT else math.inf
+    return 0.0
+
+
+class Metrics(object):
+  """
+  A decorator recording the latency, calls, errors and retries of client operations.
+
+  Calls are keyed by service name, operation name and region, and their latencies are counted in fixed, log scaled
+  histogram buckets (two per doubling from 100µs). Each thread records into its own shard, so recording takes no lock;
+  shards are only merged when a snapshot is taken. Instrument every operation of every client with:
+
+    metrics = Metrics()
+    boto3.session.Session.add_client_decorator('*', AnyOperation(), metrics)
+    print(to_prometheus(metrics.snapshot()))
+
+  Give it a higher priority than other decorators to measure them too, or a lower one to only measure the requests.
+  """
+
+
+  def __init__(self):
+    self.__generation = 0
+    self.__local = local()
+    self.__lock = Lock()
+    self.__retired = {}
+    self.__shards = []
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+
+    @wraps(func)
+    def measured_call(client, *args, **kwargs):
+      start = perf_counter()
+      try:
+        response = func(client, *args, **kwargs)
+      except ClientError as e:
+        self.__record(client, method_name, perf_counter() - start, 1, e.response.get('ResponseMetadata', {}).get('RetryAttempts', 0))
+        raise
+      except Exception:
+        self.__record(client, method_name, perf_counter() - start, 1, 0)
+        raise
+      retries = response.get('ResponseMetadata', {}).get('RetryAttempts', 0) if isinstance(response, dict) else 0
+      self.__record(client, method_name, perf_counter() - start, 0, retries)
+      return response
+
+    return measured_call
+
+
+  def reset(self):
+    """
+    Discards everything recorded so far.
+    """
+    self.snapshot(reset=True)
+
+
+  def snapshot(self, reset=False):
+    """
+    Returns a dict of (service name, operation name, region) to the OperationStats recorded so far.
+
+    Arguments:
+    reset -- if True, the recorded stats are discarded. Calls finishing while the snapshot is taken may be lost.
+    """
+    with self.__lock:
+      shards = self.__shards
+      retired = self.__retired
+      if reset:
+        self.__generation += 1
+        self.__retired = {}
+        self.__shards = []
+      else:
+        # Shards of finished threads never change again, fold them so that short lived threads do not pile up
+        self.__shards = []
+        for thread, rows in shards:
+          if thread() is None:
+            self.__merge(retired, rows)
+          else:
+            self.__shards.append((thread, rows))
+        shards = self.__shards
+      merged = {}
+      self.__merge(merged, retired)
+      for _, rows in shards:
+        self.__merge(merged, rows)
+    return {
+      key: OperationStats(row[0], row[1], row[2], row[3], tuple(row[_COUNTERS:]))
+      for key, row in merged.items()
+    }
+
+
+  @staticmethod
+  def __merge(target, rows):
+    for key, row in list(rows.items()):
+      total = target.get(key)
+      if total is None:
+        target[key] = list(row)
+      else:
+        for index, value in enumerate(row):
+          total[index] += value
+
+
+  def __record(self, client, method_name, seconds, errors, retries):
+    rows = self.__rows()
+    meta = client.meta
+    key = (meta.service_model.service_name, meta.method_to_api_mapping.get(method_name, method_name), meta.region_name)
+    row = rows.get(key)
+    if row is None:
+      row = rows[key] = [0] * (_COUNTERS + BUCKET_COUNT + 1)
+    row[0] += 1
+    row[1] += errors
+    row[2] += retries
+    row[3] += seconds
+    row[_COUNTERS + bucket_index(seconds)] += 1
+
+
+  def __rows(self):
+    shard = self.__local
+    if getattr(shard, 'generation', None) != self.__generation:
+      with self.__lock:
+        shard.generation = self.__generation
+        shard.rows = {}
+        self.__shards.append((ref(current_thread()), shard.rows))
+    return shard.rows
+
+
+def to_json(snapshot):
+  """
+  Returns a JSON document of a Metrics snapshot: a list of operations with their counters, p50/p95/p99 latencies and
+  non-empty histogram buckets as [upper bound, count] pairs (null for the unbounded last bucket).
+
+  Arguments:
+  snapshot -- the dict returned by Metrics.snapshot().
+  """
+  operations = []
+  for (service_name, operation_name, region_name), stats in sorted(snapshot.items(), key=lambda item: tuple(str(part) for part in item[0])):
+    operations.append({
+      'service': service_name,
+      'operation': operation_name,
+      'region': region_name,
+      'calls': stats.calls,
+      'errors': stats.errors,
+      'retries': stats.retries,
+      'seconds': stats.seconds,
+      'p50': _finite(stats.percentile(50)),
+      'p95': _finite(stats.percentile(95)),
+      'p99': _finite(stats.percentile(99)),
+      'buckets': [
+        [BUCKET_BOUNDS[index] if index < BUCKET_COUNT else None, count]
+        for index, count in enumerate(stats.buckets) if count
+      ]
+    })
+  return json.dumps(operations)
+
+
+def to_prometheus(snapshot, namespace='botoinator'):
+  """
+  Returns a Metrics snapshot in the Prometheus text exposition format.
+
+  Exports the counters <namespace>_client_calls_total, _client_errors_total and _client_retries_total and the
+  histogram <namespace>_client_latency_seconds, labeled with service, operation and region.
+
+  Arguments:
+  snapshot -- the dict returned by Metrics.snapshot().
+  namespace -- the prefix of the metric names.
+  """
+  items = sorted(snapshot.items(), key=lambda item: tuple(str(part) for part in item[0]))
+  lines = []
+  for name, field, description in (
+    ('calls', 'calls', 'Client operation calls.'),
+    ('errors', 'errors', 'Client operation calls that raised an exception.'),
+    ('retries', 'retries', 'Retries made by botocore for client operation calls.')
+  ):
+    metric = '{}_client_{}_total'.format(namespace, name)
+    lines.append('# HELP {} {}'.format(metric, description))
+    lines.append('# TYPE {} counter'.format(metric))
+    for key, stats in items:
+      lines.append('{}{{{}}} {}'.format(metric, _labels(key), getattr(stats, field)))
+  metric = '{}_client_latency_seconds'.format(namespace)
+  lines.append('# HELP {} Client operation call latency.'.format(metric))
+  lines.append('# TYPE {} histogram'.format(metric))
+  for key, stats in items:
+    labels = _labels(key)
+    count = 0
+    for index, bucket in enumerate(stats.buckets):
+      count += bucket
+      bound = repr(BUCKET_BOUNDS[index]) if index < BUCKET_COUNT else '+Inf'
+      lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, labels, bound, count))
+    lines.append('{}_sum{{{}}} {!r}'.format(metric, labels, stats.seconds))
+    lines.append('{}_count{{{}}} {}'.format(metric, labels, stats.calls))
+  return '\n'.join(lines) + '\n'
+
+
+def _finite(seconds):
+  return seconds if math.isfinite(seconds) else None
+
+
+def _labels(key):
+  return ','.join(
+    '{}="{}"'.format(name, str(value or '').replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+    for name, value in zip(('service', 'operation', 'region'), key)
+  )
@@ -0,0 +1,268 @@
+from botocore import xform_name
+from botocore.exceptions import DataNotFoundError
+from botocore.model import ServiceModel
+from collections import namedtuple
+from threading import Lock
+
+
+READ_ONLY_PREFIXES = ('BatchGet', 'Describe', 'Get', 'Head', 'List', 'Query', 'Scan')
+
+
+class OperationInfo(namedtuple('OperationInfo', ('name', 'method_name', 'http_method', 'pagination', 'streaming_input', 'streaming_output'))):
+  """
+  The service model metadata of a client operation.
+
+  name -- the operation name, such as 'ListObjectsV2'.
+  method_name -- the client method name, such as 'list_objects_v2'.
+  http_method -- the HTTP method of the operation.
+  pagination -- the operation's paginator configuration, or None if it cannot be paginated.
+  streaming_input -- True if the operation has a streaming input payload.
+  streaming_output -- True if the operation has a streaming output payload.
+  """
+
+
+  __slots__ = ()
+
+
+  @property
+  def paginated(self):
+    return self.pagination is not None
+
+
+class OperationIndex(object):
+  """
+  A read-only map of client method name to OperationInfo for one version of a service's API.
+
+  The service and paginator models are only loaded the first time the index is read. Indexes compare by identity so
+  that they can key the registry's match index.
+  """
+
+
+  def __init__(self, loader, service_name, api_version=None):
+    self.__api_version = api_version
+    self.__loader = loader
+    self.__lock = Lock()
+    self.__operations = None
+    self.__service_name = service_name
+
+
+  def __contains__(self, method_name):
+    return method_name in self.__index()
+
+
+  def __getitem__(self, method_name):
+    return self.__index()[method_name]
+
+
+  def __iter__(self):
+    return iter(self.__index())
+
+
+  def __len__(self):
+    return len(self.__index())
+
+
+  def __repr__(self):
+    return 'OperationIndex({!r}, {!r})'.format(self.__service_name, self.__api_version)
+
+
+  def get(self, method_name, default=None):
+    return self.__index().get(method_name, default)
+
+
+  def __index(self):
+    operations = self.__operations
+    if operations is None:
+      with self.__lock:
+        if self.__operations is None:
+          self.__operations = self.__load()
+        operations = self.__operations
+    return operations
+
+
+  def __load(self):
+    service_model = ServiceModel(
+      self.__loader.load_service_model(self.__service_name, 'service-2', self.__api_version),
+      service_name=self.__service_name
+    )
+    try:
+      pagination = self.__loader.load_service_model(self.__service_name, 'paginators-1', self.__api_version).get('pagination', {})
+    except DataNotFoundError:
+      pagination = {}
+    operations = {}
+    for operation_name in service_model.operation_names:
+      operation_model = service_model.operation_model(operation_name)
+      method_name = xform_name(operation_name)
+      operations[method_name] = OperationInfo(
+        name=operation_name,
+        method_name=method_name,
+        http_method=operation_model.http.get('method'),
+        pagination=pagination.get(operation_name),
+        streaming_input=operation_model.has_streaming_input,
+        streaming_output=operation_model.has_streaming_output
+      )
+    return operations
+
+
+_indexes = {}
+_indexes_lock = Lock()
+
+
+def get_operation_index(loader, service_name, api_version=None):
+  """
+  Returns the process-wide OperationIndex of the service's API version, creating it on first use.
+
+  Arguments:
+  loader -- the botocore loader to read the service's models with.
+  service_name -- the botocore name of the service.
+  api_version -- the API version of the service, or None for the latest.
+  """
+  key = (service_name, api_version)
+  index = _indexes.get(key)
+  if index is None:
+    with _indexes_lock:
+      index = _indexes.setdefault(key, OperationIndex(loader, service_name, api_version))
+  return index
+
+
+class OperationPredicate(object):
+  """
+  Selects client operations by their service model metadata.
+
+  Predicates can be passed anywhere a method name is accepted when registering client decorators, and can be combined
+  with &, | and ~. They never match resource methods.
+  """
+
+
+  def __init__(self, *args):
+    self._args = args
+
+
+  def __and__(self, other):
+    return AllOf(self, other)
+
+
+  def __call__(self, operation):
+    """
+    Returns True if the operation is selected.
+
+    Arguments:
+    operation -- the OperationInfo of a client operation.
+    """
+    raise NotImplementedError()
+
+
+  def __eq__(self, other):
+    return type(self) is type(other) and self._args == other._args
+
+
+  def __hash__(self):
+    return hash((type(self), self._args))
+
+
+  def __invert__(self):
+    return Not(self)
+
+
+  def __or__(self, other):
+    return AnyOf(self, other)
+
+
+  def __repr__(self):
+    return '{}({})'.format(type(self).__name__, ', '.join(repr(arg) for arg in self._args))
+
+
+class AllOf(OperationPredicate):
+  """
+  Selects operations selected by every one of the predicates.
+  """
+
+
+  def __call__(self, operation):
+    return all(predicate(operation) for predicate in self._args)
+
+
+class AnyOf(OperationPredicate):
+  """
+  Selects operations selected by any of the predicates.
+  """
+
+
+  def __call__(self, operation):
+    return any(predicate(operation) for predicate in self._args)
+
+
+class AnyOperation(OperationPredicate):
+  """
+  Selects every operation, for example to instrument all client operations at once.
+  """
+
+
+  def __call__(self, operation):
+    return True
+
+
+class HttpMethod(OperationPredicate):
+  """
+  Selects operations using one of the HTTP methods, such as HttpMethod('GET', 'HEAD').
+
+  JSON and query protocol services (DynamoDB, SQS, SSM...) send every operation with POST.
+  """
+
+
+  def __init__(self, *http_methods):
+    super().__init__(*(http_method.upper() for http_method in http_methods))
+
+
+  def __call__(self, operation):
+    return operation.http_method in self._args
+
+
+class Not(OperationPredicate):
+  """
+  Selects operations that the predicate does not select.
+  """
+
+
+  def __call__(self, operation):
+    return not self._args[0](operation)
+
+
+class Paginated(OperationPredicate):
+  """
+  Selects operations that can be paginated.
+  """
+
+
+  def __call__(self, operation):
+    return operation.paginated
+
+
+class ReadOnly(OperationPredicate):
+  """
+  Selects operations that only read state: GET and HEAD operations and operations named Describe*, Get*, List* etc.
+  """
+
+
+  def __call__(self, operation):
+    return operation.http_method in ('GET', 'HEAD') or operation.name.startswith(READ_ONLY_PREFIXES)
+
+
+class StreamingInput(OperationPredicate):
+  """
+  Selects operations with a streaming input payload, such as s3 put_object.
+  """
+
+
+  def __call__(self, operation):
+    return operation.streaming_input
+
+
+class StreamingOutput(OperationPredicate):
+  """
+  Selects operations with a streaming output payload, such as s3 get_object.
+  """
+
+
+  def __call__(self, operation):
+    return operation.streaming_output
@@ -0,0 +1,123 @@
+import jmespath
+
+from botocore.paginate import Paginator
+from functools import partial, wraps
+from queue import Queue
+from threading import Event, Semaphore, Thread
+
+from .operations import get_operation_index
+
+
+_DONE = object()
+
+
+class _Failure(object):
+
+
+  __slots__ = ('exception',)
+
+
+  def __init__(self, exception):
+    self.exception = exception
+
+
+class AutoPaginator(object):
+  """
+  A decorator that turns a paginated client operation into a lazy generator over the items of every page.
+
+  Pages are requested with the operation's paginator configuration from the service model, and up to prefetch pages
+  are fetched on a background thread while the caller consumes the current one, so memory stays bounded however many
+  pages there are. Register the same instance on every operation it should paginate, operations without a paginator
+  are left undecorated:
+
+    paginator = AutoPaginator(prefetch=2)
+    boto3.session.Session.add_client_decorator('s3', 'list_objects_v2', paginator)
+    for obj in s3.list_objects_v2(Bucket='foo'):
+      ...
+
+  Calls that pass the operation's input token themselves are sent unchanged, so manual pagination still works. The
+  botocore PaginationConfig argument (MaxItems, PageSize, StartingToken) is honored.
+  """
+
+
+  def __init__(self, prefetch=1, result_keys=None, pages=False):
+    """
+    Arguments:
+    prefetch -- the number of pages fetched ahead of the caller. 0 fetches each page when it is needed, on the
+      caller's thread.
+    result_keys -- a dict of method name to the JMESPath expression of the items to yield, overriding the operation's
+      first result key (for example 'CommonPrefixes' for list_objects_v2).
+    pages -- if True, whole response pages are yielded instead of their items.
+    """
+    assert prefetch >= 0, 'prefetch must not be negative'
+    self.__pages = pages
+    self.__prefetch = prefetch
+    self.__result_keys = {method_name: jmespath.compile(expression) for method_name, expression in (result_keys or {}).items()}
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+
+    @wraps(func)
+    def paginated_call(client, *args, **kwargs):
+      service_model = client.meta.service_model
+      info = get_operation_index(client._loader, service_model.service_name, service_model.api_version).get(method_name)
+      if args or info is None or not info.paginated or self.__has_input_token(info.pagination, kwargs):
+        return func(client, *args, **kwargs)
+      paginator = Paginator(partial(func, client), info.pagination, service_model.operation_model(info.name))
+      page_iterator = paginator.paginate(**kwargs)
+      pages = iter(page_iterator) if not self.__prefetch else self.__prefetched(page_iterator)
+      if self.__pages:
+        return pages
+      result_key = self.__result_keys.get(method_name) or page_iterator.result_keys[0]
+      return self.__items(pages, result_key)
+
+    return paginated_call
+
+
+  @staticmethod
+  def __has_input_token(pagination, kwargs):
+    input_token = pagination['input_token']
+    input_tokens = input_token if isinstance(input_token, list) else [input_token]
+    return any(token in kwargs for token in input_tokens)
+
+
+  @staticmethod
+  def __items(pages, result_key):
+    for page in pages:
+      yield from result_key.search(page) or ()
+
+
+  def __prefetched(self, page_iterator):
+    queue = Queue()
+    slots = Semaphore(self.__prefetch)
+    stop = Event()
+
+    def fetch():
+      pages = iter(page_iterator)
+      try:
+        while True:
+          slots.acquire()
+          if stop.is_set():
+            return
+          page = next(pages, _DONE)
+          queue.put(page)
+          if page is _DONE:
+            return
+      except Exception as e:
+        queue.put(_Failure(e))
+
+    Thread(target=fetch, name='AutoPaginator', daemon=True).start()
+    try:
+      while True:
+        page = queue.get()
+        if page is _DONE:
+          return
+        if isinstance(page, _Failure):
+          raise page.exception
+        # Taking a page lets the fetcher request the next one while the caller consumes this one
+        slots.release()
+        yield page
+    finally:
+      stop.set()
+      slots.release()
@@ -0,0 +1,85 @@
+import boto3
+
+from contextlib import contextmanager
+from threading import RLock
+
+
+_automatic = True
+_lock = RLock()
+
+
+def install():
+  """
+  Replaces boto3.session.Session and boto3.Session with DecoratedSession, so that every session boto3 creates
+  (including the default session behind boto3.client() and boto3.resource()) applies botoinator's decorators.
+
+  Installing is idempotent. A default session created before installing is discarded, boto3 creates a decorated one
+  the next time it needs it.
+  """
+  global _automatic
+  from .session import DecoratedSession
+  with _lock:
+    _automatic = True
+    if boto3.session.Session is DecoratedSession:
+      return
+    boto3.session.Session = DecoratedSession
+    boto3.Session = DecoratedSession
+    if boto3.DEFAULT_SESSION is not None and not isinstance(boto3.DEFAULT_SESSION, DecoratedSession):
+      boto3.DEFAULT_SESSION = None
+
+
+def uninstall():
+  """
+  Restores boto3's own Session class, and stops registering a class level decorator from installing it again.
+
+  A decorated default session is discarded. Sessions and clients that already exist keep their decoration.
+  """
+  global _automatic
+  from .session import DecoratedSession
+  with _lock:
+    _automatic = False
+    if boto3.session.Session is not DecoratedSession:
+      return
+    original = DecoratedSession.__mro__[1]
+    boto3.session.Session = original
+    boto3.Session = original
+    if isinstance(boto3.DEFAULT_SESSION, DecoratedSession):
+      boto3.DEFAULT_SESSION = None
+
+
+def is_installed():
+  """
+  Returns True if boto3 creates DecoratedSession objects.
+  """
+  from .session import DecoratedSession
+  return boto3.session.Session is DecoratedSession
+
+
+@contextmanager
+def installed():
+  """
+  A context manager that installs DecoratedSession for the duration of the block, then restores the previous state.
+  """
+  global _automatic
+  with _lock:
+    was_installed = is_installed()
+    automatic = _automatic
+    install()
+  try:
+    yield
+  finally:
+    with _lock:
+      if not was_installed:
+        uninstall()
+        _automatic = automatic
+
+
+def install_on_first_use():
+  """
+  Installs DecoratedSession unless uninstall() was called. Called when a class level decorator is registered, since
+  those only apply to sessions boto3 creates once it is installed.
+  """
+  if _automatic and not is_installed():
+    with _lock:
+      if _automatic:
+        install()
@@ -0,0 +1,141 @@
+import re
+
+from importlib import import_module
+
+from .operations import OperationPredicate
+from .registry import CLASS_ORIGIN, DecoratorRegistry
+from .waiters import WaiterHook, waiter_hook
+
+
+FORMAT_VERSION = 1
+
+
+def import_path(obj):
+  """
+  Returns the 'module:qualified.name' path that resolve_path() imports the object back from, or None if it has none.
+
+  Arguments:
+  obj -- a module level function, class or a method of one.
+  """
+  module = getattr(obj, '__module__', None)
+  qualname = getattr(obj, '__qualname__', None)
+  if not module or not qualname or '<' in qualname:
+    return None
+  path = '{}:{}'.format(module, qualname)
+  try:
+    return path if resolve_path(path) is obj else None
+  except (AttributeError, ImportError):
+    return None
+
+
+def resolve_path(path):
+  """
+  Imports and returns the object of a 'module:qualified.name' path.
+
+  Arguments:
+  path -- the import path of the object.
+  """
+  module_name, _, qualname = path.partition(':')
+  obj = import_module(module_name)
+  for name in qualname.split('.'):
+    obj = getattr(obj, name)
+  return obj
+
+
+def dump_registry(registry, names=None, origin=None):
+  """
+  Returns a JSON serializable description of a DecoratorRegistry, which load_registry() turns back into a registry.
+
+  Decorators are referenced by import path, so they must be module level functions or classes, or objects given a
+  path in names. Selectors are stored as names, regular expressions or operation predicates. Waiter decorators are
+  stored as their waiter selector and the decorator the WaiterHook applies.
+
+  Arguments:
+  registry -- the DecoratorRegistry.
+  names -- a dict of 'module:name' import path to decorator, for decorators (such as Metrics instances) that have no
+    import path of their own.
+  origin -- CLASS_ORIGIN or SESSION_ORIGIN to only describe the entries registered at that level, None for every entry.
+  """
+  paths = {id(decorator): path for path, decorator in (names or {}).items()}
+  entries = []
+  for event_name, decorator_map in registry:
+    for selector, stack in decorator_map.items():
+      for entry in stack:
+        if origin is not None and entry.origin != origin:
+          continue
+        description = {'event': event_name, 'selector': _dump_selector(selector)}
+        decorator = entry.decorator
+        if isinstance(decorator, WaiterHook):
+          description['waiter'] = _dump_selector(decorator.selector)
+          decorator = decorator.decorator
+        path = paths.get(id(decorator)) or import_path(decorator)
+        if path is None:
+          raise ValueError('decorator {!r} has no import path, give it one with DecoratedSession.name_decorator()'.format(decorator))
+        description['decorator'] = path
+        description['priority'] = entry.priority
+        entries.append((entry.sequence, description))
+  # Registration order breaks priority ties, so entries are replayed in it
+  return {'version': FORMAT_VERSION, 'decorators': [description for _, description in sorted(entries, key=lambda entry: entry[0])]}
+
+
+def iter_registrations(data):
+  """
+  Yields the (event_name, selector, decorator, priority) registrations of a dump_registry() description, importing
+  the decorators.
+
+  Arguments:
+  data -- the description.
+  """
+  assert data.get('version') == FORMAT_VERSION, 'unsupported registry format version {}'.format(data.get('version'))
+  for description in data['decorators']:
+    decorator = resolve_path(description['decorator'])
+    if 'waiter' in description:
+      decorator = waiter_hook(_load_selector(description['waiter']), decorator)
+    yield description['event'], _load_selector(description['selector']), decorator, description['priority']
+
+
+def load_registry(data):
+  """
+  Returns the class level DecoratorRegistry of a dump_registry() description.
+
+  Arguments:
+  data -- the description.
+  """
+  registry = DecoratorRegistry()
+  for event_name, selector, decorator, priority in iter_registrations(data):
+    registry = registry.with_decorator(event_name, selector, decorator, priority, CLASS_ORIGIN)
+  return registry
+
+
+def initialize_worker(data):
+  """
+  Replaces the class level decorators of DecoratedSession with the ones of a description and installs it, as a
+  worker process initializer:
+
+    ProcessPoolExecutor(initializer=botoinator.initialize_worker, initargs=(DecoratedSession.export_decorators(),))
+
+  Arguments:
+  data -- the description returned by DecoratedSession.export_decorators().
+  """
+  from .session import DecoratedSession
+  DecoratedSession.import_decorators(data)
+
+
+def _dump_selector(selector):
+  if isinstance(selector, str):
+    return {'name': selector}
+  if isinstance(selector, re.Pattern):
+    return {'regex': selector.pattern, 'flags': selector.flags}
+  path = import_path(type(selector))
+  if path is None:
+    raise ValueError('operation predicate {!r} has no import path'.format(selector))
+  return {'predicate': path, 'args': [_dump_selector(arg) if isinstance(arg, OperationPredicate) else arg for arg in selector._args]}
+
+
+def _load_selector(description):
+  if 'name' in description:
+    return description['name']
+  if 'regex' in description:
+    return re.compile(description['regex'], description['flags'])
+  args = [_load_selector(arg) if isinstance(arg, dict) else arg for arg in description['args']]
+  return resolve_path(description['predicate'])(*args)
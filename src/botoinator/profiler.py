@@ -0,0 +1,165 @@
+import random
+import tracemalloc
+
+from collections import namedtuple
+from functools import wraps
+from threading import Lock, local
+from time import perf_counter
+from weakref import WeakSet
+
+
+class ProfileStats(namedtuple('ProfileStats', ('samples', 'phased', 'seconds', 'serialize', 'send', 'parse', 'allocated', 'max_seconds'))):
+  """
+  The aggregated profile of the sampled calls of one operation.
+
+  samples -- the number of sampled calls.
+  phased -- the number of sampled calls that reached the HTTP layer, and so have serialize, send and parse times.
+  seconds -- the total wall time of the sampled calls.
+  serialize -- the total time from the call to its first HTTP send: validation, serialization, signing and the
+    decorators below the profiler.
+  send -- the total time from the first HTTP send to the parsing of the last response, including retries.
+  parse -- the total time from the parsing of the last response to the return of the call.
+  allocated -- the total net bytes allocated by the sampled calls, 0 unless memory tracing is enabled.
+  max_seconds -- the wall time of the slowest sampled call.
+  """
+
+
+  __slots__ = ()
+
+
+class Profiler(object):
+  """
+  A decorator that profiles a sampled fraction of client calls.
+
+  Sampled calls are timed in three phases, using the client's before-send and before-parse events: serialization
+  (everything up to the HTTP send), sending (up to the last response, retries included) and parsing. Calls answered
+  before reaching the HTTP layer, for instance by a Stubber, are only timed as a whole. Turn it on for a single session
+  without redeploying with:
+
+    profiler = Profiler(rate=0.01)
+    session.register_client_decorator('dynamodb', AnyOperation(), profiler)
+    print(profiler.format_report())
+
+  Calls that are not sampled only cost a random number draw.
+  """
+
+
+  def __init__(self, rate=0.01, memory=False):
+    """
+    Arguments:
+    rate -- the fraction of calls to profile, between 0 and 1.
+    memory -- if True, tracemalloc is started on the first sampled call and the net bytes allocated by each sampled
+      call are recorded. Tracing slows down the whole process, and allocations of other threads made during a sampled
+      call are counted too.
+    """
+    assert 0 <= rate <= 1, 'rate must be between 0 and 1'
+    self.__clients = WeakSet()
+    self.__local = local()
+    self.__lock = Lock()
+    self.__memory = memory
+    self.__rate = rate
+    self.__stats = {}
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+
+    @wraps(func)
+    def profiled_call(client, *args, **kwargs):
+      if not self.__rate or random.random() >= self.__rate:
+        return func(client, *args, **kwargs)
+      if client not in self.__clients:
+        self.__watch(client)
+      previous = getattr(self.__local, 'marks', None)
+      marks = self.__local.marks = [None, None]
+      allocated = None
+      if self.__memory:
+        if not tracemalloc.is_tracing():
+          tracemalloc.start()
+        allocated = tracemalloc.get_traced_memory()[0]
+      start = perf_counter()
+      try:
+        return func(client, *args, **kwargs)
+      finally:
+        end = perf_counter()
+        if allocated is not None:
+          allocated = tracemalloc.get_traced_memory()[0] - allocated
+        self.__local.marks = previous
+        self.__record(client, method_name, start, marks, end, allocated or 0)
+
+    return profiled_call
+
+
+  def format_report(self):
+    """
+    Returns the report as a text table of the mean times in milliseconds per operation, slowest first.
+    """
+    lines = ['{:<48} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10} {:>12}'.format(
+      'operation', 'samples', 'mean ms', 'serialize', 'send', 'parse', 'max ms', 'bytes'
+    )]
+    for (service_name, operation_name), stats in sorted(self.report().items(), key=lambda item: -item[1].seconds / item[1].samples):
+      phased = stats.phased or 1
+      lines.append('{:<48} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>12}'.format(
+        '{}.{}'.format(service_name, operation_name),
+        stats.samples,
+        stats.seconds * 1000 / stats.samples,
+        stats.serialize * 1000 / phased,
+        stats.send * 1000 / phased,
+        stats.parse * 1000 / phased,
+        stats.max_seconds * 1000,
+        stats.allocated // stats.samples
+      ))
+    return '\n'.join(lines)
+
+
+  def report(self, reset=False):
+    """
+    Returns a dict of (service name, operation name) to the ProfileStats of its sampled calls.
+
+    Arguments:
+    reset -- if True, the profile is discarded.
+    """
+    with self.__lock:
+      stats = self.__stats
+      if reset:
+        self.__stats = {}
+      return {key: ProfileStats(*row) for key, row in stats.items()}
+
+
+  def __before_parse(self, **kwargs):
+    marks = getattr(self.__local, 'marks', None)
+    if marks is not None:
+      marks[1] = perf_counter()
+
+
+  def __before_send(self, **kwargs):
+    marks = getattr(self.__local, 'marks', None)
+    if marks is not None and marks[0] is None:
+      marks[0] = perf_counter()
+
+
+  def __record(self, client, method_name, start, marks, end, allocated):
+    key = (client.meta.service_model.service_name, client.meta.method_to_api_mapping.get(method_name, method_name))
+    sent, parsed = marks
+    phased = sent is not None and parsed is not None
+    with self.__lock:
+      row = self.__stats.get(key)
+      if row is None:
+        row = self.__stats[key] = [0, 0, 0.0, 0.0, 0.0, 0.0, 0, 0.0]
+      row[0] += 1
+      row[2] += end - start
+      row[6] += allocated
+      row[7] = max(row[7], end - start)
+      if phased:
+        row[1] += 1
+        row[3] += sent - start
+        row[4] += parsed - sent
+        row[5] += end - parsed
+
+
+  def __watch(self, client):
+    # First, so that handlers answering the request themselves (such as moto's) cannot hide the send
+    unique_id = 'botoinator-profiler-{}'.format(id(self))
+    client.meta.events.register_first('before-send', self.__before_send, unique_id=unique_id + '-send')
+    client.meta.events.register_first('before-parse', self.__before_parse, unique_id=unique_id + '-parse')
+    self.__clients.add(client)
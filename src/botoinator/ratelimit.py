@@ -0,0 +1,234 @@
+from botocore.exceptions import ClientError
+from functools import wraps
+from threading import Lock, local
+from time import monotonic, sleep
+from weakref import WeakSet
+
+
+# The error codes botocore's standard retry mode treats as throttling
+THROTTLING_ERROR_CODES = frozenset((
+  'BandwidthLimitExceeded',
+  'EC2ThrottledException',
+  'LimitExceededException',
+  'PriorRequestNotComplete',
+  'ProvisionedThroughputExceededException',
+  'RequestLimitExceeded',
+  'RequestThrottled',
+  'RequestThrottledException',
+  'SlowDown',
+  'ThrottledException',
+  'Throttling',
+  'ThrottlingException',
+  'TooManyRequestsException',
+  'TransactionInProgressException',
+))
+
+_buckets = {}
+_buckets_lock = Lock()
+
+
+class TokenBucket(object):
+  """
+  A thread-safe token bucket pacing calls to a rate, with additive increase, multiplicative decrease (AIMD) control.
+
+  Callers reserve a token and sleep until it is due, so concurrent callers are paced in turn rather than woken
+  together.
+  """
+
+
+  def __init__(self, rate, burst=None, min_rate=None, increase=1.0, decrease=0.5):
+    """
+    Arguments:
+    rate -- the number of calls per second, which is also the highest rate increase() reaches.
+    burst -- the number of calls that can be made at once after a quiet period, max(1, rate) by default.
+    min_rate -- the lowest rate decrease() reaches, a tenth of rate by default.
+    increase -- the calls per second added per second of successful calls.
+    decrease -- the factor the rate is multiplied by on throttling.
+    """
+    assert rate > 0, 'rate must be greater than 0'
+    assert 0 < decrease < 1, 'decrease must be between 0 and 1'
+    self.__capacity = burst or max(1.0, rate)
+    self.__decrease = decrease
+    self.__decreased = 0.0
+    self.__increase = increase
+    self.__lock = Lock()
+    self.__max_rate = rate
+    self.__min_rate = min_rate or rate / 10.0
+    self.__rate = rate
+    self.__tokens = self.__capacity
+    self.__updated = monotonic()
+
+
+  @property
+  def rate(self):
+    """
+    The current number of calls per second.
+    """
+    return self.__rate
+
+
+  def acquire(self):
+    """
+    Takes a token, sleeping until one is available. Returns the number of seconds slept.
+    """
+    with self.__lock:
+      self.__refill()
+      self.__tokens -= 1
+      delay = -self.__tokens / self.__rate if self.__tokens < 0 else 0.0
+    if delay:
+      sleep(delay)
+    return delay
+
+
+  def decrease(self):
+    """
+    Multiplies the rate by the decrease factor, at most once per second so that a burst of throttled calls only counts
+    once.
+    """
+    with self.__lock:
+      now = monotonic()
+      if now - self.__decreased < 1.0:
+        return
+      self.__refill()
+      self.__decreased = now
+      self.__rate = max(self.__min_rate, self.__rate * self.__decrease)
+
+
+  def increase(self):
+    """
+    Adds increase / rate calls per second to the rate, so that a second of successful calls adds increase.
+    """
+    with self.__lock:
+      if self.__rate < self.__max_rate:
+        self.__refill()
+        self.__rate = min(self.__max_rate, self.__rate + self.__increase / self.__rate)
+
+
+  def __refill(self):
+    now = monotonic()
+    self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+    self.__updated = now
+
+
+def get_bucket(service_name, operation_name, region_name, create=None):
+  """
+  Returns the process-wide TokenBucket of an operation in a region, or None.
+
+  Arguments:
+  service_name -- the botocore name of the service.
+  operation_name -- the operation name, such as 'GetItem'.
+  region_name -- the region of the client.
+  create -- a function without arguments returning the bucket to store if there is none yet.
+  """
+  key = (service_name, operation_name, region_name)
+  bucket = _buckets.get(key)
+  if bucket is None and create is not None:
+    with _buckets_lock:
+      bucket = _buckets.get(key)
+      if bucket is None:
+        bucket = _buckets[key] = create()
+  return bucket
+
+
+def reset_buckets():
+  """
+  Discards every process-wide TokenBucket, along with its learned rate. Limited calls create their bucket again from
+  their limiter's configuration.
+  """
+  with _buckets_lock:
+    _buckets.clear()
+
+
+class RateLimiter(object):
+  """
+  A decorator pacing client calls with token buckets shared by every session and client of the process.
+
+  Buckets are keyed by service, operation and region, so all the workers of a process calling the same operation in
+  the same region share its rate. The first RateLimiter to use a bucket sets its configuration.
+
+    limiter = RateLimiter(rates={'put_item': 500, 'query': 200}, adaptive=True)
+    boto3.session.Session.add_client_decorator('dynamodb', ['put_item', 'query'], limiter)
+
+  In adaptive mode the rate is multiplied by decrease whenever a request is throttled (including the attempts
+  botocore retries itself) and grows back towards the configured rate by increase calls per second per second of
+  successful calls. Operations without a configured rate are not limited.
+  """
+
+
+  def __init__(self, rate=None, rates=None, burst=None, adaptive=False, min_rate=None, increase=1.0, decrease=0.5):
+    """
+    Arguments:
+    rate -- the default number of calls per second of each operation, or None to only limit the operations in rates.
+    rates -- a dict of method name to its number of calls per second, overriding rate.
+    burst -- the number of calls that can be made at once after a quiet period, max(1, rate) by default.
+    adaptive -- if True, the rates are adjusted with AIMD when requests are throttled.
+    min_rate -- the lowest rate adaptive mode reaches, a tenth of the configured rate by default.
+    increase -- the calls per second adaptive mode adds per second of successful calls.
+    decrease -- the factor adaptive mode multiplies the rate by on throttling.
+    """
+    self.__adaptive = adaptive
+    self.__bucket_kwargs = dict(burst=burst, min_rate=min_rate, increase=increase, decrease=decrease)
+    self.__clients = WeakSet()
+    self.__local = local()
+    self.__rate = rate
+    self.__rates = dict(rates or {})
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+    rate = self.__rates.get(method_name, self.__rate)
+    if rate is None:
+      return func
+
+    @wraps(func)
+    def limited_call(client, *args, **kwargs):
+      meta = client.meta
+      bucket = get_bucket(
+        meta.service_model.service_name,
+        meta.method_to_api_mapping.get(method_name, method_name),
+        meta.region_name,
+        lambda: TokenBucket(rate, **self.__bucket_kwargs)
+      )
+      bucket.acquire()
+      if not self.__adaptive:
+        return func(client, *args, **kwargs)
+      if client not in self.__clients:
+        self.__watch(client)
+      self.__local.observed = False
+      try:
+        response = func(client, *args, **kwargs)
+      except ClientError as e:
+        # Calls that never reached botocore's retry handler, such as stubbed ones, are judged by their outcome
+        if not self.__local.observed and e.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+          bucket.decrease()
+        raise
+      if not self.__local.observed:
+        bucket.increase()
+      return response
+
+    return limited_call
+
+
+  def __needs_retry(self, client, response=None, operation=None, **kwargs):
+    if response is None or operation is None:
+      return
+    self.__local.observed = True
+    meta = client.meta
+    bucket = get_bucket(meta.service_model.service_name, operation.name, meta.region_name)
+    if bucket is None:
+      return
+    if response[1].get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+      bucket.decrease()
+    elif 'Error' not in response[1]:
+      bucket.increase()
+
+
+  def __watch(self, client):
+    client_ref = WeakSet((client,))
+
+    def needs_retry(**kwargs):
+      for watched in client_ref:
+        self.__needs_retry(watched, **kwargs)
+
+    client.meta.events.register('needs-retry', needs_retry, unique_id='botoinator-rate-limiter-{}'.format(id(self)))
+    self.__clients.add(client)
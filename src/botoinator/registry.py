@@ -0,0 +1,193 @@
+from collections import namedtuple
+from fnmatch import fnmatchcase
+from functools import reduce, wraps
+from itertools import count
+from types import MappingProxyType
+
+from .selectors import compile_selector
+
+
+CLASS_ORIGIN = 0
+SESSION_ORIGIN = 1
+
+
+class DecoratorEntry(namedtuple('DecoratorEntry', ('priority', 'origin', 'sequence', 'decorator'))):
+  """
+  A decorator registered for a method.
+
+  Entries sort by priority, then origin (class-level before session-level), then registration order.
+  """
+
+
+  __slots__ = ()
+
+
+  @property
+  def sort_key(self):
+    return self.priority, self.origin, self.sequence
+
+
+def compose(func, entries, name=None):
+  """
+  Applies a stack of decorators to the function, returning the single composed callable.
+
+  Entries are applied in their sort order, so the entry with the lowest priority is innermost and the entry with
+  the highest priority is outermost (it is called first). Decorators find the method they decorate by the __name__
+  of the function they are given, so a layer that does not keep it (a decorator without functools.wraps) is wrapped
+  in a thin function carrying the method name before it is handed to the next one.
+
+  Arguments:
+  func -- the function to decorate.
+  entries -- the sorted DecoratorEntry stack.
+  name -- the method name the decorators are given, the function's __name__ by default.
+  """
+  name = name or func.__name__
+  return reduce(lambda decorated, entry: entry.decorator(_named(decorated, name)), entries, func)
+
+
+def _named(func, name):
+  if getattr(func, '__name__', None) == name:
+    return func
+
+  @wraps(func)
+  def named(*args, **kwargs):
+    return func(*args, **kwargs)
+
+  named.__name__ = name
+  return named
+
+
+class DecoratorRegistry(object):
+  """
+  An immutable, versioned snapshot of decorator registrations.
+
+  Registrations are keyed by event name pattern and then by method selector, where each selector holds an ordered
+  stack of DecoratorEntry objects. Every change returns a new registry, leaving the original untouched, so a snapshot
+  can be shared freely between sessions and threads.
+  """
+
+
+  __sequences = count()
+  __versions = count()
+
+
+  def __init__(self, decorators=None):
+    self.__decorators = MappingProxyType({
+      event_name: MappingProxyType(dict(decorator_map)) for event_name, decorator_map in (decorators or {}).items()
+    })
+    self.__resolved = {}
+    self.__version = next(DecoratorRegistry.__versions)
+
+
+  def __bool__(self):
+    return bool(self.__decorators)
+
+
+  def __iter__(self):
+    return iter(self.__decorators.items())
+
+
+  @property
+  def version(self):
+    """
+    A process-unique number identifying this snapshot.
+    """
+    return self.__version
+
+
+  def get(self, event_name):
+    """
+    Returns the read-only selector to decorator stack map registered under the event name, or None.
+
+    Arguments:
+    event_name -- the name, or fnmatch pattern, the decorators were registered under.
+    """
+    return self.__decorators.get(event_name)
+
+
+  def resolve(self, event_name, class_attributes, operations=None, aliases=()):
+    """
+    Returns the decorator stacks that apply to a class as a tuple of (method_name, entries) pairs.
+
+    Event name patterns and method selectors are matched once per distinct event name and set of class attributes,
+    and the resulting match index is cached for the lifetime of this snapshot. When several selectors match the same
+    method their stacks are merged in sort order.
+
+    Arguments:
+    event_name -- the name of the class creation event being emitted.
+    class_attributes -- the attributes of the class being created.
+    operations -- the OperationIndex of the client being created, used by operation predicates.
+    aliases -- other names of the same event that patterns may match, such as the one botocore emits for a service
+      whose id differs from its boto3 name.
+    """
+    key = (event_name, tuple(class_attributes), operations, aliases)
+    resolved = self.__resolved.get(key)
+    if resolved is None:
+      resolved = self.__resolved.setdefault(key, self.__resolve((event_name,) + tuple(aliases), class_attributes, operations))
+    return resolved
+
+
+  def with_decorator(self, event_name, method_name, decorator, priority=0, origin=CLASS_ORIGIN):
+    """
+    Returns a new registry with the decorator added to the method's stack.
+
+    Registering a decorator that is already in the method's stack moves it to its new priority.
+
+    Arguments:
+    event_name -- the name, or fnmatch pattern, of the class creation event.
+    method_name -- the method selector: a method name, a glob, a compiled regular expression or an OperationPredicate.
+    decorator -- the decorator function.
+    priority -- decorators with a higher priority wrap those with a lower priority.
+    origin -- CLASS_ORIGIN or SESSION_ORIGIN.
+    """
+    decorators = dict(self.__decorators)
+    decorator_map = dict(decorators.get(event_name, {}))
+    entries = [entry for entry in decorator_map.get(method_name, ()) if entry.decorator is not decorator]
+    entries.append(DecoratorEntry(priority, origin, next(DecoratorRegistry.__sequences), decorator))
+    decorator_map[method_name] = tuple(sorted(entries, key=lambda entry: entry.sort_key))
+    decorators[event_name] = decorator_map
+    return DecoratorRegistry(decorators)
+
+
+  def without_decorator(self, event_name, method_name=None, decorator=None):
+    """
+    Returns a new registry without the method's decorators.
+
+    Arguments:
+    event_name -- the name, or fnmatch pattern, of the class creation event.
+    method_name -- the method selector. If None, every decorator of the event is removed.
+    decorator -- the decorator to remove from the method's stack. If None, the whole stack is removed.
+    """
+    decorators = dict(self.__decorators)
+    decorator_map = dict(decorators.pop(event_name))
+    if method_name:
+      entries = decorator_map.pop(method_name)
+      if decorator is not None:
+        remaining = tuple(entry for entry in entries if entry.decorator is not decorator)
+        if len(remaining) == len(entries):
+          raise KeyError(decorator)
+        if remaining:
+          decorator_map[method_name] = remaining
+      if decorator_map:
+        decorators[event_name] = decorator_map
+    return DecoratorRegistry(decorators)
+
+
+  def __resolve(self, event_names, class_attributes, operations):
+    stacks = {}
+    for event_pattern, decorator_map in self.__decorators.items():
+      if not any(fnmatchcase(event_name, event_pattern) for event_name in event_names):
+        continue
+      for selector, entries in decorator_map.items():
+        for method_name in compile_selector(selector).select(class_attributes, operations):
+          stacks.setdefault(method_name, []).extend(entries)
+    resolved = []
+    for method_name, entries in stacks.items():
+      decorators = set()
+      stack = []
+      for entry in sorted(entries, key=lambda entry: entry.sort_key):
+        if entry.decorator not in decorators:
+          decorators.add(entry.decorator)
+          stack.append(entry)
+      resolved.append((method_name, tuple(stack)))
+    return tuple(resolved)
@@ -0,0 +1,75 @@
+import re
+
+from fnmatch import translate
+from functools import lru_cache
+
+from .operations import OperationPredicate
+
+
+GLOB_CHARACTERS = frozenset('*?[')
+SELECTOR_TYPES = (str, re.Pattern, OperationPredicate)
+
+
+def is_pattern(selector):
+  """
+  Returns True if the selector matches method names by pattern rather than by exact name.
+
+  Arguments:
+  selector -- a method name, a glob such as 'describe_*', a compiled regular expression or an OperationPredicate.
+  """
+  return not isinstance(selector, str) or not GLOB_CHARACTERS.isdisjoint(selector)
+
+
+class MethodSelector(object):
+  """
+  Selects the methods of a class to decorate.
+
+  Exact names select the attribute of that name, whatever it is. Globs and regular expressions only select public
+  (not underscore prefixed) callable attributes, and regular expressions must match the whole name. Operation
+  predicates select the client operations whose metadata they match.
+  """
+
+
+  def __init__(self, selector):
+    assert isinstance(selector, SELECTOR_TYPES), 'selector must be a string, a compiled regular expression or an OperationPredicate'
+    self.__selector = selector
+    self.__pattern = None
+    if isinstance(selector, (re.Pattern, OperationPredicate)):
+      self.__pattern = selector
+    elif is_pattern(selector):
+      self.__pattern = re.compile(translate(selector))
+
+
+  def __repr__(self):
+    return 'MethodSelector({!r})'.format(self.__selector)
+
+
+  def select(self, class_attributes, operations=None):
+    """
+    Returns the names of the class attributes that this selector matches, in class attribute order.
+
+    Arguments:
+    class_attributes -- the attributes of the class being created.
+    operations -- the OperationIndex of the client being created, or None if the class is not a client.
+    """
+    if isinstance(self.__selector, OperationPredicate):
+      if operations is None:
+        return ()
+      return tuple(name for name in class_attributes if name in operations and self.__selector(operations[name]))
+    if self.__pattern is None:
+      return (self.__selector,) if self.__selector in class_attributes else ()
+    return tuple(
+      name for name, value in class_attributes.items()
+      if not name.startswith('_') and callable(value) and self.__pattern.fullmatch(name)
+    )
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector):
+  """
+  Returns the (cached) MethodSelector for the selector.
+
+  Arguments:
+  selector -- a method name, a glob such as 'describe_*', a compiled regular expression or an OperationPredicate.
+  """
+  return MethodSelector(selector)
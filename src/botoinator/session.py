@@ -1,10 +1,108 @@
 import boto3
+import re
+
+from boto3.docs.docstring import CollectionDocstring
+from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from itertools import count
+from threading import Lock, RLock, get_ident, local
+from weakref import WeakSet
+
+from .clients import ClientCache, client_key
+from .components import use_shared_components
+from .fanout import fan_out
+from .operations import get_operation_index
+from .patching import install_on_first_use
+from .portable import dump_registry, iter_registrations, load_registry, resolve_path
+from .registry import CLASS_ORIGIN, SESSION_ORIGIN, DecoratorRegistry, compose
+from .selectors import SELECTOR_TYPES
+from .waiters import waiter_hook
+
+
+class _LiveClass(object):
+  """
+  Kept in the attributes of a class created with hot swapping on, it records how the class was created and adds the
+  class to its session's live classes once type() has created it.
+  """
+
+
+  def __init__(self, event_name, aliases, class_attributes, base_classes, operations, mode, live_classes, lock):
+    self.aliases = aliases
+    self.base_classes = base_classes
+    self.class_attributes = class_attributes
+    self.event_name = event_name
+    self.mode = mode
+    self.operations = operations
+    self.__live_classes = live_classes
+    self.__lock = lock
+
+
+  def __set_name__(self, owner, name):
+    with self.__lock:
+      self.__live_classes.add(owner)
+
+
+class _ClientAttributes(dict):
+  """
+  The attributes of a client class being created, also containing (but not listing) the methods inherited from its
+  base classes, so that exact method names such as 'get_waiter' select them while globs only match the class' own.
+  """
+
+
+  def __init__(self, class_attributes, base_classes):
+    super().__init__(class_attributes)
+    self.__base_classes = tuple(base_classes)
+
+
+  def __contains__(self, name):
+    return super().__contains__(name) or any(hasattr(base_class, name) for base_class in self.__base_classes)
+
+
+  def __missing__(self, name):
+    for base_class in self.__base_classes:
+      if hasattr(base_class, name):
+        return getattr(base_class, name)
+    raise KeyError(name)
 
 
 class DecoratedSession(boto3.session.Session):
 
 
-  __decorators = {}
+  DISPATCH_DECORATION = 'dispatch'
+  METHOD_DECORATION = 'method'
+
+  # How client decorators are applied. METHOD_DECORATION replaces each decorated method of the client class.
+  # DISPATCH_DECORATION leaves the methods untouched and installs a single _make_api_call hook that looks up the
+  # decorated operations in a dispatch table. May be set on the class or on a single session.
+  client_decoration_mode = METHOD_DECORATION
+
+  # If True, clients and resources are created so that later decorator changes re-bind their methods in place, and
+  # class level changes reach the session's registry. May be set on the class or on a single session, and applies to
+  # clients and resources created while it is set.
+  hot_swap = False
+
+  # The number of clients cached_client() keeps per session, and the seconds an unused one is kept for (None for no
+  # limit). May be set on the class or on a single session before its first cached_client() call.
+  client_cache_idle = None
+  client_cache_size = 32
+
+  # The number of decorated client classes cached process wide, the least recently used ones are evicted first.
+  class_cache_size = 256
+
+  # If True, new sessions share a process-wide botocore loader, endpoint resolver and exceptions factory, so that
+  # service models are parsed and held once however many sessions there are. Credentials, config and event handlers
+  # stay per session. Set it on the class, or on a subclass, before creating the sessions.
+  share_components = False
+
+  __PICKLED_ATTRIBUTES = ('client_cache_idle', 'client_cache_size', 'client_decoration_mode', 'hot_swap')
+
+  __class_uses = count()
+  __client_classes = {}
+  __decorator_names = {}
+  __lock = RLock()
+  __registry = DecoratorRegistry()
+  __sessions = WeakSet()
 
 
   def __init__(self, aws_access_key_id=None, aws_secret_access_key=None,
@@ -18,216 +116,827 @@ class DecoratedSession(boto3.session.Session):
       botocore_session=botocore_session,
       profile_name=profile_name
     )
-    self.__decorators = {}
-    for event_name, decorator_map in DecoratedSession.__decorators.items():
-      for method_name, decorator in decorator_map.items():
-        self.__register_decorator(event_name, method_name, decorator)
+    if self.share_components:
+      use_shared_components(self)
+    self.__client_cache = None
+    self.__client_cache_registry = None
+    self.__creating = local()
+    self.__fan_out_clients = (None, {})
+    self.__fan_out_executors = {}
+    self.__fan_out_lock = Lock()
+    self.__live_classes = WeakSet()
+    # The class level registrations this session unregistered, as (event_name, method_name, decorator) keys
+    self.__masked = {}
+    # Sessions share the class' immutable registry snapshot until their first register/unregister call
+    self.__registry = DecoratedSession.__registry
+    self.events.register('creating-client-class', self.__decorate)
+    self.events.register('creating-resource-class', self.__decorate)
+
+
+  def __reduce__(self):
+    # Explicit credentials travel with the session, others are resolved again from the same profile where it is loaded
+    credentials = self._session.get_credentials()
+    if credentials is not None and credentials.method == 'explicit':
+      frozen = credentials.get_frozen_credentials()
+      credentials = (frozen.access_key, frozen.secret_key, frozen.token)
+    else:
+      credentials = (None, None, None)
+    state = {
+      'attributes': {name: value for name, value in vars(self).items() if name in self.__PICKLED_ATTRIBUTES},
+      'decorators': dump_registry(self.__registry, DecoratedSession.__decorator_names, SESSION_ORIGIN),
+    }
+    return type(self), credentials + (self._session.get_config_variable('region'), None, self._session.profile), state
+
+
+  def __setstate__(self, state):
+    vars(self).update(state['attributes'])
+    for event_name, selector, decorator, priority in iter_registrations(state['decorators']):
+      self.__register_decorator(event_name, selector, decorator, priority)
 
 
   @classmethod
-  def add_client_decorator(cls, service_name, method_names, decorator):
+  def add_client_decorator(cls, service_name, method_names, decorator, priority=0):
     """
     Add the decorator function to the class' statically registered decorators.
 
     Class-registered decorators will be applied to every DecoratedSession object created.
 
     Arguments:
-    service_name -- the boto3 name of the service to apply the decorator to.
-    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', compiled regular expressions or botoinator.operations.OperationPredicate objects.
     decorator -- the decorator function. Must be a function that takes a function and returns a function. The returned function must take (*args, **kwargs) as arguments.
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same method. Defaults to 0.
     """
-    assert isinstance(method_names, (str, list, tuple, set)), 'method_names must be a string, list, tuple or set'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set)), 'method_names must be a string, regular expression, OperationPredicate, list, tuple or set'
     event_name = 'creating-client-class.{}'.format(service_name)
-    if isinstance(method_names, str):
-      cls.__add_decorator(event_name, method_names, decorator)
+    if isinstance(method_names, SELECTOR_TYPES):
+      cls.__add_decorator(event_name, method_names, decorator, priority)
     else:
       for method_name in method_names:
-        assert isinstance(method_name, str), 'method {} must be a string'.format(method_name)
-        cls.__add_decorator(event_name, method_name, decorator)
+        assert isinstance(method_name, SELECTOR_TYPES), 'method {} must be a string, regular expression or OperationPredicate'.format(method_name)
+        cls.__add_decorator(event_name, method_name, decorator, priority)
 
 
   @classmethod
-  def add_resource_decorator(cls, service_name, resource_name, method_names, decorator):
+  def add_collection_decorator(cls, service_name, resource_name, collection_name, method_names, decorator, priority=0):
+    """
+    Add the decorator function to the class' statically registered decorators of a resource collection.
+
+    Class-registered decorators will be applied to every DecoratedSession object created.
+
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource owning the collection, such as 'Bucket' or 'ServiceResource'. May be a glob.
+    collection_name -- the name of the collection attribute, such as 'objects'. May be a glob.
+    method_names -- one or more method names of the collection to apply the decorator to, such as 'pages' (which iteration goes through), 'filter' or a batch action like 'delete'. Single names can be a string. Names may be globs or compiled regular expressions.
+    decorator -- the decorator function. Must be a function that takes a function and returns a function. The returned function must take (*args, **kwargs) as arguments.
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same method. Defaults to 0.
+    """
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set)), 'method_names must be a string, regular expression, list, tuple or set'
+    event_name = 'creating-collection-class.{}.{}.{}'.format(service_name, resource_name, collection_name)
+    if isinstance(method_names, SELECTOR_TYPES):
+      cls.__add_decorator(event_name, method_names, decorator, priority)
+    else:
+      for method_name in method_names:
+        assert isinstance(method_name, SELECTOR_TYPES), 'method_name {} must be a string or regular expression'.format(method_name)
+        cls.__add_decorator(event_name, method_name, decorator, priority)
+
+
+  @classmethod
+  def add_resource_decorator(cls, service_name, resource_name, method_names, decorator, priority=0):
     """
     Add the decorator function to the class' statically registered decorators.
 
     Class-registered decorators will be applied to every DecoratedSession object created.
 
     Arguments:
-    service_name -- the boto3 name of the service to apply the decorator to.
-    resource_name -- the boto3 name of the resource of the service to apply the decorator to.
-    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource of the service to apply the decorator to. May be a glob.
+    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', or compiled regular expressions.
     decorator -- the decorator function. Must be a function that takes a function and returns a function. The returned function must take (*args, **kwargs) as arguments
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same method. Defaults to 0.
     """
-    assert isinstance(method_names, (str, list, tuple, set)), 'method_names must be a string, list, tuple or set'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set)), 'method_names must be a string, regular expression, OperationPredicate, list, tuple or set'
     event_name = 'creating-resource-class.{}.{}'.format(service_name, resource_name)
-    if isinstance(method_names, str):
-      cls.__add_decorator(event_name, method_names, decorator)
+    if isinstance(method_names, SELECTOR_TYPES):
+      cls.__add_decorator(event_name, method_names, decorator, priority)
     else:
       for method_name in method_names:
-        assert isinstance(method_name, str), 'method_name {} must be a string'.format(method_name)
-        cls.__add_decorator(event_name, method_name, decorator)
+        assert isinstance(method_name, SELECTOR_TYPES), 'method_name {} must be a string, regular expression or OperationPredicate'.format(method_name)
+        cls.__add_decorator(event_name, method_name, decorator, priority)
 
 
-  def register_client_decorator(self, service_name, method_names, decorator):
+  @classmethod
+  def add_waiter_decorator(cls, service_name, waiter_names, decorator, priority=0):
+    """
+    Add the decorator function to the class' statically registered decorators of client waiters.
+
+    Waiter decorators wrap the wait() method of the waiters returned by get_waiter(), and so the resource wait_until_* methods using them. They take a function of (waiter, **kwargs) named after the snake cased waiter name.
+
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    waiter_names -- one or more snake cased waiter names, such as 'bucket_exists'. Single names can be a string. Names may be globs, such as '*_exists', or compiled regular expressions.
+    decorator -- the decorator function, such as a botoinator.waiters.AdaptiveWaiter.
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same waiter. Defaults to 0.
+    """
+    assert isinstance(waiter_names, (str, re.Pattern, list, tuple, set)), 'waiter_names must be a string, regular expression, list, tuple or set'
+    event_name = 'creating-client-class.{}'.format(service_name)
+    for waiter_name in ([waiter_names] if isinstance(waiter_names, (str, re.Pattern)) else waiter_names):
+      cls.__add_decorator(event_name, 'get_waiter', waiter_hook(waiter_name, decorator), priority)
+
+
+  @classmethod
+  def clear_class_cache(cls):
+    """
+    Discards every cached decorated client class.
+
+    Clients that have already been created keep their classes. New clients will build (and cache) their decorated class again.
+    """
+    with DecoratedSession.__lock:
+      DecoratedSession.__client_classes = {}
+
+
+  @classmethod
+  def export_decorators(cls, names=None):
+    """
+    Returns the class' statically registered decorators as a JSON serializable dict that import_decorators() (or
+    botoinator.initialize_worker in a worker process) registers again.
+
+    Decorators are referenced by import path, so they must be module level functions or classes, or be given a path with name_decorator() or in names.
+
+    Arguments:
+    names -- a dict of 'module:name' import path to decorator, for decorators that have no import path of their own, such as a Metrics instance assigned to a module attribute.
+    """
+    return dump_registry(DecoratedSession.__registry, dict(DecoratedSession.__decorator_names, **(names or {})))
+
+
+  @classmethod
+  def import_decorators(cls, data):
+    """
+    Replaces the class' statically registered decorators with the ones exported by export_decorators(), importing each decorator.
+
+    Sessions created afterwards, and hot swapping sessions, use the imported decorators.
+
+    Arguments:
+    data -- the dict returned by export_decorators().
+    """
+    registry = load_registry(data)
+    with DecoratedSession.__lock:
+      event_names = {event_name for event_name, _ in DecoratedSession.__registry} | {event_name for event_name, _ in registry}
+      DecoratedSession.__registry = registry
+      for event_name in event_names:
+        cls.__invalidate_class_cache(event_name)
+        cls.__rebase_sessions(event_name)
+    if registry:
+      install_on_first_use()
+
+
+  @classmethod
+  def name_decorator(cls, path, decorator):
+    """
+    Gives a decorator that has no import path of its own the path export_decorators() and pickled sessions refer to it by.
+
+    Arguments:
+    path -- the 'module:name' import path of the decorator, such as 'myapp.instrumentation:metrics' for a Metrics instance assigned to a module attribute.
+    decorator -- the decorator the path imports.
+    """
+    assert resolve_path(path) is decorator, '{} does not import the decorator'.format(path)
+    with DecoratedSession.__lock:
+      DecoratedSession.__decorator_names = dict(DecoratedSession.__decorator_names, **{path: decorator})
+
+
+  def as_completed(self, service_name, method_name, kwargs_iterable, max_workers=8, max_in_flight=None, return_exceptions=False, client_kwargs=None):
+    """
+    Like map(), but yields (kwargs, response) pairs as the calls complete instead of in order.
+
+    Arguments:
+    service_name -- the boto3 name of the service.
+    method_name -- the client method to call, such as 'get_item'.
+    kwargs_iterable -- an iterable of the keyword argument dicts of each call.
+    max_workers -- the number of worker threads.
+    max_in_flight -- the number of calls submitted but not yet taken by the caller, 2 * max_workers by default.
+    return_exceptions -- if True, the exception of a failed call is yielded in place of its response instead of being raised.
+    client_kwargs -- the keyword arguments of client() used to create each worker's client, such as region_name.
+    """
+    return fan_out(
+      lambda: self.__fan_out_executor(max_workers), lambda: self.__fan_out_client(service_name, client_kwargs or {}),
+      method_name, kwargs_iterable, max_workers, max_in_flight, False, return_exceptions
+    )
+
+
+  def cached_client(self, service_name, region_name=None, api_version=None, **kwargs):
+    """
+    Returns a client from the session's client cache, creating it with client() if it is not cached.
+
+    Clients are cached by service name, region, API version, endpoint, credentials and config, evicting the least
+    recently used ones beyond client_cache_size and unused ones after client_cache_idle seconds. When the session's
+    client decorators change, the cached clients of the services they select are dropped, so cached clients are always
+    decorated as new ones would be. Clients created with hot swapping on are kept, they are re-bound in place. Clients
+    are thread-safe, and concurrent requests for the same client create it once.
+
+    Arguments:
+    service_name -- the boto3 name of the service.
+    region_name -- the region of the client.
+    api_version -- the API version of the client.
+    kwargs -- the other keyword arguments of client(), such as endpoint_url or config.
+    """
+    key = client_key(service_name, region_name, api_version, **kwargs)
+    cache = self.__client_cache
+    if cache is None:
+      with DecoratedSession.__lock:
+        if self.__client_cache is None:
+          self.__client_cache = ClientCache(self.client_cache_size, self.client_cache_idle)
+        cache = self.__client_cache
+    registry = self.__registry
+    cached_registry = self.__client_cache_registry
+    if cached_registry is not registry:
+      self.__client_cache_registry = registry
+      event_patterns = self.__changed_client_events(cached_registry, registry) if cached_registry is not None else ()
+      if event_patterns:
+        cache.discard(lambda key, client: self.__is_stale(client, event_patterns))
+    return cache.get(key, lambda: self.client(service_name, region_name, api_version, **kwargs))
+
+
+  def clear_client_cache(self):
+    """
+    Removes every client from the session's client cache.
+    """
+    if self.__client_cache is not None:
+      self.__client_cache.clear()
+
+
+  def client(self, service_name, region_name=None, api_version=None, *args, **kwargs):
+    # Remember which service and API version the client class being created belongs to, for operation predicates
+    creating = getattr(self.__creating, 'client', None)
+    self.__creating.client = (service_name, api_version)
+    try:
+      return super().client(service_name, region_name, api_version, *args, **kwargs)
+    finally:
+      self.__creating.client = creating
+  client.__doc__ = boto3.session.Session.client.__doc__
+
+
+  def map(self, service_name, method_name, kwargs_iterable, max_workers=8, max_in_flight=None, return_exceptions=False, client_kwargs=None):
+    """
+    Calls a client method once per item of kwargs_iterable on a thread pool, yielding the responses in order.
+
+    The session keeps one pool of max_workers threads per distinct max_workers, shared by the map() and as_completed()
+    calls using it, and each of its threads creates one client per service and client_kwargs from this session (so
+    the session's decorators apply) and reuses it across calls, until the session's decorators change. At most
+    max_in_flight calls are outstanding and the iterable is consumed as responses are taken, which bounds memory for
+    large or unbounded iterables. Closing the generator cancels the calls not started yet. The arguments are checked
+    right away, and the pools' threads exit when the session is garbage collected.
+
+    Arguments:
+    service_name -- the boto3 name of the service.
+    method_name -- the client method to call, such as 'get_item'.
+    kwargs_iterable -- an iterable of the keyword argument dicts of each call.
+    max_workers -- the number of worker threads.
+    max_in_flight -- the number of calls submitted but not yet taken by the caller, 2 * max_workers by default.
+    return_exceptions -- if True, the exception of a failed call is yielded in place of its response instead of being raised.
+    client_kwargs -- the keyword arguments of client() used to create each worker's client, such as region_name.
+    """
+    return fan_out(
+      lambda: self.__fan_out_executor(max_workers), lambda: self.__fan_out_client(service_name, client_kwargs or {}),
+      method_name, kwargs_iterable, max_workers, max_in_flight, True, return_exceptions
+    )
+
+
+  def register_client_decorator(self, service_name, method_names, decorator, priority=0):
     """
     Add the decorator function to the session's registered decorators.
 
     Arguments:
-    service_name -- the boto3 name of the client to apply the decorator to.
-    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the client to apply the decorator to. May be a glob, such as '*' for every service.
+    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', compiled regular expressions or botoinator.operations.OperationPredicate objects.
     decorator -- the decorator function. Must be a function that takes a function and returns a function. The returned function must take (*args, **kwargs) as arguments.
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same method. Defaults to 0.
     """
-    assert isinstance(method_names, (str, list, tuple, set)), 'method_names must be a string, list, tuple or set'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set)), 'method_names must be a string, regular expression, OperationPredicate, list, tuple or set'
     event_name = 'creating-client-class.{}'.format(service_name)
-    if isinstance(method_names, str):
-      self.__register_decorator(event_name, method_names, decorator)
+    if isinstance(method_names, SELECTOR_TYPES):
+      self.__register_decorator(event_name, method_names, decorator, priority)
     else:
       for method_name in method_names:
-        assert isinstance(method_name, str), 'method_name {} must be a string'.format(m)
-        self.__register_decorator(event_name, method_name, decorator)
+        assert isinstance(method_name, SELECTOR_TYPES), 'method_name {} must be a string, regular expression or OperationPredicate'.format(method_name)
+        self.__register_decorator(event_name, method_name, decorator, priority)
 
 
+  def register_collection_decorator(self, service_name, resource_name, collection_name, method_names, decorator, priority=0):
+    """
+    Add the decorator function to the session's registered decorators of a resource collection.
 
-  def register_resource_decorator(self, service_name, resource_name, method_names, decorator):
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource owning the collection, such as 'Bucket' or 'ServiceResource'. May be a glob.
+    collection_name -- the name of the collection attribute, such as 'objects'. May be a glob.
+    method_names -- one or more method names of the collection to apply the decorator to, such as 'pages' (which iteration goes through), 'filter' or a batch action like 'delete'. Single names can be a string. Names may be globs or compiled regular expressions.
+    decorator -- the decorator function. Must be a function that takes a function and returns a function. The returned function must take (*args, **kwargs) as arguments.
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same method. Defaults to 0.
+    """
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set)), 'method_names must be a string, regular expression, list, tuple or set'
+    event_name = 'creating-collection-class.{}.{}.{}'.format(service_name, resource_name, collection_name)
+    if isinstance(method_names, SELECTOR_TYPES):
+      self.__register_decorator(event_name, method_names, decorator, priority)
+    else:
+      for method_name in method_names:
+        assert isinstance(method_name, SELECTOR_TYPES), 'method_name {} must be a string or regular expression'.format(method_name)
+        self.__register_decorator(event_name, method_name, decorator, priority)
+
+
+  def register_resource_decorator(self, service_name, resource_name, method_names, decorator, priority=0):
     """
     Add the decorator function to the session's statically registered decorators.
 
     Arguments:
-    service_name -- the boto3 name of the service to apply the decorator to.
-    resource_name -- the boto3 name of the resource of the service to apply the decorator to.
-    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource of the service to apply the decorator to. May be a glob.
+    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', or compiled regular expressions.
     decorator -- the decorator function. Must be a function that takes a function and returns a function. The returned function must take (*args, **kwargs) as arguments
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same method. Defaults to 0.
     """
-    assert isinstance(method_names, (str, list, tuple, set)), 'method_names must be a string, list, tuple or set'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set)), 'method_names must be a string, regular expression, OperationPredicate, list, tuple or set'
     event_name = 'creating-resource-class.{}.{}'.format(service_name, resource_name)
-    if isinstance(method_names, str):
-      self.__register_decorator(event_name, method_names, decorator)
+    if isinstance(method_names, SELECTOR_TYPES):
+      self.__register_decorator(event_name, method_names, decorator, priority)
     else:
       for method_name in method_names:
-        assert isinstance(method_name, str), 'method_name {} must be a string'.format(method_name)
-        self.__register_decorator(event_name, method_name, decorator)
+        assert isinstance(method_name, SELECTOR_TYPES), 'method_name {} must be a string, regular expression or OperationPredicate'.format(method_name)
+        self.__register_decorator(event_name, method_name, decorator, priority)
+
+
+  def register_waiter_decorator(self, service_name, waiter_names, decorator, priority=0):
+    """
+    Add the decorator function to the session's registered decorators of client waiters.
+
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    waiter_names -- one or more snake cased waiter names, such as 'bucket_exists'. Single names can be a string. Names may be globs, such as '*_exists', or compiled regular expressions.
+    decorator -- the decorator function, such as a botoinator.waiters.AdaptiveWaiter.
+    priority -- decorators with a higher priority wrap (are called before) decorators with a lower priority on the same waiter. Defaults to 0.
+    """
+    assert isinstance(waiter_names, (str, re.Pattern, list, tuple, set)), 'waiter_names must be a string, regular expression, list, tuple or set'
+    event_name = 'creating-client-class.{}'.format(service_name)
+    for waiter_name in ([waiter_names] if isinstance(waiter_names, (str, re.Pattern)) else waiter_names):
+      self.__register_decorator(event_name, 'get_waiter', waiter_hook(waiter_name, decorator), priority)
 
 
   @classmethod
-  def remove_client_decorator(cls, service_name, method_names):
+  def remove_client_decorator(cls, service_name, method_names, decorator=None):
     """
     Removes the decorator function from the class' statically registered decorators.
 
     Class-registered decorators will be applied to every DecoratedSession object created.
 
     Arguments:
-    service_name -- the boto3 name of the client to apply the decorator to.
-    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the client to apply the decorator to. May be a glob, such as '*' for every service.
+    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', compiled regular expressions or botoinator.operations.OperationPredicate objects.
+    decorator -- the decorator function to remove. If None, every decorator of the methods is removed.
     """
-    assert isinstance(method_names, (str, list, tuple, set, None)), 'method_names must be a string, list, tuple, set or None'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set, type(None))), 'method_names must be a string, regular expression, OperationPredicate, list, tuple, set or None'
     event_name = 'creating-client-class.{}'.format(service_name)
-    if not method_names or isinstance(method_names, str):
-      cls.__remove_decorator(event_name, method_names)
+    if not method_names or isinstance(method_names, SELECTOR_TYPES):
+      cls.__remove_decorator(event_name, method_names, decorator)
     else:
       for method_name in method_names:
-        assert isinstance(method_name, str), 'method_name {} must be a string'.format(m)
-        cls.__remove_decorator(event_name, method_name)
+        assert isinstance(method_name, SELECTOR_TYPES), 'method_name {} must be a string, regular expression or OperationPredicate'.format(method_name)
+        cls.__remove_decorator(event_name, method_name, decorator)
+
+
+  @classmethod
+  def remove_collection_decorator(cls, service_name, resource_name, collection_name, method_names, decorator=None):
+    """
+    Removes the decorator function from the class' statically registered decorators of a resource collection.
 
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource owning the collection. May be a glob.
+    collection_name -- the name of the collection attribute. May be a glob.
+    method_names -- one or more method names of the collection to apply the decorator to. Single names can be a string. Names may be globs or compiled regular expressions.
+    decorator -- the decorator function to remove. If None, every decorator of the methods is removed.
+    """
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set, type(None))), 'method_names must be a string, regular expression, list, tuple, set or None'
+    event_name = 'creating-collection-class.{}.{}.{}'.format(service_name, resource_name, collection_name)
+    if not method_names or isinstance(method_names, SELECTOR_TYPES):
+      cls.__remove_decorator(event_name, method_names, decorator)
+    else:
+      for method_name in method_names:
+        cls.__remove_decorator(event_name, method_name, decorator)
 
 
   @classmethod
-  def remove_resource_decorator(cls, service_name, resource_name, method_names):
+  def remove_resource_decorator(cls, service_name, resource_name, method_names, decorator=None):
     """
     Removes the decorator function from the class' statically registered decorators.
 
     Class-registered decorators will be applied to every DecoratedSession object created.
 
     Arguments:
-    service_name -- the boto3 name of the service to apply the decorator to.
-    resource_name -- the boto3 name of the resource of the service to apply the decorator to.
-    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource of the service to apply the decorator to. May be a glob.
+    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', or compiled regular expressions.
+    decorator -- the decorator function to remove. If None, every decorator of the methods is removed.
     """
-    assert isinstance(method_names, (str, list, tuple, set, None)), 'method_names must be a string, list, tuple, set or None'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set, type(None))), 'method_names must be a string, regular expression, OperationPredicate, list, tuple, set or None'
     event_name = 'creating-resource-class.{}.{}'.format(service_name, resource_name)
-    if not method_names or isinstance(method_names, str):
-      cls.__remove_decorator(event_name, method_names)
+    if not method_names or isinstance(method_names, SELECTOR_TYPES):
+      cls.__remove_decorator(event_name, method_names, decorator)
     else:
       for method_name in method_names:
-        cls.__remove_decorator(event_name, method_name)
+        cls.__remove_decorator(event_name, method_name, decorator)
 
 
-  def unregister_client_decorator(self, service_name, method_names):
+  @classmethod
+  def remove_waiter_decorator(cls, service_name, waiter_names, decorator):
+    """
+    Removes the decorator function from the class' statically registered decorators of client waiters.
+
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    waiter_names -- one or more waiter names the decorator was added with. Single names can be a string.
+    decorator -- the decorator function to remove.
+    """
+    assert isinstance(waiter_names, (str, re.Pattern, list, tuple, set)), 'waiter_names must be a string, regular expression, list, tuple or set'
+    event_name = 'creating-client-class.{}'.format(service_name)
+    for waiter_name in ([waiter_names] if isinstance(waiter_names, (str, re.Pattern)) else waiter_names):
+      cls.__remove_decorator(event_name, 'get_waiter', waiter_hook(waiter_name, decorator))
+
+
+  def unregister_client_decorator(self, service_name, method_names, decorator=None):
     """
     Removes the decorator function from the session's registered decorators.
 
     Arguments:
-    service_name -- the boto3 name of the client to apply the decorator to.
-    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the client to apply the decorator to. May be a glob, such as '*' for every service.
+    method_names -- one or more method names of the client to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', compiled regular expressions or botoinator.operations.OperationPredicate objects.
+    decorator -- the decorator function to remove. If None, every decorator of the methods is removed.
     """
-    assert isinstance(method_names, (str, list, tuple, set, None)), 'method_names must be a string, list, tuple, set or None'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set, type(None))), 'method_names must be a string, regular expression, OperationPredicate, list, tuple, set or None'
     event_name = 'creating-client-class.{}'.format(service_name)
-    if not method_names or isinstance(method_names, str):
-      self.__unregister_decorator(event_name, method_names)
+    if not method_names or isinstance(method_names, SELECTOR_TYPES):
+      self.__unregister_decorator(event_name, method_names, decorator)
+    else:
+      for method_name in method_names:
+        self.__unregister_decorator(event_name, method_name, decorator)
+
+
+  def unregister_collection_decorator(self, service_name, resource_name, collection_name, method_names, decorator=None):
+    """
+    Removes the decorator function from the session's registered decorators of a resource collection.
+
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource owning the collection. May be a glob.
+    collection_name -- the name of the collection attribute. May be a glob.
+    method_names -- one or more method names of the collection to apply the decorator to. Single names can be a string. Names may be globs or compiled regular expressions.
+    decorator -- the decorator function to remove. If None, every decorator of the methods is removed.
+    """
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set, type(None))), 'method_names must be a string, regular expression, list, tuple, set or None'
+    event_name = 'creating-collection-class.{}.{}.{}'.format(service_name, resource_name, collection_name)
+    if not method_names or isinstance(method_names, SELECTOR_TYPES):
+      self.__unregister_decorator(event_name, method_names, decorator)
     else:
       for method_name in method_names:
-        self.__unregister_decorator(event_name, method_name)
+        self.__unregister_decorator(event_name, method_name, decorator)
 
 
-  def unregister_resource_decorator(self, service_name, resource_name, method_names):
+  def unregister_resource_decorator(self, service_name, resource_name, method_names, decorator=None):
     """
     Removes the decorator function from the session's registered decorators.
 
     Arguments:
-    service_name -- the boto3 name of the service to apply the decorator to.
-    resource_name -- the boto3 name of the resource of the service to apply the decorator to.
-    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string.
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    resource_name -- the boto3 name of the resource of the service to apply the decorator to. May be a glob.
+    method_names -- one or more method names of the resource to apply the decorator to. Single names can be a string. Names may be globs, such as 'describe_*', or compiled regular expressions.
+    decorator -- the decorator function to remove. If None, every decorator of the methods is removed.
     """
-    assert isinstance(method_names, (str, list, tuple, set, None)), 'method_names must be a string, list, tuple, set or None'
+    assert isinstance(method_names, SELECTOR_TYPES + (list, tuple, set, type(None))), 'method_names must be a string, regular expression, OperationPredicate, list, tuple, set or None'
     event_name = 'creating-resource-class.{}.{}'.format(service_name, resource_name)
-    if not method_names or isinstance(method_names, str):
-      self.__unregister_decorator(event_name, method_names)
+    if not method_names or isinstance(method_names, SELECTOR_TYPES):
+      self.__unregister_decorator(event_name, method_names, decorator)
     else:
       for method_name in method_names:
-        self.__unregister_decorator(event_name, method_name)
-
+        self.__unregister_decorator(event_name, method_name, decorator)
 
-  @classmethod
-  def __add_decorator(cls, event_name, method_name, decorator):
-    assert callable(decorator), 'decorator must be a function'
-    decorator_map = cls.__decorators.get(event_name)
-    if not decorator_map:
-      decorator_map = {}
-      cls.__decorators[event_name] = decorator_map
-    decorator_map[method_name] = decorator
 
+  def unregister_waiter_decorator(self, service_name, waiter_names, decorator):
+    """
+    Removes the decorator function from the session's registered decorators of client waiters.
 
-  def __decorate(self, event_name, class_attributes, **kwargs):
-    decorator_map = self.__decorators.get(event_name)
-    if decorator_map:
-      for method_name, decorator in decorator_map.items():
-        if method_name in class_attributes:
-          class_attributes[method_name] = decorator(class_attributes[method_name])
+    Arguments:
+    service_name -- the boto3 name of the service to apply the decorator to. May be a glob, such as '*' for every service.
+    waiter_names -- one or more waiter names the decorator was registered with. Single names can be a string.
+    decorator -- the decorator function to remove.
+    """
+    assert isinstance(waiter_names, (str, re.Pattern, list, tuple, set)), 'waiter_names must be a string, regular expression, list, tuple or set'
+    event_name = 'creating-client-class.{}'.format(service_name)
+    for waiter_name in ([waiter_names] if isinstance(waiter_names, (str, re.Pattern)) else waiter_names):
+      self.__unregister_decorator(event_name, 'get_waiter', waiter_hook(waiter_name, decorator))
 
 
-  def __register_decorator(self, event_name, method_name, decorator):
+  @classmethod
+  def __add_decorator(cls, event_name, method_name, decorator, priority):
     assert callable(decorator), 'decorator must be a function'
-    decorator_map = self.__decorators.get(event_name)
-    if not decorator_map:
-      decorator_map = {}
-      self.__decorators[event_name] = decorator_map
-      self.events.register(event_name, self.__decorate)
-    decorator_map[method_name] = decorator
+    with DecoratedSession.__lock:
+      DecoratedSession.__registry = DecoratedSession.__registry.with_decorator(event_name, method_name, decorator, priority, CLASS_ORIGIN)
+      cls.__invalidate_class_cache(event_name)
+      cls.__rebase_sessions(event_name)
+    # Class level decorators are meant for every session, including the ones boto3 creates itself
+    install_on_first_use()
+
+
+  @staticmethod
+  def __build_client_class(event_name, fingerprint, class_attributes, base_classes, mode):
+    assert mode in (DecoratedSession.METHOD_DECORATION, DecoratedSession.DISPATCH_DECORATION), 'unknown client_decoration_mode {}'.format(mode)
+    decorated_attributes = _ClientAttributes(class_attributes, base_classes)
+    operation_names = class_attributes.get('_PY_TO_OP_NAME', {})
+    dispatch_table = {}
+    for method_name, entries in fingerprint:
+      if mode == DecoratedSession.DISPATCH_DECORATION and method_name in operation_names:
+        dispatch_table[operation_names[method_name]] = (method_name, entries)
+      else:
+        decorated_attributes[method_name] = compose(decorated_attributes[method_name], entries, method_name)
+    decorated_class = type('Decorated{}'.format(event_name[len('creating-client-class.'):]), tuple(base_classes), dict(decorated_attributes))
+    if dispatch_table:
+      make_api_call = decorated_class._make_api_call
+      for operation_name, (method_name, entries) in dispatch_table.items():
+        dispatch_table[operation_name] = compose(DecoratedSession.__operation_call(make_api_call, method_name, operation_name), entries, method_name)
+
+      def _make_api_call(self, operation_name, api_params):
+        operation_call = dispatch_table.get(operation_name)
+        if operation_call is None:
+          return make_api_call(self, operation_name, api_params)
+        return operation_call(self, **api_params)
+
+      decorated_class._make_api_call = _make_api_call
+    return decorated_class
+
+
+  @staticmethod
+  def __changed_client_events(old_registry, new_registry):
+    event_names = {event_name for event_name, _ in old_registry} | {event_name for event_name, _ in new_registry}
+    return [
+      event_name for event_name in event_names
+      if event_name.startswith('creating-client-class.') and old_registry.get(event_name) != new_registry.get(event_name)
+    ]
+
+
+  @staticmethod
+  def __class_signature(class_attributes, base_classes):
+    operation_names = class_attributes.get('_PY_TO_OP_NAME', {})
+    signature = []
+    for name, value in class_attributes.items():
+      if value is operation_names:
+        continue
+      if name in operation_names:
+        value = operation_names[name]
+      elif not isinstance(value, Hashable):
+        value = id(value)
+      signature.append((name, value))
+    return tuple(base_classes), tuple(signature)
+
+
+  @staticmethod
+  def __collection_property(collection_property, event_name, registry):
+    # boto3 creates collection classes without emitting an event, so the property handing out the collection manager
+    # swaps its class for a decorated subclass, built once per manager class
+    get_collection = collection_property.fget
+    manager_classes = {}
+
+    def get_decorated_collection(resource):
+      manager = get_collection(resource)
+      manager_class = type(manager)
+      decorated_class = manager_classes.get(manager_class)
+      if decorated_class is None:
+        collection_class = manager_class._collection_cls
+        attributes = {name: getattr(collection_class, name) for name in dir(collection_class) if not name.startswith('_')}
+        fingerprint = registry.resolve(event_name, attributes)
+        decorated_class = manager_class
+        if fingerprint:
+          collection_attributes = {method_name: compose(attributes[method_name], entries, method_name) for method_name, entries in fingerprint}
+          # Manager methods create collections rather than call their methods, except pages() which would be decorated twice
+          manager_attributes = {
+            method_name: compose(getattr(manager_class, method_name), entries, method_name) for method_name, entries in fingerprint
+            if method_name != 'pages' and hasattr(manager_class, method_name)
+          }
+          manager_attributes['_collection_cls'] = type('Decorated{}'.format(collection_class.__name__), (collection_class,), collection_attributes)
+          decorated_class = type('Decorated{}'.format(manager_class.__name__), (manager_class,), manager_attributes)
+        decorated_class = manager_classes.setdefault(manager_class, decorated_class)
+      manager.__class__ = decorated_class
+      return manager
+
+    get_decorated_collection.__name__ = get_collection.__name__
+    get_decorated_collection.__doc__ = get_collection.__doc__
+    return property(get_decorated_collection)
+
+
+  def __decorate(self, event_name, class_attributes, base_classes, **kwargs):
+    hot_swap = self.hot_swap
+    if not self.__registry and not hot_swap:
+      return
+    aliases = ()
+    operations = None
+    if event_name.startswith('creating-client-class.'):
+      service_name, api_version = getattr(self.__creating, 'client', None) or (event_name[len('creating-client-class.'):], None)
+      operations = get_operation_index(self._session.get_component('data_loader'), service_name, api_version)
+      # botocore names the event after the hyphenized service id (secrets-manager) while decorators are documented with
+      # the boto3 name (secretsmanager), registrations under either name apply
+      client_event_name = 'creating-client-class.{}'.format(service_name)
+      if client_event_name != event_name:
+        event_name, aliases = client_event_name, (event_name,)
+    mode = self.client_decoration_mode
+    if hot_swap:
+      if self not in DecoratedSession.__sessions:
+        self.__track()
+      # The class keeps no methods of its own, they live in a base that __rebind swaps
+      live = _LiveClass(event_name, aliases, dict(class_attributes), tuple(base_classes), operations, mode, self.__live_classes, DecoratedSession.__lock)
+      methods_class = self.__methods_class(event_name, aliases, live.class_attributes, live.base_classes, operations, mode)
+      class_attributes.clear()
+      class_attributes['_botoinator_live'] = live
+      base_classes[:] = [methods_class]
+      return
+    if not event_name.startswith('creating-client-class.'):
+      self.__decorate_resource(event_name, class_attributes)
+      return
+    if not self.__registry.resolve(event_name, _ClientAttributes(class_attributes, base_classes), operations, aliases):
+      return
+    decorated_class = self.__methods_class(event_name, aliases, class_attributes, base_classes, operations, mode)
+    class_attributes.clear()
+    base_classes[:] = [decorated_class]
+
+
+  def __decorate_resource(self, event_name, class_attributes):
+    registry = self.__registry
+    for method_name, entries in registry.resolve(event_name, class_attributes):
+      class_attributes[method_name] = compose(class_attributes[method_name], entries, method_name)
+    if not any(event_pattern.startswith('creating-collection-class.') for event_pattern, _ in registry):
+      return
+    collection_prefix = 'creating-collection-class.{}.'.format(event_name[len('creating-resource-class.'):])
+    for name, value in list(class_attributes.items()):
+      if isinstance(value, property) and isinstance(value.fget.__doc__, CollectionDocstring):
+        collection_event_name = collection_prefix + name
+        if any(fnmatchcase(collection_event_name, event_pattern) for event_pattern, _ in registry):
+          class_attributes[name] = self.__collection_property(value, collection_event_name, registry)
+
+
+  def __fan_out_client(self, service_name, client_kwargs):
+    # Worker threads keep their clients until the session's decorators change. They are kept in the session keyed by
+    # thread, since thread-local storage would keep the session alive from its own pool threads. Sessions are not safe
+    # to create clients from concurrently, so they are created one at a time.
+    registry = self.__registry
+    clients = self.__fan_out_clients
+    if clients[0] is not registry:
+      clients = self.__fan_out_clients = (registry, {})
+    key = (get_ident(), client_key(service_name, **client_kwargs))
+    client = clients[1].get(key)
+    if client is None:
+      with self.__fan_out_lock:
+        client = clients[1][key] = self.client(service_name, **client_kwargs)
+    return client
+
+
+  def __fan_out_executor(self, max_workers):
+    executor = self.__fan_out_executors.get(max_workers)
+    if executor is None:
+      with self.__fan_out_lock:
+        executor = self.__fan_out_executors.get(max_workers)
+        if executor is None:
+          executor = self.__fan_out_executors[max_workers] = ThreadPoolExecutor(max_workers, thread_name_prefix='botoinator-fan-out')
+    return executor
+
+
+  @staticmethod
+  def __invalidate_class_cache(event_name):
+    # Callers must hold the lock. Readers look classes up without it, so the cache is swapped rather than filtered in place.
+    DecoratedSession.__client_classes = {
+      key: entry for key, entry in DecoratedSession.__client_classes.items()
+      if not any(fnmatchcase(name, event_name) for name in key[0])
+    }
+
+
+  @staticmethod
+  def __is_stale(client, event_patterns):
+    # Live clients are re-bound in place, others are stale if a changed pattern selects either name of their service
+    if '_botoinator_live' in vars(type(client)):
+      return False
+    service_model = client.meta.service_model
+    event_names = (
+      'creating-client-class.{}'.format(service_model.service_name),
+      'creating-client-class.{}'.format(service_model.service_id.hyphenize()),
+    )
+    return any(fnmatchcase(event_name, event_pattern) for event_name in event_names for event_pattern in event_patterns)
+
+
+  def __methods_class(self, event_name, aliases, class_attributes, base_classes, operations, mode):
+    if not event_name.startswith('creating-client-class.'):
+      decorated_attributes = dict(class_attributes)
+      self.__decorate_resource(event_name, decorated_attributes)
+      return type('Decorated{}'.format(event_name[len('creating-resource-class.'):].replace('.', '')), tuple(base_classes), decorated_attributes)
+    fingerprint = self.__registry.resolve(event_name, _ClientAttributes(class_attributes, base_classes), operations, aliases)
+    # Client classes only depend on the service model and the decorators applied, so a decorated class
+    # is built once per distinct decorator set and shared as the base of every client class that matches it.
+    key = (
+      (event_name,) + aliases,
+      tuple((method_name, tuple(entry.decorator for entry in entries)) for method_name, entries in fingerprint),
+      mode,
+      self.__class_signature(class_attributes, base_classes)
+    )
+    # The key holds the decorators themselves, so session level changes select other entries and need no invalidation
+    entry = DecoratedSession.__client_classes.get(key)
+    if entry is not None:
+      entry[1] = next(DecoratedSession.__class_uses)
+      return entry[0]
+    decorated_class = self.__build_client_class(event_name, fingerprint, class_attributes, base_classes, mode)
+    with DecoratedSession.__lock:
+      entry = DecoratedSession.__client_classes.setdefault(key, [decorated_class, next(DecoratedSession.__class_uses)])
+      if len(DecoratedSession.__client_classes) > self.class_cache_size:
+        # Readers look classes up without the lock, so the cache is swapped rather than evicted from in place
+        DecoratedSession.__client_classes = dict(sorted(
+          DecoratedSession.__client_classes.items(), key=lambda item: item[1][1]
+        )[-self.class_cache_size:])
+    return entry[0]
+
+
+  @staticmethod
+  def __operation_call(make_api_call, method_name, operation_name):
+    # The undecorated operation as the dispatch hook presents it to decorators, mirroring botocore's client methods
+    def _api_call(self, *args, **kwargs):
+      if args:
+        raise TypeError('{}() only accepts keyword arguments.'.format(method_name))
+      return make_api_call(self, operation_name, kwargs)
+    _api_call.__name__ = str(method_name)
+    return _api_call
+
+
+  def __register_decorator(self, event_name, method_name, decorator, priority):
+    assert callable(decorator), 'decorator must be a function'
+    with DecoratedSession.__lock:
+      self.__registry = self.__registry.with_decorator(event_name, method_name, decorator, priority, SESSION_ORIGIN)
+      self.__rebind(event_name)
 
 
   @classmethod
-  def __remove_decorator(cls, event_name, method_name):
-    decorator_map = cls.__decorators.get(event_name)
-    if decorator_map and method_name:
-      decorator_map.pop(method_name)
-    if not decorator_map or not method_name:
-      cls.__decorators.pop(event_name)
-
-
-  def __unregister_decorator(self, event_name, method_name):
-    decorator_map = self.__decorators.get(event_name)
-    if decorator_map and method_name:
-      decorator_map.pop(method_name)
-    if not decorator_map or not method_name:
-      self.__decorators.pop(event_name)
-      self.events.unregister(event_name, self.__decorate)
+  def __remove_decorator(cls, event_name, method_name, decorator):
+    with DecoratedSession.__lock:
+      DecoratedSession.__registry = DecoratedSession.__registry.without_decorator(event_name, method_name, decorator)
+      cls.__invalidate_class_cache(event_name)
+      cls.__rebase_sessions(event_name)
+
+
+  @staticmethod
+  def __rebase_sessions(event_name):
+    # Callers must hold the lock. Only sessions that created live classes are tracked, they re-apply their own
+    # registrations over the new class registry.
+    for session in list(DecoratedSession.__sessions):
+      session.__rebase()
+      session.__rebind(event_name)
+
+
+  def __rebase(self):
+    # Callers must hold the lock. The session's net changes are the class level registrations it masked and its own
+    # entries, which are re-added in their registration order.
+    registry = DecoratedSession.__registry
+    for event_name, method_name, decorator in self.__masked:
+      try:
+        registry = registry.without_decorator(event_name, method_name, decorator)
+      except KeyError:
+        pass
+    entries = sorted(
+      (entry.sequence, event_name, method_name, entry) for event_name, decorator_map in self.__registry
+      for method_name, stack in decorator_map.items() for entry in stack if entry.origin == SESSION_ORIGIN
+    )
+    for _, event_name, method_name, entry in entries:
+      registry = registry.with_decorator(event_name, method_name, entry.decorator, entry.priority, SESSION_ORIGIN)
+    self.__registry = registry
+
+
+  def __rebind(self, event_name):
+    # Callers must hold the lock. Swapping the base holding a live class' methods re-binds all of them at once.
+    if event_name.startswith('creating-collection-class.'):
+      # Collections are decorated through the properties of the resource owning them
+      event_name = 'creating-resource-class.{}'.format(event_name[len('creating-collection-class.'):].rsplit('.', 1)[0])
+    for live_class in list(self.__live_classes):
+      live = live_class.__dict__['_botoinator_live']
+      if any(fnmatchcase(name, event_name) for name in (live.event_name,) + live.aliases):
+        live_class.__bases__ = (self.__methods_class(live.event_name, live.aliases, live.class_attributes, live.base_classes, live.operations, live.mode),)
+
+
+  def __track(self):
+    # Sessions start tracking class level changes with their first live class, catching up with the ones made since
+    # they were created
+    with DecoratedSession.__lock:
+      if self not in DecoratedSession.__sessions:
+        self.__rebase()
+        DecoratedSession.__sessions.add(self)
+
+
+  def __unregister_decorator(self, event_name, method_name, decorator):
+    with DecoratedSession.__lock:
+      registry = self.__registry.without_decorator(event_name, method_name, decorator)
+      # Removing the session's own entry needs no mask, it is simply no longer re-applied
+      if decorator is None or any(
+        entry.origin == CLASS_ORIGIN and entry.decorator is decorator for entry in self.__registry.get(event_name)[method_name]
+      ):
+        self.__masked[(event_name, method_name, decorator)] = None
+      self.__registry = registry
+      self.__rebind(event_name)
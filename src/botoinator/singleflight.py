@@ -0,0 +1,84 @@
+from concurrent.futures import Future
+from copy import deepcopy
+from functools import wraps
+from threading import Lock
+
+from .keys import call_key
+
+
+class _Call(Future):
+
+
+  def __init__(self):
+    super().__init__()
+    self.waiters = 0
+
+
+class SingleFlight(object):
+  """
+  A decorator that coalesces concurrent identical client calls into a single request.
+
+  While a call is in flight, other threads making the same call (same client identity, method and normalized
+  arguments, see botoinator.keys.call_key) wait for it and share its response or exception instead of sending their
+  own request. Calls that are not concurrent are not affected. Register the same instance on every method it should
+  coalesce:
+
+    single_flight = SingleFlight()
+    boto3.session.Session.add_client_decorator('dynamodb', 'describe_table', single_flight)
+  """
+
+
+  def __init__(self, copy=True):
+    """
+    Arguments:
+    copy -- if True, waiting callers get a deep copy of the shared response so that they cannot alter each other's.
+    """
+    self.__calls = {}
+    self.__copy = copy
+    self.__lock = Lock()
+
+
+  def __call__(self, func):
+    method_name = func.__name__
+
+    @wraps(func)
+    def single_flight(client, *args, **kwargs):
+      if args:
+        return func(client, *args, **kwargs)
+      try:
+        key = call_key(client, method_name, kwargs)
+      except TypeError:
+        return func(client, *args, **kwargs)
+      with self.__lock:
+        call = self.__calls.get(key)
+        if call is None:
+          leader = True
+          call = self.__calls[key] = _Call()
+        else:
+          leader = False
+          call.waiters += 1
+      if not leader:
+        response = call.result()
+        return deepcopy(response) if self.__copy else response
+      try:
+        response = func(client, *args, **kwargs)
+      except BaseException as e:
+        with self.__lock:
+          del self.__calls[key]
+        call.set_exception(e)
+        raise
+      with self.__lock:
+        del self.__calls[key]
+      # Waiters copy from a snapshot, since the leader's caller is free to change its own response
+      call.set_result(deepcopy(response) if self.__copy and call.waiters else response)
+      return response
+
+    return single_flight
+
+
+  @property
+  def in_flight(self):
+    """
+    The number of distinct calls currently in flight.
+    """
+    return len(self.__calls)
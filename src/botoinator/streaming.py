@@ -0,0 +1,275 @@
+import io
+import mmap
+
+from functools import wraps
+from threading import Lock
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class BufferPool(object):
+  """
+  A thread-safe pool of reusable bytearray buffers of one size.
+  """
+
+
+  def __init__(self, buffer_size=DEFAULT_CHUNK_SIZE, max_buffers=8):
+    """
+    Arguments:
+    buffer_size -- the size in bytes of each buffer.
+    max_buffers -- the number of released buffers kept for reuse. More can be acquired, the extra ones are dropped
+      when released.
+    """
+    assert buffer_size > 0, 'buffer_size must be greater than 0'
+    self.__buffer_size = buffer_size
+    self.__buffers = []
+    self.__lock = Lock()
+    self.__max_buffers = max_buffers
+
+
+  @property
+  def buffer_size(self):
+    return self.__buffer_size
+
+
+  def acquire(self):
+    """
+    Returns a free buffer, allocating one if the pool is empty.
+    """
+    with self.__lock:
+      if self.__buffers:
+        return self.__buffers.pop()
+    return bytearray(self.__buffer_size)
+
+
+  def release(self, buffer):
+    """
+    Returns a buffer to the pool.
+
+    Arguments:
+    buffer -- a buffer returned by acquire(). It must not be used afterwards.
+    """
+    with self.__lock:
+      if len(self.__buffers) < self.__max_buffers:
+        self.__buffers.append(buffer)
+
+
+class BufferReader(io.RawIOBase):
+  """
+  A seekable, read-only file over a buffer (memoryview, mmap, array...), so that it can be sent as a request body
+  without first being copied to bytes. Only the chunks being sent are copied.
+  """
+
+
+  def __init__(self, buffer):
+    """
+    Arguments:
+    buffer -- an object supporting the buffer protocol.
+    """
+    super().__init__()
+    self.__position = 0
+    self.__view = memoryview(buffer).cast('B')
+
+
+  def __len__(self):
+    return len(self.__view)
+
+
+  def close(self):
+    if not self.closed:
+      self.__view.release()
+    super().close()
+
+
+  def read(self, size=-1):
+    end = len(self.__view) if size is None or size < 0 else min(len(self.__view), self.__position + size)
+    chunk = self.__view[self.__position:end].tobytes()
+    self.__position = max(self.__position, end)
+    return chunk
+
+
+  def readable(self):
+    return True
+
+
+  def readinto(self, buffer):
+    chunk = self.__view[self.__position:self.__position + len(buffer)]
+    count = len(chunk)
+    memoryview(buffer).cast('B')[:count] = chunk
+    self.__position += count
+    return count
+
+
+  def seek(self, offset, whence=io.SEEK_SET):
+    if whence == io.SEEK_CUR:
+      offset += self.__position
+    elif whence == io.SEEK_END:
+      offset += len(self.__view)
+    if offset < 0:
+      raise ValueError('negative seek position {}'.format(offset))
+    self.__position = offset
+    return offset
+
+
+  def seekable(self):
+    return True
+
+
+  def tell(self):
+    return self.__position
+
+
+class PooledBody(object):
+  """
+  Wraps a StreamingBody to read it through buffers borrowed from a BufferPool.
+  """
+
+
+  def __init__(self, body, pool):
+    self.__body = body
+    self.__pool = pool
+
+
+  def __getattr__(self, name):
+    return getattr(self.__body, name)
+
+
+  def close(self):
+    self.__body.close()
+
+
+  def iter_views(self):
+    """
+    Yields the body as memoryviews of a pooled buffer. Each view is only valid until the next one is requested, copy
+    it to keep it.
+    """
+    buffer = self.__pool.acquire()
+    try:
+      view = memoryview(buffer)
+      while True:
+        count = self.__body.readinto(view)
+        if not count:
+          return
+        yield view[:count]
+    finally:
+      self.__pool.release(buffer)
+
+
+  def readinto(self, buffer):
+    return self.__body.readinto(buffer)
+
+
+def read_into(body, buffer, chunk_size=DEFAULT_CHUNK_SIZE):
+  """
+  Reads a whole streaming body into a writable buffer, returning the number of bytes read.
+
+  The body is read in chunk_size slices so that the HTTP library, which may read each slice into temporary bytes
+  before copying it, never holds more than one chunk. Raises ValueError if the body is larger than the buffer.
+
+  Arguments:
+  body -- the StreamingBody, or any object with readinto().
+  buffer -- the writable buffer (bytearray, memoryview, mmap...).
+  chunk_size -- the largest slice read at once.
+  """
+  view = memoryview(buffer).cast('B')
+  filled = 0
+  while filled < len(view):
+    count = body.readinto(view[filled:filled + chunk_size])
+    if not count:
+      return filled
+    filled += count
+  # Reading past the end lets botocore verify the content length
+  if body.readinto(bytearray(1)):
+    raise ValueError('the body is larger than the buffer of {} bytes'.format(len(view)))
+  return filled
+
+
+class ZeroCopy(object):
+  """
+  A decorator for s3 get_object and put_object that moves object bodies without holding extra copies of them.
+
+  get_object accepts two extra arguments:
+
+    Buffer -- a writable buffer (bytearray, memoryview, mmap...) the body is read into. The response's Body is a
+      memoryview of the part that was filled.
+    Filename -- the path of a file the body is streamed into through a memory map, created or truncated to the
+      object's size. The response's Body is the open mmap, which the caller must close (or a memoryview of
+      nothing for empty objects).
+
+  Without them, the body is returned as a PooledBody reading through the decorator's BufferPool, if it has one.
+  put_object accepts any buffer as Body, such as a memoryview or an mmap, and sends it without copying it to bytes:
+
+    zero_copy = ZeroCopy(pool=BufferPool(8 * 1024 * 1024))
+    session.register_client_decorator('s3', ['get_object', 'put_object'], zero_copy)
+  """
+
+
+  def __init__(self, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Arguments:
+    pool -- a BufferPool that get_object bodies are read through when no Buffer or Filename is given, or None to
+      leave them unchanged.
+    chunk_size -- the largest slice read from the network at once.
+    """
+    assert chunk_size > 0, 'chunk_size must be greater than 0'
+    self.__chunk_size = chunk_size
+    self.__pool = pool
+
+
+  def __call__(self, func):
+    if func.__name__ == 'get_object':
+      return self.__get_object(func)
+    if func.__name__ == 'put_object':
+      return self.__put_object(func)
+    return func
+
+
+  def __get_object(self, func):
+
+    @wraps(func)
+    def get_object(client, *args, **kwargs):
+      buffer = kwargs.pop('Buffer', None)
+      filename = kwargs.pop('Filename', None)
+      assert buffer is None or filename is None, 'Buffer and Filename cannot be used together'
+      response = func(client, *args, **kwargs)
+      body = response['Body']
+      if buffer is not None:
+        with body:
+          response['Body'] = memoryview(buffer).cast('B')[:read_into(body, buffer, self.__chunk_size)]
+      elif filename is not None:
+        with body:
+          response['Body'] = self.__map_file(body, filename, response['ContentLength'])
+      elif self.__pool is not None:
+        response['Body'] = PooledBody(body, self.__pool)
+      return response
+
+    return get_object
+
+
+  def __map_file(self, body, filename, size):
+    with open(filename, 'w+b') as file:
+      if not size:
+        read_into(body, bytearray(0))
+        return memoryview(b'')
+      file.truncate(size)
+      mapped = mmap.mmap(file.fileno(), size)
+    try:
+      read_into(body, mapped, self.__chunk_size)
+    except BaseException:
+      mapped.close()
+      raise
+    return mapped
+
+
+  @staticmethod
+  def __put_object(func):
+
+    @wraps(func)
+    def put_object(client, *args, **kwargs):
+      body = kwargs.get('Body')
+      if body is not None and not isinstance(body, (bytes, bytearray, str)) and not hasattr(body, 'read'):
+        kwargs['Body'] = BufferReader(body)
+      return func(client, *args, **kwargs)
+
+    return put_object
@@ -0,0 +1,185 @@
+import random
+
+from botocore import xform_name
+from botocore.waiter import WaiterError, is_valid_waiter_error
+from functools import wraps
+from threading import Lock
+from time import monotonic, sleep
+from types import MethodType
+
+from .selectors import compile_selector
+
+
+_hooks = {}
+_hooks_lock = Lock()
+
+
+class WaiterHook(object):
+  """
+  A client decorator for get_waiter that applies a waiter decorator to the wait() method of the waiters it returns.
+
+  Waiter decorators take and return a function of (waiter, **kwargs), named after the snake cased waiter name (such as
+  'bucket_exists'), like client method decorators take client methods.
+  """
+
+
+  def __init__(self, selector, decorator):
+    """
+    Arguments:
+    selector -- the waiter name, a glob such as '*_exists' or a compiled regular expression.
+    decorator -- the waiter decorator.
+    """
+    self.__decorator = decorator
+    self.__selector = compile_selector(selector)
+    self.__waiter_selector = selector
+
+
+  def __call__(self, func):
+
+    @wraps(func)
+    def get_waiter(client, waiter_name):
+      waiter = func(client, waiter_name)
+      name = xform_name(waiter.name)
+      if self.__selector.select({name: waiter.wait}):
+        wait = waiter.wait.__func__
+        if 'wait' not in vars(waiter):
+          wait = self.__named(wait, name)
+        waiter.wait = MethodType(self.__decorator(wait), waiter)
+      return waiter
+
+    return get_waiter
+
+
+  @property
+  def decorator(self):
+    """
+    The waiter decorator.
+    """
+    return self.__decorator
+
+
+  @property
+  def selector(self):
+    """
+    The waiter name, glob or compiled regular expression the hook was created with.
+    """
+    return self.__waiter_selector
+
+
+  @staticmethod
+  def __named(wait, name):
+    def named_wait(waiter, **kwargs):
+      return wait(waiter, **kwargs)
+    named_wait.__name__ = str(name)
+    named_wait.__doc__ = wait.__doc__
+    return named_wait
+
+
+def waiter_hook(selector, decorator):
+  """
+  Returns the WaiterHook of a waiter selector and decorator, the same one every time so that it can be unregistered.
+
+  Arguments:
+  selector -- the waiter name, a glob such as '*_exists' or a compiled regular expression.
+  decorator -- the waiter decorator.
+  """
+  key = (selector, decorator)
+  hook = _hooks.get(key)
+  if hook is None:
+    with _hooks_lock:
+      hook = _hooks.setdefault(key, WaiterHook(selector, decorator))
+  return hook
+
+
+class AdaptiveWaiter(object):
+  """
+  A waiter decorator that polls with exponentially growing, jittered delays instead of the waiter's fixed delay.
+
+  Waiters normally sleep their model's delay (5 to 30 seconds) between every poll, so a resource that is ready after a
+  second is only noticed several seconds later. The adaptive policy polls after initial_delay, doubling the delay up
+  to the waiter's own delay, and stops as soon as a success or failure state is matched. It also gives up as soon as
+  the next sleep would overrun the waiter's total time budget (its delay times its max attempts, as WaiterConfig sets
+  them) rather than sleeping to no avail:
+
+    boto3.session.Session.add_waiter_decorator('cloudformation', 'stack_*_complete', AdaptiveWaiter())
+
+  It replaces the waiter's polling loop, so waiter decorators that wrap the whole wait need a higher priority.
+  A WaiterConfig argument still sets the highest delay (Delay) and the number of polls (MaxAttempts).
+  """
+
+
+  def __init__(self, initial_delay=1.0, multiplier=2.0, max_delay=None, jitter=0.5, max_time=None):
+    """
+    Arguments:
+    initial_delay -- the seconds slept after the first poll.
+    multiplier -- the factor each delay is multiplied by.
+    max_delay -- the longest delay in seconds, the waiter's delay by default.
+    jitter -- the fraction of each delay that is randomized, so that concurrent waiters do not poll together.
+    max_time -- the seconds after which waiting fails. By default, the waiter's delay times its max attempts, both
+      taken from the WaiterConfig argument when it sets them.
+    """
+    assert initial_delay > 0, 'initial_delay must be greater than 0'
+    assert multiplier >= 1, 'multiplier must be at least 1'
+    assert 0 <= jitter <= 1, 'jitter must be between 0 and 1'
+    self.__initial_delay = initial_delay
+    self.__jitter = jitter
+    self.__max_delay = max_delay
+    self.__max_time = max_time
+    self.__multiplier = multiplier
+
+
+  def __call__(self, func):
+
+    @wraps(func)
+    def adaptive_wait(waiter, **kwargs):
+      self.wait(waiter, **kwargs)
+
+    return adaptive_wait
+
+
+  def wait(self, waiter, **kwargs):
+    """
+    Polls the waiter's operation until one of its acceptors matches a success or failure state, raising WaiterError
+    on failure, or when the attempts or time run out.
+
+    Arguments:
+    waiter -- the botocore Waiter.
+    kwargs -- the arguments of the waiter's operation, and an optional WaiterConfig.
+    """
+    config = kwargs.pop('WaiterConfig', {})
+    max_delay = config.get('Delay', self.__max_delay or waiter.config.delay)
+    max_attempts = config.get('MaxAttempts', waiter.config.max_attempts)
+    # The time budget is the one botocore would wait for with the same WaiterConfig
+    max_time = self.__max_time if self.__max_time is not None else config.get('Delay', waiter.config.delay) * max_attempts
+    deadline = monotonic() + max_time
+    delay = min(self.__initial_delay, max_delay)
+    matched = None
+    attempts = 0
+    while True:
+      response = waiter._operation_method(**kwargs)
+      attempts += 1
+      state = 'waiting'
+      for acceptor in waiter.config.acceptors:
+        if acceptor.matcher_func(response):
+          matched = acceptor
+          state = acceptor.state
+          break
+      else:
+        if is_valid_waiter_error(response):
+          raise WaiterError(
+            name=waiter.name,
+            reason='An error occurred ({}): {}'.format(response['Error'].get('Code', 'Unknown'), response['Error'].get('Message', 'Unknown')),
+            last_response=response
+          )
+      if state == 'success':
+        return
+      if state == 'failure':
+        raise WaiterError(name=waiter.name, reason='Waiter encountered a terminal failure state: {}'.format(matched.explanation), last_response=response)
+      seconds = delay * (1 - self.__jitter * random.random())
+      if attempts >= max_attempts or monotonic() + seconds > deadline:
+        reason = 'Max attempts exceeded' if attempts >= max_attempts else 'Max wait time exceeded'
+        if matched is not None:
+          reason += '. Previously accepted state: {}'.format(matched.explanation)
+        raise WaiterError(name=waiter.name, reason=reason, last_response=response)
+      sleep(seconds)
+      delay = min(delay * self.__multiplier, max_delay)
@@ -1,11 +1,42 @@
 #!/usr/bin/env python3.7
 
 import boto3
+import botocore.awsrequest
+import botocore.config
+import datetime
+import gc
+import io
+import json
+import mmap
+import re
+import subprocess
 import sys
 import os
+import pickle
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from botocore.stub import Stubber
+from functools import wraps
 from moto import mock_s3, mock_sqs
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src/")
 import botoinator
+botoinator.install()
+from botoinator.batching import WriteBatcher
+from botoinator.cassette import Cassette, decode, encode
+from botoinator.cache import FileBackend, ResponseCache
+from botoinator.hedging import Hedger
+from botoinator.metrics import Metrics, to_json, to_prometheus
+from botoinator.operations import AnyOperation, HttpMethod, Paginated, ReadOnly
+from botoinator.pagination import AutoPaginator
+from botoinator.profiler import Profiler
+from botoinator.ratelimit import RateLimiter, get_bucket, reset_buckets
+from botoinator.singleflight import SingleFlight
+from botoinator.streaming import BufferPool, PooledBody, ZeroCopy
+from botoinator.waiters import AdaptiveWaiter
+from botocore.waiter import WaiterError
 
 """ This is our decorator that we will apply to boto3 methods """
 def myDecorator(func):
@@ -157,6 +188,1250 @@ def testAddToResource():
   # Should not have decorated
   assert not hasattr(queue3.delete, 'testValue')
 
+@mock_s3
+def testClientClassCache():
+
+  """
+  Test that sessions with the same decorators share one decorated client class
+  """
+
+  boto3.session.Session.add_client_decorator('s3', 'create_bucket', myDecorator)
+
+  # Both clients are built on top of the same cached decorated class
+  clientA = boto3.Session().client('s3')
+  clientB = boto3.Session().client('s3')
+  assert type(clientA).__bases__ == type(clientB).__bases__
+
+  # A session with different decorators gets its own decorated class
+  s = boto3.Session()
+  s.register_client_decorator('s3', 'delete_bucket', myDecorator)
+  clientC = s.client('s3')
+  assert type(clientC).__bases__ != type(clientA).__bases__
+
+  # Sessions registering the same decorators share a decorated class too
+  sessions = [boto3.Session() for _ in range(5)]
+  for session in sessions:
+    session.register_client_decorator('s3', 'delete_bucket', myDecorator)
+  assert len({type(session.client('s3')).__bases__ for session in sessions + [s]}) == 1
+
+  # Removing the decorator invalidates the cached class
+  boto3.session.Session.remove_client_decorator('s3', 'create_bucket')
+  clientD = boto3.Session().client('s3')
+  assert type(clientD).__bases__ != type(clientA).__bases__
+  clientD.create_bucket(Bucket='foo')
+  assert not hasattr(clientD.create_bucket, 'testValue')
+
+@mock_s3
+def testRegistrySnapshot():
+
+  """
+  Test that sessions only fork the class' decorators when they change them
+  """
+
+  boto3.session.Session.add_client_decorator('s3', 'create_bucket', myDecorator)
+
+  # This session stops decorating create_bucket without affecting the class or other sessions
+  s = boto3.Session()
+  s.unregister_client_decorator('s3', 'create_bucket')
+  client1 = s.client('s3')
+  client1.create_bucket(Bucket='foo')
+  assert not hasattr(client1.create_bucket, 'testValue')
+
+  client2 = boto3.Session().client('s3')
+  client2.create_bucket(Bucket='bar')
+  assert hasattr(client2.create_bucket, 'testValue')
+
+  boto3.session.Session.remove_client_decorator('s3', 'create_bucket')
+
+def testConcurrentRegistry():
+
+  """
+  Test creating sessions and clients from many threads while decorators are added and removed
+  """
+
+  errors = []
+  done = threading.Event()
+
+  def createClients():
+    try:
+      for _ in range(3):
+        s = boto3.Session(aws_access_key_id='foo', aws_secret_access_key='bar', region_name='us-east-1')
+        for _ in range(5):
+          s.client('s3')
+          s.client('sqs')
+    except Exception as e:
+      errors.append(e)
+
+  def changeDecorators():
+    try:
+      while not done.is_set():
+        for method_name in ('create_bucket', 'delete_bucket', 'list_buckets'):
+          boto3.session.Session.add_client_decorator('s3', method_name, myDecorator)
+          boto3.session.Session.add_client_decorator('sqs', method_name, myDecorator)
+        for method_name in ('create_bucket', 'delete_bucket', 'list_buckets'):
+          boto3.session.Session.remove_client_decorator('s3', method_name)
+          boto3.session.Session.remove_client_decorator('sqs', method_name)
+    except Exception as e:
+      errors.append(e)
+
+  mutator = threading.Thread(target=changeDecorators)
+  mutator.start()
+  workers = [threading.Thread(target=createClients) for _ in range(8)]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+  done.set()
+  mutator.join()
+
+  assert not errors, errors
+
+@mock_s3
+def testDispatchMode():
+
+  """
+  Test decorating client operations through the single dispatch hook
+  """
+
+  calls = []
+  def countingDecorator(func):
+    @wraps(func)
+    def counting_decorator(*args, **kwargs):
+      calls.append(func.__name__)
+      return func(*args, **kwargs)
+    return counting_decorator
+
+  s = boto3.Session()
+  s.client_decoration_mode = boto3.session.Session.DISPATCH_DECORATION
+  s.register_client_decorator('s3', 'create_bucket', countingDecorator)
+  client = s.client('s3')
+
+  # The decorator runs for the operation, but the client method itself is left untouched
+  client.create_bucket(Bucket='foo')
+  client.list_buckets()
+  assert calls == ['create_bucket']
+  assert client.create_bucket.__name__ == 'create_bucket'
+  assert client.list_buckets()['Buckets'][0]['Name'] == 'foo'
+
+@mock_s3
+def testDecoratorStack():
+
+  """
+  Test stacking several decorators on the same method
+  """
+
+  calls = []
+  def makeDecorator(name):
+    def decorator(func):
+      def stacked_decorator(*args, **kwargs):
+        calls.append(name)
+        return func(*args, **kwargs)
+      return stacked_decorator
+    return decorator
+
+  metrics = makeDecorator('metrics')
+  retries = makeDecorator('retries')
+  caching = makeDecorator('caching')
+
+  # Class-level decorators are merged with the session's, higher priorities are called first
+  boto3.session.Session.add_client_decorator('s3', 'create_bucket', retries)
+  s = boto3.Session()
+  s.register_client_decorator('s3', 'create_bucket', metrics, priority=10)
+  s.register_client_decorator('s3', 'create_bucket', caching, priority=-10)
+  s.client('s3').create_bucket(Bucket='foo')
+  assert calls == ['metrics', 'retries', 'caching']
+
+  # Unregistering a single decorator leaves the rest of the stack in place
+  del calls[:]
+  s.unregister_client_decorator('s3', 'create_bucket', retries)
+  s.client('s3').create_bucket(Bucket='bar')
+  assert calls == ['metrics', 'caching']
+
+  boto3.session.Session.remove_client_decorator('s3', 'create_bucket')
+
+  # Decorators stacked above one that drops the method name (no functools.wraps) still see the name of their method
+  s = stubbedSession()
+  s.register_client_decorator('ec2', ['describe_instances', 'describe_volumes'], myDecorator)
+  s.register_client_decorator('ec2', ['describe_instances', 'describe_volumes'], ResponseCache(), priority=10)
+  client = s.client('ec2')
+  with Stubber(client) as stubber:
+    stubber.add_response('describe_instances', {'Reservations': []})
+    stubber.add_response('describe_volumes', {'Volumes': []})
+    assert 'Reservations' in client.describe_instances()
+    assert 'Volumes' in client.describe_volumes()
+    stubber.assert_no_pending_responses()
+  s = stubbedSession()
+  s.client_decoration_mode = boto3.session.Session.DISPATCH_DECORATION
+  s.register_client_decorator('sqs', 'send_message', myDecorator)
+  batcher = WriteBatcher(linger=0, wait=False)
+  s.register_client_decorator('sqs', 'send_message', batcher, priority=10)
+  client = s.client('sqs')
+  with Stubber(client) as stubber:
+    stubber.add_response('send_message_batch', {'Successful': [{'Id': '0', 'MessageId': 'a', 'MD5OfMessageBody': 'x'}], 'Failed': []})
+    assert client.send_message(QueueUrl='https://queue.amazonaws.com/123456789012/foo', MessageBody='foo').result()['MessageId'] == 'a'
+  batcher.close()
+
+@mock_s3
+@mock_sqs
+def testSelectors():
+
+  """
+  Test selecting the methods to decorate with globs and regular expressions
+  """
+
+  s = boto3.Session(region_name='us-east-1')
+  s.register_client_decorator('*', 'create_*', myDecorator)
+  s.register_client_decorator('s3', re.compile('list_(buckets|objects)'), myDecorator)
+
+  s3 = s.client('s3')
+  sqs = s.client('sqs')
+  s3.create_bucket(Bucket='foo')
+  sqs.create_queue(QueueName='foo')
+  s3.list_buckets()
+  s3.delete_bucket(Bucket='foo')
+  assert hasattr(s3.create_bucket, 'testValue')
+  assert hasattr(sqs.create_queue, 'testValue')
+  assert hasattr(s3.list_buckets, 'testValue')
+  assert not hasattr(s3.delete_bucket, 'testValue')
+
+  # Selectors are removed by the same selector they were registered with
+  s.unregister_client_decorator('*', 'create_*')
+  s3 = s.client('s3')
+  s3.create_bucket(Bucket='bar')
+  assert not hasattr(s3.create_bucket, 'testValue')
+
+  # Clients are selected by their boto3 name and by the service id botocore names their class event after
+  for service_name in ('secretsmanager', 'secrets-manager'):
+    s = stubbedSession()
+    s.register_client_decorator(service_name, 'get_secret_value', myDecorator)
+    client = s.client('secretsmanager')
+    with Stubber(client) as stubber:
+      stubber.add_response('get_secret_value', {'Name': 'foo'})
+      client.get_secret_value(SecretId='foo')
+    assert hasattr(client.get_secret_value, 'testValue')
+
+@mock_s3
+def testOperationPredicates():
+
+  """
+  Test selecting client operations by their service model metadata
+  """
+
+  s = boto3.Session()
+  s.register_client_decorator('s3', HttpMethod('GET') & Paginated(), myDecorator)
+  s.register_client_decorator('*', ReadOnly() & ~Paginated(), myDecorator)
+
+  client = s.client('s3')
+  client.create_bucket(Bucket='foo')
+  client.list_objects_v2(Bucket='foo')
+  client.list_buckets()
+  client.get_bucket_location(Bucket='foo')
+  assert hasattr(client.list_objects_v2, 'testValue')
+  assert hasattr(client.get_bucket_location, 'testValue')
+  assert not hasattr(client.create_bucket, 'testValue')
+
+  # Predicates never match resource methods
+  s.register_resource_decorator('s3', 'Bucket', ReadOnly(), myDecorator)
+  bucket = s.resource('s3').Bucket('foo')
+  bucket.delete()
+  assert not hasattr(bucket.delete, 'testValue')
+
+def stubbedSession():
+  """ Returns a session with static credentials so that stubbed clients never look for real ones """
+  return boto3.Session(aws_access_key_id='foo', aws_secret_access_key='bar', region_name='us-east-1')
+
+def testResponseCache():
+
+  """
+  Test caching the responses of idempotent calls
+  """
+
+  cache = ResponseCache(maxsize=1, ttl=60)
+  s = stubbedSession()
+  s.register_client_decorator('ssm', 'get_parameter', cache)
+  client = s.client('ssm')
+
+  # The stubber only answers once per parameter, so repeated calls must come from the cache
+  with Stubber(client) as stubber:
+    stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}}, {'Name': 'foo'})
+    stubber.add_response('get_parameter', {'Parameter': {'Name': 'baz', 'Value': 'qux'}}, {'Name': 'baz'})
+    assert client.get_parameter(Name='foo')['Parameter']['Value'] == 'bar'
+    response = client.get_parameter(Name='foo')
+    assert response['Parameter']['Value'] == 'bar'
+
+    # Callers get copies, so changing a response does not change the cache
+    response['Parameter']['Value'] = 'changed'
+    assert client.get_parameter(Name='foo')['Parameter']['Value'] == 'bar'
+
+    # A second parameter evicts the first from the single entry cache
+    assert client.get_parameter(Name='baz')['Parameter']['Value'] == 'qux'
+    stubber.assert_no_pending_responses()
+  assert cache.stats == (2, 2, 1, 1)
+
+  # A file backend shares entries between caches (and processes) using the same directory
+  with tempfile.TemporaryDirectory() as directory:
+    client = stubbedSession().client('ssm')
+    with Stubber(client) as stubber:
+      stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}}, {'Name': 'foo'})
+      ResponseCache(backend=FileBackend(directory))(client.get_parameter.__func__)(client, Name='foo')
+      assert ResponseCache(backend=FileBackend(directory))(client.get_parameter.__func__)(client, Name='foo')['Parameter']['Value'] == 'bar'
+
+  # Entries are named the same in every process, even for sets whose order changes with hash randomization
+  script = 'import sys; sys.path.insert(0, sys.argv[1]); from botoinator.keys import canonical, normalize; print(canonical(normalize({"b": {"x", "y", "z"}, "a": [b"1", 2.0]})).decode())'
+  encodings = {
+    subprocess.run([sys.executable, '-c', script, botoinator.__path__[0] + '/..'], env=dict(os.environ, PYTHONHASHSEED=str(seed)), check=True, capture_output=True, text=True).stdout
+    for seed in range(4)
+  }
+  assert len(encodings) == 1
+
+def testSingleFlight():
+
+  """
+  Test coalescing concurrent identical calls into one request
+  """
+
+  requests = []
+  def slowDecorator(func):
+    def slow_decorator(*args, **kwargs):
+      requests.append(kwargs)
+      time.sleep(0.2)
+      return func(*args, **kwargs)
+    return slow_decorator
+
+  single_flight = SingleFlight()
+  s = stubbedSession()
+  s.register_client_decorator('secretsmanager', 'get_secret_value', single_flight, priority=1)
+  s.register_client_decorator('secretsmanager', 'get_secret_value', slowDecorator)
+  client = s.client('secretsmanager')
+
+  responses = []
+  barrier = threading.Barrier(8)
+  def getSecret():
+    barrier.wait()
+    responses.append(client.get_secret_value(SecretId='foo')['SecretString'])
+
+  # The stubber only answers once, so every thread must share the single request's response
+  with Stubber(client) as stubber:
+    stubber.add_response('get_secret_value', {'SecretString': 'bar'}, {'SecretId': 'foo'})
+    threads = [threading.Thread(target=getSecret) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+  assert responses == ['bar'] * 8
+  assert len(requests) == 1
+  assert single_flight.in_flight == 0
+
+  # Errors are shared too
+  with Stubber(client) as stubber:
+    stubber.add_client_error('get_secret_value', 'ResourceNotFoundException')
+    try:
+      client.get_secret_value(SecretId='foo')
+      assert False
+    except client.exceptions.ResourceNotFoundException:
+      pass
+
+def testWriteBatcher():
+
+  """
+  Test buffering single item writes into batch calls
+  """
+
+  batcher = WriteBatcher(linger=60, wait=False)
+  s = stubbedSession()
+  s.register_client_decorator('sqs', 'send_message', batcher)
+  client = s.client('sqs')
+  url = 'https://queue.amazonaws.com/123456789012/foo'
+
+  with Stubber(client) as stubber:
+    stubber.add_response(
+      'send_message_batch',
+      {
+        'Successful': [
+          {'Id': '0', 'MessageId': 'a', 'MD5OfMessageBody': 'x'},
+          {'Id': '2', 'MessageId': 'c', 'MD5OfMessageBody': 'z'}
+        ],
+        'Failed': [{'Id': '1', 'SenderFault': True, 'Code': 'InvalidMessageContents'}]
+      },
+      {'QueueUrl': url, 'Entries': [{'Id': str(i), 'MessageBody': str(i)} for i in range(3)]}
+    )
+    futures = [client.send_message(QueueUrl=url, MessageBody=str(i)) for i in range(3)]
+    assert not any(future.done() for future in futures)
+    batcher.flush()
+    stubber.assert_no_pending_responses()
+  assert futures[0].result()['MessageId'] == 'a'
+  assert futures[2].result()['MessageId'] == 'c'
+  try:
+    futures[1].result()
+    assert False
+  except client.exceptions.ClientError as e:
+    assert e.response['Error']['Code'] == 'InvalidMessageContents'
+
+  # Unprocessed items are sent again with the next batch, and full batches are sent without waiting to linger
+  batcher = WriteBatcher(linger=60, wait=False, max_count=2)
+  s.register_client_decorator('dynamodb', 'put_item', batcher)
+  client = s.client('dynamodb')
+  items = [{'id': {'S': str(i)}} for i in range(3)]
+  with Stubber(client) as stubber:
+    stubber.add_response('batch_write_item', {'UnprocessedItems': {'foo': [{'PutRequest': {'Item': items[1]}}]}}, {'RequestItems': {'foo': [{'PutRequest': {'Item': item}} for item in items[:2]]}})
+    stubber.add_response('batch_write_item', {}, {'RequestItems': {'foo': [{'PutRequest': {'Item': item}} for item in items[1:]]}})
+    futures = [client.put_item(TableName='foo', Item=item) for item in items]
+    stubber.assert_no_pending_responses()
+  assert all(future.done() for future in futures)
+  batcher.close()
+
+  # Calls missing from a short batch response fail instead of waiting forever
+  batcher = WriteBatcher(linger=0.5)
+  s.register_client_decorator('firehose', 'put_record', batcher)
+  client = s.client('firehose')
+  with Stubber(client) as stubber:
+    stubber.add_response('put_record_batch', {'FailedPutCount': 0, 'RequestResponses': [{'RecordId': 'a'}]})
+    results = []
+    def putRecord(data):
+      try:
+        results.append(client.put_record(DeliveryStreamName='foo', Record={'Data': data})['RecordId'])
+      except client.exceptions.ClientError as e:
+        results.append(e.response['Error']['Code'])
+    threads = [threading.Thread(target=putRecord, args=(data,)) for data in (b'a', b'b')]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join(5)
+  assert sorted(results) == ['InternalError', 'a']
+  batcher.close()
+
+  # Every failed call gets its own exception, and a discarded batcher is not kept alive by its linger thread or atexit
+  running = set(threading.enumerate())
+  batcher = WriteBatcher(linger=60, wait=False)
+  session = stubbedSession()
+  session.register_client_decorator('sqs', 'send_message', batcher)
+  client = session.client('sqs')
+  with Stubber(client) as stubber:
+    stubber.add_response('send_message_batch', {'Successful': [], 'Failed': []})
+    futures = [client.send_message(QueueUrl=url, MessageBody=str(i)) for i in range(2)]
+    batcher.flush()
+  errors = [future.exception() for future in futures]
+  assert errors[0] is not errors[1]
+  assert all(error.response['Error']['Code'] == 'InternalError' for error in errors)
+  thread = next(thread for thread in threading.enumerate() if thread not in running)
+  batcherRef = weakref.ref(batcher)
+  del session, batcher, client, stubber, futures, errors
+  boto3.session.Session.clear_class_cache()
+  gc.collect()
+  assert batcherRef() is None
+  thread.join(5)
+  assert not thread.is_alive()
+
+
+def testAutoPaginator():
+
+  """
+  Test lazily iterating over the items of every page
+  """
+
+  requests = []
+  def countingDecorator(func):
+    @wraps(func)
+    def counting_decorator(*args, **kwargs):
+      requests.append(kwargs)
+      return func(*args, **kwargs)
+    return counting_decorator
+
+  s = stubbedSession()
+  s.register_client_decorator('s3', 'list_objects_v2', AutoPaginator(prefetch=1), priority=1)
+  s.register_client_decorator('s3', 'list_objects_v2', countingDecorator)
+  client = s.client('s3')
+
+  def addPages(stubber, count):
+    for page in range(count):
+      response = {'Contents': [{'Key': '{}-{}'.format(page, i)} for i in range(2)], 'IsTruncated': page < count - 1}
+      request = {'Bucket': 'foo'}
+      if page < count - 1:
+        response['NextContinuationToken'] = str(page + 1)
+      if page:
+        request['ContinuationToken'] = str(page)
+      stubber.add_response('list_objects_v2', response, request)
+
+  with Stubber(client) as stubber:
+    addPages(stubber, 3)
+    objects = client.list_objects_v2(Bucket='foo')
+    assert [obj['Key'] for obj in objects] == ['0-0', '0-1', '1-0', '1-1', '2-0', '2-1']
+    stubber.assert_no_pending_responses()
+
+    # Passing the input token paginates manually
+    stubber.add_response('list_objects_v2', {'Contents': [{'Key': 'bar'}], 'IsTruncated': False}, {'Bucket': 'foo', 'ContinuationToken': 'baz'})
+    assert client.list_objects_v2(Bucket='foo', ContinuationToken='baz')['Contents'][0]['Key'] == 'bar'
+
+    # Errors are raised to the caller when it reaches the failed page
+    stubber.add_client_error('list_objects_v2', 'NoSuchBucket')
+    try:
+      list(client.list_objects_v2(Bucket='foo'))
+      assert False
+    except client.exceptions.NoSuchBucket:
+      pass
+
+  # Stopping early only fetches up to prefetch pages ahead
+  with Stubber(client) as stubber:
+    addPages(stubber, 3)
+    del requests[:]
+    objects = client.list_objects_v2(Bucket='foo')
+    assert not requests
+    assert next(objects)['Key'] == '0-0'
+    time.sleep(0.2)
+    objects.close()
+    assert len(requests) == 2
+
+def testMetrics():
+
+  """
+  Test recording per operation latency histograms and counters from several threads
+  """
+
+  metrics = Metrics()
+  s = stubbedSession()
+  s.register_client_decorator('*', AnyOperation(), metrics)
+  client = s.client('ssm')
+
+  with Stubber(client) as stubber:
+    for _ in range(4):
+      stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}, 'ResponseMetadata': {'RetryAttempts': 1}})
+    stubber.add_client_error('get_parameter', 'ParameterNotFound')
+    threads = [threading.Thread(target=client.get_parameter, kwargs={'Name': 'foo'}) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    try:
+      client.get_parameter(Name='foo')
+      assert False
+    except client.exceptions.ParameterNotFound:
+      pass
+
+  stats = metrics.snapshot()[('ssm', 'GetParameter', 'us-east-1')]
+  assert (stats.calls, stats.errors, stats.retries) == (5, 1, 4)
+  assert sum(stats.buckets) == 5
+  assert 0 < stats.percentile(50) <= stats.percentile(99)
+  assert 'botoinator_client_calls_total{service="ssm",operation="GetParameter",region="us-east-1"} 5' in to_prometheus(metrics.snapshot())
+  assert 'botoinator_client_latency_seconds_bucket{service="ssm",operation="GetParameter",region="us-east-1",le="+Inf"} 5' in to_prometheus(metrics.snapshot())
+  assert json.loads(to_json(metrics.snapshot()))[0]['calls'] == 5
+
+  # Non operation methods are not instrumented
+  assert not hasattr(client.get_paginator, '__wrapped__')
+  metrics.reset()
+  assert metrics.snapshot() == {}
+
+@mock_sqs
+def testProfiler():
+
+  """
+  Test profiling the phases of sampled calls
+  """
+
+  profiler = Profiler(rate=1.0, memory=True)
+  s = stubbedSession()
+  s.register_client_decorator('sqs', AnyOperation(), profiler)
+  client = s.client('sqs')
+  client.create_queue(QueueName='foo')
+  client.get_queue_url(QueueName='foo')
+  client.get_queue_url(QueueName='foo')
+
+  stats = profiler.report()[('sqs', 'GetQueueUrl')]
+  assert (stats.samples, stats.phased) == (2, 2)
+  assert 0 < stats.serialize + stats.send + stats.parse <= stats.seconds
+  assert 'sqs.GetQueueUrl' in profiler.format_report()
+  assert profiler.report(reset=True) and not profiler.report()
+  tracemalloc.stop()
+
+  # Nothing is sampled with a rate of 0
+  profiler = Profiler(rate=0)
+  s.register_client_decorator('sqs', 'get_queue_url', profiler)
+  s.client('sqs').get_queue_url(QueueName='foo')
+  assert not profiler.report()
+
+def testInstall():
+
+  """
+  Test opting in and out of replacing boto3's Session class
+  """
+
+  # Importing botoinator patches nothing, the first class level decorator does
+  subprocess.check_call([sys.executable, '-c', """
+import boto3, botoinator
+assert boto3.Session is not botoinator.DecoratedSession and not botoinator.is_installed()
+botoinator.DecoratedSession.add_client_decorator('s3', 'create_bucket', lambda func: func)
+assert boto3.Session is botoinator.DecoratedSession and boto3.session.Session is botoinator.DecoratedSession
+"""], env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.realpath(__file__)) + "/../src/"))
+
+  botoinator.uninstall()
+  assert not botoinator.is_installed()
+  assert not isinstance(stubbedSession(), botoinator.DecoratedSession)
+
+  # After uninstalling, adding decorators does not install again, but DecoratedSession works without the patch
+  botoinator.DecoratedSession.add_client_decorator('sts', 'get_caller_identity', myDecorator)
+  assert not botoinator.is_installed()
+  client = botoinator.DecoratedSession(aws_access_key_id='foo', aws_secret_access_key='bar', region_name='us-east-1').client('sts')
+  with Stubber(client) as stubber:
+    stubber.add_response('get_caller_identity', {'Account': '123456789012'})
+    client.get_caller_identity()
+  assert hasattr(client.get_caller_identity, 'testValue')
+
+  with botoinator.installed():
+    assert isinstance(stubbedSession(), botoinator.DecoratedSession)
+    assert isinstance(boto3._get_default_session(), botoinator.DecoratedSession)
+  assert not botoinator.is_installed()
+  assert boto3.DEFAULT_SESSION is None
+
+  botoinator.DecoratedSession.remove_client_decorator('sts', 'get_caller_identity')
+  botoinator.install()
+  assert boto3.Session is botoinator.DecoratedSession
+
+def testHotSwap():
+
+  """
+  Test re-binding the methods of live clients and resources when decorators change
+  """
+
+  calls = []
+  def countingDecorator(func):
+    @wraps(func)
+    def counting_decorator(*args, **kwargs):
+      calls.append(func.__name__)
+      return func(*args, **kwargs)
+    return counting_decorator
+
+  def getCallerIdentity(client):
+    with Stubber(client) as stubber:
+      stubber.add_response('get_caller_identity', {'Account': '123456789012'})
+      client.get_caller_identity()
+
+  s = stubbedSession()
+  s.hot_swap = True
+  client = s.client('sts')
+  getCallerIdentity(client)
+  assert not calls
+
+  # Registering decorates the live client, unregistering undecorates it
+  s.register_client_decorator('sts', 'get_caller_identity', countingDecorator)
+  getCallerIdentity(client)
+  assert calls == ['get_caller_identity']
+  s.unregister_client_decorator('sts', 'get_caller_identity', countingDecorator)
+  getCallerIdentity(client)
+  assert calls == ['get_caller_identity']
+
+  # Class level changes reach live clients of hot swapping sessions only
+  def classDecorator(func):
+    return countingDecorator(func)
+  other = stubbedSession().client('sts')
+  boto3.session.Session.add_client_decorator('sts', 'get_caller_identity', classDecorator)
+  getCallerIdentity(client)
+  getCallerIdentity(other)
+  assert calls == ['get_caller_identity'] * 2
+  boto3.session.Session.remove_client_decorator('sts', 'get_caller_identity', classDecorator)
+  getCallerIdentity(client)
+  assert calls == ['get_caller_identity'] * 2
+
+  # Hot swapping sessions without live clients pick up the class level changes made since they were created
+  later = stubbedSession()
+  later.hot_swap = True
+  boto3.session.Session.add_client_decorator('sts', 'get_caller_identity', classDecorator)
+  getCallerIdentity(later.client('sts'))
+  assert calls == ['get_caller_identity'] * 3
+  boto3.session.Session.remove_client_decorator('sts', 'get_caller_identity', classDecorator)
+
+  # Class level changes keep the session's own decorators in their order, and the class decorators it unregistered
+  # stay unregistered
+  order = []
+  def namedDecorator(name):
+    def decorator(func):
+      @wraps(func)
+      def named_decorator(*args, **kwargs):
+        order.append(name)
+        return func(*args, **kwargs)
+      return named_decorator
+    return decorator
+  first, second, masked, added = (namedDecorator(name) for name in ('first', 'second', 'masked', 'added'))
+  boto3.session.Session.add_client_decorator('sts', 'get_caller_identity', masked)
+  for _ in range(100):
+    s.register_client_decorator('sts', 'get_caller_identity', first)
+    s.unregister_client_decorator('sts', 'get_caller_identity', first)
+  s.register_client_decorator('sts', 'get_caller_identity', first)
+  s.register_client_decorator('sts', 'get_caller_identity', second)
+  s.unregister_client_decorator('sts', 'get_caller_identity', masked)
+  boto3.session.Session.add_client_decorator('sts', 'get_caller_identity', added)
+  getCallerIdentity(client)
+  assert order == ['second', 'first', 'added']
+  boto3.session.Session.remove_client_decorator('sts', 'get_caller_identity')
+  s.unregister_client_decorator('sts', 'get_caller_identity')
+
+  # Resources are re-bound too
+  s.register_resource_decorator('s3', 'Bucket', 'delete', myDecorator)
+  bucket = s.resource('s3').Bucket('foo')
+  assert bucket.delete.__func__.__name__ == 'test_decorator'
+  s.unregister_resource_decorator('s3', 'Bucket', 'delete', myDecorator)
+  assert bucket.delete.__func__.__name__ == 'delete'
+
+def testCachedClient():
+
+  """
+  Test reusing the clients of a session
+  """
+
+  s = stubbedSession()
+  s.client_cache_size = 2
+  client = s.cached_client('sqs')
+  assert s.cached_client('sqs') is client
+  assert s.cached_client('sqs', region_name='us-west-2') is not client
+  assert s.cached_client('sqs', config=botocore.config.Config(retries={'max_attempts': 2})) is s.cached_client('sqs', config=botocore.config.Config(retries={'max_attempts': 2}))
+
+  # The least recently used client was evicted
+  assert s.cached_client('sqs') is not client
+  client = s.cached_client('sqs')
+
+  # Changing the session's decorators of a service drops its cached clients only
+  sts = s.cached_client('sts')
+  s.register_client_decorator('sqs', 'send_message', myDecorator)
+  s.register_resource_decorator('sts', '*', '*', myDecorator)
+  decorated = s.cached_client('sqs')
+  assert decorated is not client
+  assert decorated.send_message.__func__.__name__ == 'test_decorator'
+  assert s.cached_client('sts') is sts
+
+  # Clients of hot swapping sessions are re-bound rather than dropped
+  s.hot_swap = True
+  s.clear_client_cache()
+  live = s.cached_client('sqs')
+  s.unregister_client_decorator('sqs', 'send_message', myDecorator)
+  assert s.cached_client('sqs') is live
+  assert live.send_message.__func__.__name__ == 'send_message'
+  s.hot_swap = False
+
+  # Concurrent requests create a single client
+  s.clear_client_cache()
+  clients = []
+  barrier = threading.Barrier(8)
+  def getClient():
+    barrier.wait()
+    clients.append(s.cached_client('sts'))
+  threads = [threading.Thread(target=getClient) for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert len(set(map(id, clients))) == 1
+
+  # Unused clients expire
+  s = stubbedSession()
+  s.client_cache_idle = 0.05
+  client = s.cached_client('sts')
+  time.sleep(0.1)
+  assert s.cached_client('sts') is not client
+
+def testSharedComponents():
+
+  """
+  Test sharing the loader and models of sessions
+  """
+
+  class SharingSession(botoinator.DecoratedSession):
+    share_components = True
+
+  a = SharingSession(aws_access_key_id='foo', aws_secret_access_key='bar', region_name='us-east-1')
+  b = SharingSession(aws_access_key_id='baz', aws_secret_access_key='qux', region_name='us-west-2')
+  assert a._loader is b._loader and a._session.get_component('data_loader') is b._loader
+  assert a._session._get_internal_component('endpoint_resolver') is b._session._get_internal_component('endpoint_resolver')
+  assert stubbedSession()._loader is not a._loader
+
+  # Credentials, regions and decorators stay per session
+  a.register_client_decorator('sts', 'get_caller_identity', myDecorator)
+  clientA = a.client('sts')
+  clientB = b.client('sts')
+  assert clientA._request_signer._credentials.access_key == 'foo'
+  assert clientB._request_signer._credentials.access_key == 'baz'
+  assert clientB.meta.region_name == 'us-west-2'
+  assert clientA.get_caller_identity.__func__.__name__ == 'test_decorator'
+  assert clientB.get_caller_identity.__func__.__name__ == 'get_caller_identity'
+  assert b.resource('s3').Bucket('foo').name == 'foo'
+
+def testFanOut():
+
+  """
+  Test fanning calls out over the session's thread pools with a client per worker
+  """
+
+  clients = set()
+  def fakeGetParameter(func):
+    @wraps(func)
+    def fake_get_parameter(client, **kwargs):
+      clients.add(id(client))
+      if kwargs['Name'] == 'bad':
+        raise ValueError(kwargs['Name'])
+      time.sleep(0.01 * (int(kwargs['Name']) % 3))
+      return {'Parameter': {'Name': kwargs['Name']}}
+    return fake_get_parameter
+
+  s = stubbedSession()
+  s.register_client_decorator('ssm', 'get_parameter', fakeGetParameter)
+  taken = []
+  def names(count):
+    for index in range(count):
+      taken.append(index)
+      yield {'Name': str(index)}
+
+  # Responses come back in order, from one client per worker, and the iterable is consumed as they are taken
+  responses = s.map('ssm', 'get_parameter', names(40), max_workers=4, max_in_flight=8)
+  assert next(responses)['Parameter']['Name'] == '0'
+  assert len(taken) <= 9
+  assert [response['Parameter']['Name'] for response in responses] == [str(index) for index in range(1, 40)]
+  assert 1 <= len(clients) <= 4
+
+  # The session's workers and their clients are reused by later calls
+  assert len(list(s.map('ssm', 'get_parameter', names(20), max_workers=4))) == 20
+  assert 1 <= len(clients) <= 4
+
+  # Arguments are checked before the generator is iterated
+  try:
+    s.map('ssm', 'get_parameter', names(1), max_workers=4, max_in_flight=2)
+    assert False
+  except AssertionError:
+    pass
+
+  completed = list(s.as_completed('ssm', 'get_parameter', names(20), max_workers=4, client_kwargs={'region_name': 'us-west-2'}))
+  assert sorted(int(kwargs['Name']) for kwargs, _ in completed) == list(range(20))
+  assert all(kwargs['Name'] == response['Parameter']['Name'] for kwargs, response in completed)
+
+  # Failures are raised, or returned in place
+  try:
+    list(s.map('ssm', 'get_parameter', [{'Name': '1'}, {'Name': 'bad'}]))
+    assert False
+  except ValueError:
+    pass
+  assert isinstance(list(s.map('ssm', 'get_parameter', [{'Name': 'bad'}], return_exceptions=True))[0], ValueError)
+
+def testRateLimiter():
+
+  """
+  Test pacing calls with shared token buckets and backing off adaptively on throttling
+  """
+
+  # Buckets outlive limiters, start from fresh ones
+  reset_buckets()
+
+  # Sessions share the bucket of an operation in a region
+  limiter = RateLimiter(rates={'get_parameter': 20}, burst=1)
+  sessions = [stubbedSession(), stubbedSession()]
+  clients = []
+  for s in sessions:
+    s.register_client_decorator('ssm', AnyOperation(), limiter)
+    clients.append(s.client('ssm', region_name='ap-south-1'))
+  assert not hasattr(clients[0].describe_parameters, '__wrapped__')
+  stubbers = [Stubber(client) for client in clients]
+  for index in range(6):
+    stubbers[index % 2].add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}})
+  start = time.monotonic()
+  with stubbers[0], stubbers[1]:
+    for index in range(6):
+      clients[index % 2].get_parameter(Name='foo')
+  assert time.monotonic() - start >= 0.24
+  assert abs(get_bucket('ssm', 'GetParameter', 'ap-south-1').rate - 20) < 1e-9
+
+  # Throttling halves the rate at most once a second, successes add it back slowly
+  limiter = RateLimiter(rate=100, adaptive=True)
+  s = stubbedSession()
+  s.register_client_decorator('ssm', 'get_parameter', limiter)
+  client = s.client('ssm', region_name='eu-central-1')
+  with Stubber(client) as stubber:
+    stubber.add_client_error('get_parameter', 'ThrottlingException')
+    stubber.add_client_error('get_parameter', 'ThrottlingException')
+    stubber.add_response('get_parameter', {'Parameter': {'Name': 'foo', 'Value': 'bar'}})
+    for _ in range(2):
+      try:
+        client.get_parameter(Name='foo')
+        assert False
+      except client.exceptions.ClientError:
+        pass
+    bucket = get_bucket('ssm', 'GetParameter', 'eu-central-1')
+    assert abs(bucket.rate - 50) < 1e-9
+    client.get_parameter(Name='foo')
+    assert abs(bucket.rate - 50.02) < 1e-9
+
+  # Throttled attempts retried by botocore itself are seen through its needs-retry event
+  class Raw(object):
+    def __init__(self, body):
+      self.body = body
+    def stream(self, **kwargs):
+      yield self.body
+  bodies = [(400, b'{"__type": "ThrottlingException", "message": "Rate exceeded"}'), (200, b'{"Parameter": {"Name": "foo", "Value": "bar"}}')]
+  def send(request, **kwargs):
+    status, body = bodies.pop(0)
+    return botocore.awsrequest.AWSResponse(request.url, status, {}, Raw(body))
+  client = s.client('ssm', region_name='eu-west-3')
+  client.meta.events.register('before-send', send)
+  assert client.get_parameter(Name='foo')['ResponseMetadata']['RetryAttempts'] == 1
+  assert abs(get_bucket('ssm', 'GetParameter', 'eu-west-3').rate - 50.02) < 1e-9
+
+  reset_buckets()
+  assert get_bucket('ssm', 'GetParameter', 'eu-west-3') is None
+
+def testHedger():
+
+  """
+  Test hedging reads that are slower than the learned latency percentile
+  """
+
+  requests = []
+  def slowEndpoint(func):
+    @wraps(func)
+    def slow_endpoint(client, **kwargs):
+      name = kwargs.get('Name')
+      requests.append(name)
+      # The first request for a slow name hangs, a hedge for it is answered quickly
+      time.sleep(0.3 if name.startswith('slow') and requests.count(name) == 1 else 0.002)
+      return {'Parameter': {'Name': name}}
+    return slow_endpoint
+
+  hedger = Hedger(percentile=95, min_samples=20, budget=0.05)
+  s = stubbedSession()
+  s.register_client_decorator('ssm', ['get_parameter', 'put_parameter'], slowEndpoint)
+  s.register_client_decorator('ssm', ['get_parameter', 'put_parameter'], hedger, priority=10)
+  client = s.client('ssm')
+  for _ in range(20):
+    client.get_parameter(Name='fast')
+  assert 0.002 <= hedger.delay('ssm', 'GetParameter', 'us-east-1') < 0.3
+
+  # The hedge wins, and the budget allows a single one after 21 calls
+  start = time.monotonic()
+  assert client.get_parameter(Name='slow1')['Parameter']['Name'] == 'slow1'
+  assert time.monotonic() - start < 0.2
+  assert (hedger.hedged, hedger.won, requests.count('slow1')) == (1, 1, 2)
+  start = time.monotonic()
+  client.get_parameter(Name='slow2')
+  assert time.monotonic() - start >= 0.3
+  assert (hedger.hedged, requests.count('slow2')) == (1, 1)
+
+  # Operations that are not safe to repeat are never hedged
+  for _ in range(30):
+    client.put_parameter(Name='fast', Value='bar')
+  client.put_parameter(Name='slow3', Value='bar')
+  assert requests.count('slow3') == 1 and hedger.delay('ssm', 'PutParameter', 'us-east-1') is None
+  hedger.close()
+
+  # Calls made while every request thread is busy are sent on the caller's thread instead of queuing
+  hedger = Hedger(min_samples=20, budget=1, max_workers=1)
+  s = stubbedSession()
+  s.register_client_decorator('ssm', 'get_parameter', slowEndpoint)
+  s.register_client_decorator('ssm', 'get_parameter', hedger, priority=10)
+  client = s.client('ssm')
+  for _ in range(20):
+    client.get_parameter(Name='fast')
+  busy = threading.Thread(target=client.get_parameter, kwargs={'Name': 'slow4'})
+  busy.start()
+  time.sleep(0.05)
+  start = time.monotonic()
+  client.get_parameter(Name='fast')
+  assert time.monotonic() - start < 0.2
+  busy.join()
+  assert (hedger.bypassed, hedger.hedged, requests.count('slow4')) == (1, 0, 1)
+  hedger.close()
+
+def testWorkerProcesses():
+
+  """
+  Test exporting decorators to spawned worker processes and pickling sessions
+  """
+
+  with tempfile.TemporaryDirectory() as directory:
+    with open(os.path.join(directory, 'workerdecorators.py'), 'w') as module:
+      module.write("""
+import boto3
+import botoinator
+from botoinator.metrics import Metrics
+from botoinator.waiters import AdaptiveWaiter
+
+metrics = Metrics()
+waiter = AdaptiveWaiter()
+
+def tag(func):
+  def tagged(*args, **kwargs):
+    return func(*args, **kwargs)
+  tagged.tagged = True
+  return tagged
+
+def exported():
+  return botoinator.DecoratedSession.export_decorators(names={'workerdecorators:metrics': metrics})
+
+def decorated():
+  client = boto3.client('s3', region_name='us-east-1')
+  return hasattr(client.list_buckets, 'tagged'), hasattr(client.put_object, '__wrapped__')
+""")
+    subprocess.check_call([sys.executable, '-c', """
+import json, multiprocessing, pickle, re
+from concurrent.futures import ProcessPoolExecutor
+import botoinator
+from botoinator import DecoratedSession
+from botoinator.operations import HttpMethod, ReadOnly
+import workerdecorators
+
+DecoratedSession.add_client_decorator('s3', [ReadOnly() & ~HttpMethod('head'), re.compile('list_.*')], workerdecorators.tag)
+DecoratedSession.add_client_decorator('s3', 'put_*', workerdecorators.metrics, priority=2)
+try:
+  DecoratedSession.export_decorators()
+  assert False
+except ValueError:
+  pass
+exported = workerdecorators.exported()
+assert json.loads(json.dumps(exported)) == exported
+with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('spawn'), initializer=botoinator.initialize_worker, initargs=(exported,)) as pool:
+  assert pool.submit(workerdecorators.exported).result() == exported
+  assert pool.submit(workerdecorators.decorated).result() == (True, True)
+
+# Named decorators are exported without names, and sessions holding them can be pickled
+DecoratedSession.name_decorator('workerdecorators:metrics', workerdecorators.metrics)
+assert DecoratedSession.export_decorators() == exported
+DecoratedSession.remove_client_decorator('s3', 'put_*')
+session = DecoratedSession(region_name='us-east-1')
+session.register_client_decorator('s3', 'put_object', workerdecorators.metrics)
+restored = pickle.loads(pickle.dumps(session))
+assert restored.client('s3').put_object.__wrapped__
+
+# Waiter decorators are exported and pickled with their waiter names
+DecoratedSession.name_decorator('workerdecorators:waiter', workerdecorators.waiter)
+DecoratedSession.add_waiter_decorator('s3', [re.compile('bucket_.*'), 'object_exists'], workerdecorators.waiter)
+exported = DecoratedSession.export_decorators()
+DecoratedSession.import_decorators(json.loads(json.dumps(exported)))
+assert DecoratedSession.export_decorators() == exported
+DecoratedSession.remove_waiter_decorator('s3', [re.compile('bucket_.*'), 'object_exists'], workerdecorators.waiter)
+session.register_waiter_decorator('s3', 'bucket_exists', workerdecorators.waiter)
+restored = pickle.loads(pickle.dumps(session))
+assert restored.client('s3').get_waiter('bucket_exists').wait.__wrapped__
+assert not hasattr(restored.client('s3').get_waiter('object_exists').wait, '__wrapped__')
+"""], env=dict(os.environ, PYTHONPATH=os.pathsep.join([directory, os.path.dirname(botoinator.__path__[0])])))
+
+  # Sessions pickle with their explicit credentials, region, settings and own decorators
+  s = stubbedSession()
+  s.client_cache_size = 4
+  s.register_client_decorator('s3', 'list_buckets', myDecorator)
+  s.register_waiter_decorator('s3', 'bucket_exists', myDecorator)
+  restored = pickle.loads(pickle.dumps(s))
+  assert (restored.region_name, restored.get_credentials().access_key) == ('us-east-1', 'foo')
+  assert restored.client_cache_size == 4
+  assert restored.client('s3').list_buckets.__func__.__name__ == 'test_decorator'
+  assert restored.client('s3').create_bucket.__func__.__name__ == 'create_bucket'
+  assert restored.client('s3').get_waiter('bucket_exists').wait.__func__.__name__ == 'test_decorator'
+
+@mock_s3
+def testZeroCopy():
+
+  """
+  Test reading object bodies into buffers and memory mapped files, and sending buffers as bodies
+  """
+
+  pool = BufferPool(buffer_size=1000, max_buffers=1)
+  s = stubbedSession()
+  s.register_client_decorator('s3', ['get_object', 'put_object', 'list_buckets'], ZeroCopy(pool=pool, chunk_size=4096))
+  client = s.client('s3')
+  assert not hasattr(client.list_buckets, '__wrapped__')
+  client.create_bucket(Bucket='foo')
+  data = bytes(range(256)) * 64
+
+  # Memoryviews and mmaps are sent as they are
+  client.put_object(Bucket='foo', Key='view', Body=memoryview(data)[256:])
+  mapped = mmap.mmap(-1, len(data))
+  mapped.write(data)
+  mapped.seek(0)
+  client.put_object(Bucket='foo', Key='mapped', Body=mapped)
+  mapped.close()
+
+  buffer = bytearray(len(data))
+  body = client.get_object(Bucket='foo', Key='view', Buffer=buffer)['Body']
+  assert isinstance(body, memoryview) and body == data[256:] and body.obj is buffer
+  try:
+    client.get_object(Bucket='foo', Key='mapped', Buffer=bytearray(100))
+    assert False
+  except ValueError:
+    pass
+
+  with tempfile.TemporaryDirectory() as directory:
+    filename = os.path.join(directory, 'mapped')
+    body = client.get_object(Bucket='foo', Key='mapped', Filename=filename)['Body']
+    assert isinstance(body, mmap.mmap) and body[:] == data
+    body.close()
+    with open(filename, 'rb') as file:
+      assert file.read() == data
+
+  # Without a buffer, bodies are read through pooled buffers
+  body = client.get_object(Bucket='foo', Key='view')['Body']
+  assert isinstance(body, PooledBody)
+  views = body.iter_views()
+  first = next(views)
+  assert len(first) == 1000 and first == data[256:1256]
+  assert b''.join(bytes(view) for view in views) == data[1256:]
+  assert pool.acquire() is first.obj
+
+  # ZeroCopy still applies above a decorator that drops the method name
+  s = stubbedSession()
+  s.register_client_decorator('s3', 'get_object', myDecorator)
+  s.register_client_decorator('s3', 'get_object', ZeroCopy(pool=BufferPool(buffer_size=1000)), priority=10)
+  assert isinstance(s.client('s3').get_object(Bucket='foo', Key='view')['Body'], PooledBody)
+
+def testCassette():
+
+  """
+  Test recording calls to a cassette file and replaying them offline
+  """
+
+  def slowEndpoint(func):
+    @wraps(func)
+    def slow_endpoint(client, **kwargs):
+      time.sleep(0.05)
+      return {'Parameter': {'Name': kwargs['Name'], 'Version': len(kwargs['Name'])}}
+    return slow_endpoint
+
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'calls.cassette')
+    cassette = Cassette(path, mode=Cassette.RECORD)
+    with mock_s3():
+      s = stubbedSession()
+      s.register_client_decorator('s3', AnyOperation(), cassette)
+      s.register_client_decorator('ssm', 'get_parameter', slowEndpoint)
+      s.register_client_decorator('ssm', 'get_parameter', cassette, priority=1)
+      client = s.client('s3')
+      client.create_bucket(Bucket='foo')
+      client.put_object(Bucket='foo', Key='bar', Body=b'first')
+      assert client.get_object(Bucket='foo', Key='bar')['Body'].read() == b'first'
+      client.put_object(Bucket='foo', Key='bar', Body=b'second')
+      assert client.get_object(Bucket='foo', Key='bar')['Body'].read() == b'second'
+      try:
+        client.get_object(Bucket='foo', Key='missing')
+        assert False
+      except client.exceptions.NoSuchKey:
+        pass
+      # File bodies cannot be keyed and are passed through
+      client.put_object(Bucket='foo', Key='file', Body=io.BytesIO(b'file'))
+      s.client('ssm').get_parameter(Name='foo')
+      # Calls made after closing are passed through
+      cassette.close()
+      client.list_buckets()
+    assert len(cassette) == 7
+
+    # Records are JSON documents, with bytes, datetimes and keys starting with $ tagged
+    value = {'Body': b'\x00', 'LastModified': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc), '$ref': [1]}
+    assert decode(json.loads(json.dumps(encode(value)))) == value
+
+    # Replaying needs no mock, identical calls replay in order and then repeat the last one
+    cassette = Cassette(path)
+    s = boto3.Session(aws_access_key_id='other', aws_secret_access_key='keys', region_name='us-east-1')
+    s.register_client_decorator('s3', AnyOperation(), cassette)
+    s.register_client_decorator('ssm', 'get_parameter', cassette)
+    client = s.client('s3', endpoint_url='http://127.0.0.1:9')
+    assert [client.get_object(Bucket='foo', Key='bar')['Body'].read() for _ in range(3)] == [b'first', b'second', b'second']
+    assert isinstance(client.get_object(Bucket='foo', Key='bar')['LastModified'], datetime.datetime)
+    try:
+      client.get_object(Bucket='foo', Key='missing')
+      assert False
+    except client.exceptions.NoSuchKey:
+      pass
+    for call in (lambda: client.get_object(Bucket='foo', Key='other'), lambda: client.put_object(Bucket='foo', Key='file', Body=io.BytesIO(b'file'))):
+      try:
+        call()
+        assert False
+      except KeyError:
+        pass
+    ssm = s.client('ssm')
+    start = time.monotonic()
+    assert ssm.get_parameter(Name='foo')['Parameter']['Version'] == 3
+    assert time.monotonic() - start < 0.05
+    cassette.close()
+
+    # Recorded latencies can be injected
+    s.unregister_client_decorator('ssm', 'get_parameter', cassette)
+    cassette = Cassette(path, latency=1.0)
+    s.register_client_decorator('ssm', 'get_parameter', cassette)
+    ssm = s.client('ssm')
+    start = time.monotonic()
+    ssm.get_parameter(Name='foo')
+    assert time.monotonic() - start >= 0.05
+    cassette.close()
+
+@mock_s3
+def testCollectionsAndWaiters():
+
+  """
+  Test decorating resource collections and waiters, and polling adaptively
+  """
+
+  calls = []
+  def counting(func):
+    @wraps(func)
+    def counted(*args, **kwargs):
+      calls.append(func.__name__)
+      return func(*args, **kwargs)
+    return counted
+
+  s = stubbedSession()
+  s.register_collection_decorator('s3', 'Bucket', 'objects', ['pages', 'filter', 'delete'], counting)
+  s.register_collection_decorator('s3', 'ServiceResource', '*', 'pages', counting)
+  s.register_waiter_decorator('s3', '*_exists', counting)
+  s3 = s.resource('s3')
+  s3.create_bucket(Bucket='foo')
+  bucket = s3.Bucket('foo')
+  bucket.put_object(Key='a1', Body=b'')
+  bucket.put_object(Key='b1', Body=b'')
+
+  assert [obj.key for obj in bucket.objects.filter(Prefix='a')] == ['a1'] and calls == ['filter', 'pages']
+  del calls[:]
+  assert len(list(bucket.objects.pages())) == 1 and calls == ['pages']
+  del calls[:]
+  assert [b.name for b in s3.buckets.all()] == ['foo'] and calls == ['pages']
+  del calls[:]
+  bucket.objects.delete()
+  assert calls == ['delete', 'pages']
+  del calls[:]
+
+  # Resource waiters go through the client's waiters
+  bucket.wait_until_exists()
+  s3.meta.client.get_waiter('bucket_exists').wait(Bucket='foo')
+  s3.meta.client.get_waiter('bucket_not_exists')
+  assert calls == ['bucket_exists', 'bucket_exists']
+  assert not hasattr(s.client('s3').get_paginator, '__wrapped__')
+
+  # Adaptive polling checks early and often, and gives up as soon as the next sleep would overrun
+  s = stubbedSession()
+  s.register_waiter_decorator('s3', 'bucket_exists', AdaptiveWaiter(initial_delay=0.01))
+  client = s.client('s3')
+  with Stubber(client) as stubber:
+    for _ in range(3):
+      stubber.add_client_error('head_bucket', http_status_code=404)
+    stubber.add_response('head_bucket', {'ResponseMetadata': {'HTTPStatusCode': 200}})
+    start = time.monotonic()
+    client.get_waiter('bucket_exists').wait(Bucket='foo')
+    assert time.monotonic() - start < 1.0
+  s.register_waiter_decorator('s3', 'bucket_exists', AdaptiveWaiter(initial_delay=1.0, jitter=0, max_time=0.5), priority=1)
+  client = s.client('s3')
+  with Stubber(client) as stubber:
+    stubber.add_client_error('head_bucket', http_status_code=404)
+    start = time.monotonic()
+    try:
+      client.get_waiter('bucket_exists').wait(Bucket='foo')
+      assert False
+    except WaiterError as e:
+      assert 'Max wait time exceeded' in str(e)
+    assert time.monotonic() - start < 0.5
+
+  # The time budget follows the delay set by WaiterConfig rather than the model's
+  s = stubbedSession()
+  s.register_waiter_decorator('s3', 'bucket_exists', AdaptiveWaiter(initial_delay=0.1, jitter=0))
+  client = s.client('s3')
+  waiter = client.get_waiter('bucket_exists')
+  waiter.config.delay = 0.01
+  with Stubber(client) as stubber:
+    for _ in range(2):
+      stubber.add_client_error('head_bucket', http_status_code=404)
+    stubber.add_response('head_bucket', {'ResponseMetadata': {'HTTPStatusCode': 200}})
+    start = time.monotonic()
+    # Returns instead of raising WaiterError, having polled three times with two 0.1 second sleeps in between
+    assert waiter.wait(Bucket='foo', WaiterConfig={'Delay': 0.1, 'MaxAttempts': 3}) is None
+    assert 0.2 <= time.monotonic() - start < 1.0
+    stubber.assert_no_pending_responses()
 
 testRegisterToClient()
 boto3.DEFAULT_SESSION = None
@@ -165,6 +1440,54 @@ boto3.DEFAULT_SESSION = None
 testAddToClient()
 boto3.DEFAULT_SESSION = None
 testAddToResource()
+boto3.DEFAULT_SESSION = None
+testClientClassCache()
+boto3.DEFAULT_SESSION = None
+testRegistrySnapshot()
+boto3.DEFAULT_SESSION = None
+testConcurrentRegistry()
+boto3.DEFAULT_SESSION = None
+testDispatchMode()
+boto3.DEFAULT_SESSION = None
+testDecoratorStack()
+boto3.DEFAULT_SESSION = None
+testSelectors()
+boto3.DEFAULT_SESSION = None
+testOperationPredicates()
+boto3.DEFAULT_SESSION = None
+testResponseCache()
+boto3.DEFAULT_SESSION = None
+testSingleFlight()
+boto3.DEFAULT_SESSION = None
+testWriteBatcher()
+boto3.DEFAULT_SESSION = None
+testAutoPaginator()
+boto3.DEFAULT_SESSION = None
+testMetrics()
+boto3.DEFAULT_SESSION = None
+testProfiler()
+boto3.DEFAULT_SESSION = None
+testInstall()
+boto3.DEFAULT_SESSION = None
+testHotSwap()
+boto3.DEFAULT_SESSION = None
+testCachedClient()
+boto3.DEFAULT_SESSION = None
+testSharedComponents()
+boto3.DEFAULT_SESSION = None
+testFanOut()
+boto3.DEFAULT_SESSION = None
+testRateLimiter()
+boto3.DEFAULT_SESSION = None
+testHedger()
+boto3.DEFAULT_SESSION = None
+testWorkerProcesses()
+boto3.DEFAULT_SESSION = None
+testZeroCopy()
+boto3.DEFAULT_SESSION = None
+testCassette()
+boto3.DEFAULT_SESSION = None
+testCollectionsAndWaiters()
 
 print("""
 ===============================